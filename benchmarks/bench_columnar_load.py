@@ -0,0 +1,80 @@
+"""
+bench_columnar_load.py
+Tiempo de arranque en frío del DataFrame de ventas para forecast/cruzar:
+- JSON (parseo + DataFrame + normalización de tipos, como antes)
+- snapshot columnar (np.load mmap, ver conexiones/columnar.py)
+
+Uso:
+    python benchmarks/bench_columnar_load.py [100000,1000000,3000000]
+"""
+
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from conexiones.columnar import ColumnarSnapshot  # noqa: E402
+
+DEFAULT_SIZES = [100_000, 1_000_000, 3_000_000]
+SCHEMA = {"Centro Costos": "category", "Material": "category",
+          "Fecha Venta": "datetime", "Cantidad": "number"}
+
+
+def _rows(n):
+    centros = [f"77036709{i:05d}" for i in range(500)]
+    materiales = [f"{random.randint(10**11, 10**12 - 1)}" for _ in range(5000)]
+    return [{
+        "Centro Costos": random.choice(centros),
+        "Material": random.choice(materiales),
+        "Fecha Venta": f"2025-{(i % 12) + 1:02d}-{(i % 28) + 1:02d} 00:00:00",
+        "Cantidad": random.randint(1, 5),
+    } for i in range(n)]
+
+
+def load_json_frame(path):
+    df = pd.DataFrame(json.loads(path.read_text(encoding="utf-8")))
+    df["Cantidad"] = pd.to_numeric(df["Cantidad"], errors="coerce").fillna(0)
+    df["Fecha Venta"] = pd.to_datetime(df["Fecha Venta"], errors="coerce")
+    df["Material"] = df["Material"].astype(str)
+    df["Centro Costos"] = df["Centro Costos"].astype(str)
+    return df
+
+
+def main():
+    sizes = DEFAULT_SIZES
+    if len(sys.argv) > 1:
+        sizes = [int(x) for x in sys.argv[1].split(",") if x.strip()]
+    random.seed(7)
+    print(f"{'filas':>10} | {'json s':>8} | {'columnar s':>10} | {'x':>6}")
+    for n in sizes:
+        rows = _rows(n)
+        with tempfile.TemporaryDirectory() as d:
+            tmp = Path(d)
+            path = tmp / "ventas.json"
+            with path.open("w", encoding="utf-8") as f:
+                json.dump(rows, f, ensure_ascii=False, indent=2)
+            del rows
+            snap = ColumnarSnapshot(tmp / "ventas.columnar", SCHEMA)
+            snap.save(pd.DataFrame(json.loads(path.read_text(encoding="utf-8"))), "bench")
+
+            t0 = time.perf_counter()
+            a = load_json_frame(path)
+            t_json = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            b = snap.load("bench")
+            # forzar una agregación para que el mmap realmente lea las columnas
+            b.groupby(["Centro Costos", "Material"], observed=True)["Cantidad"].sum()
+            t_col = time.perf_counter() - t0
+            assert len(a) == len(b)
+        print(f"{n:>10} | {t_json:8.2f} | {t_col:10.3f} | {t_json / t_col:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
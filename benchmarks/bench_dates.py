@@ -0,0 +1,139 @@
+"""
+bench_dates.py
+Micro-benchmarks de conexiones/dates.py contra el parseo fila a fila anterior:
+- normalize: strptime por fila (ops_ventasclaro._normalize_date_str) vs dates.normalize_dates
+- parse:     _parse_norm_date_to_date por fila vs dates.parse_dates
+- datetime:  pd.to_datetime(columna) vs dates.to_datetime (queryVentasHc)
+
+Columnas con pocos cientos de fechas distintas, como los archivos de ventas.
+"frío" = LRU vacío; "caliente" = segunda pasada con las fechas ya vistas.
+Verifica que cada versión nueva devuelva exactamente lo mismo que la anterior.
+
+Uso:
+    python benchmarks/bench_dates.py [10000,100000]
+"""
+
+import random
+import sys
+import time
+from datetime import datetime, date, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from conexiones import dates  # noqa: E402
+
+DEFAULT_SIZES = [10_000, 100_000]
+DISTINCT_DAYS = 400
+
+
+def legacy_normalize(s):
+    """ops_ventasclaro._normalize_date_str antes de conexiones/dates.py"""
+    if s is None:
+        return ""
+    s = str(s).strip()
+    if not s:
+        return ""
+    for fmt in dates.DATE_FORMATS:
+        try:
+            return datetime.strptime(s, fmt).strftime("%Y-%m-%d")
+        except Exception:
+            continue
+    return s
+
+
+def legacy_parse(norm):
+    """ops_ventasclaro._parse_norm_date_to_date antes de conexiones/dates.py"""
+    if norm is None:
+        return None
+    s = str(norm).strip()
+    if not s:
+        return None
+    try:
+        if s.isdigit() and len(s) <= 5:
+            return (datetime(1899, 12, 30) + pd.to_timedelta(int(s), unit="D")).date()
+    except Exception:
+        pass
+    try:
+        dt = pd.to_datetime(s, errors="coerce")
+        if pd.notna(dt):
+            return dt.date()
+    except Exception:
+        pass
+    try:
+        dt = pd.to_datetime(s, dayfirst=True, errors="coerce")
+        if pd.notna(dt):
+            return dt.date()
+    except Exception:
+        pass
+    return None
+
+
+def _raw_column(n):
+    """Fechas entrantes con formatos mezclados (import / alta manual)."""
+    base = date(2025, 1, 1)
+    out = []
+    for _ in range(n):
+        d = base + timedelta(days=random.randrange(DISTINCT_DAYS))
+        out.append(random.choice([
+            d.strftime("%Y-%m-%d"), d.strftime("%d/%m/%Y"), d.strftime("%Y-%m-%d 00:00:00"),
+            f"{d.day}-{d.month}-{d.year}", "", "sin fecha",
+        ]))
+    return out
+
+
+def _stored_column(n):
+    """Fechas ya guardadas (normalizadas) con algún serial de Excel y valores inválidos."""
+    base = date(2025, 1, 1)
+    out = []
+    for _ in range(n):
+        d = base + timedelta(days=random.randrange(DISTINCT_DAYS))
+        out.append(random.choice([d.isoformat()] * 8 + ["45292", "31/12/2025", "x"]))
+    return out
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+def _row(name, n, t_old, t_cold, t_warm):
+    print(f"{name:>9} | {n:>8} | {t_old:9.3f} | {t_cold:8.3f} | {t_warm:9.3f} | {t_old / t_warm:7.1f}")
+
+
+def main():
+    sizes = DEFAULT_SIZES
+    if len(sys.argv) > 1:
+        sizes = [int(x) for x in sys.argv[1].split(",") if x.strip()]
+    random.seed(7)
+    print(f"{'caso':>9} | {'filas':>8} | {'antes s':>9} | {'frío s':>8} | {'caliente s':>9} | {'x':>7}")
+    for n in sizes:
+        raw = _raw_column(n)
+        old, t_old = _timed(lambda: [legacy_normalize(v) for v in raw])
+        dates.clear_caches()
+        new, t_cold = _timed(lambda: dates.normalize_dates(raw))
+        _, t_warm = _timed(lambda: dates.normalize_dates(raw))
+        assert list(new) == old, "normalize: difiere"
+        _row("normalize", n, t_old, t_cold, t_warm)
+
+        stored = _stored_column(n)
+        old, t_old = _timed(lambda: [legacy_parse(v) for v in stored])
+        dates.clear_caches()
+        new, t_cold = _timed(lambda: dates.parse_dates(stored))
+        _, t_warm = _timed(lambda: dates.parse_dates(stored))
+        assert list(new) == old, "parse: difiere"
+        _row("parse", n, t_old, t_cold, t_warm)
+
+        col = pd.Series([v for v in stored if v[:1] == "2"], dtype=object)
+        old, t_old = _timed(lambda: pd.to_datetime(col, errors="coerce"))
+        new, t_cold = _timed(lambda: dates.to_datetime(col))
+        _, t_warm = _timed(lambda: dates.to_datetime(col))
+        assert old.equals(new), "to_datetime: difiere"
+        _row("datetime", len(col), t_old, t_cold, t_warm)
+
+
+if __name__ == "__main__":
+    main()
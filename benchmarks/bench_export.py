@@ -0,0 +1,132 @@
+"""
+bench_export.py
+Exporte de la tabla cruzada (13 columnas) a Excel / CSV:
+- antes: DataFrame + pd.ExcelWriter(openpyxl) en un BytesIO, enviado al terminar;
+- ahora: conexiones/export_stream.py, XLSX y CSV escritos por bloques a la respuesta.
+
+Cada variante corre en un proceso aparte (ru_maxrss es el pico del proceso) y mide:
+tiempo al primer byte (TTFB), tiempo total, tamaño del archivo y cuánto subió el pico
+de RSS por sobre el de los registros ya cargados. Antes de medir verifica con un
+tamaño chico que el XLSX y el CSV en streaming se leen igual que el exporte anterior.
+
+Uso:
+    python benchmarks/bench_export.py [100000,1000000]
+"""
+
+import io
+import json
+import random
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from conexiones import export_stream  # noqa: E402
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+VARIANTS = ("xlsx openpyxl", "xlsx stream", "csv stream")
+CHECK_ROWS = 2000
+COLUMNS = [
+    'Material', 'Producto', 'Marca', 'Centro Costos', 'Punto de Venta',
+    'Sugerido Claro', 'Inventario', 'Transitos', 'Ventas Actuales',
+    'Envío Inventario 3 meses', 'Sugerido Coltrade', 'Promedio 3 Meses', 'Sugerido Final'
+]
+
+
+def _records(n):
+    random.seed(5)
+    marcas = ["Samsung", "Apple", "Xiaomi", "Motorola", "Honor"]
+    return [{
+        'Material': str(7000000 + i % 50000),
+        'Producto': f"Equipo {marcas[i % 5]} modelo {i % 50000}",
+        'Marca': marcas[i % 5],
+        'Centro Costos': f"C{i % 600:03d}",
+        'Punto de Venta': f"Homecenter tienda {i % 600}",
+        'Sugerido Claro': float(random.randint(0, 20)),
+        'Inventario': float(random.randint(0, 50)),
+        'Transitos': 0.0,
+        'Ventas Actuales': float(random.randint(0, 30)),
+        'Envío Inventario 3 meses': 0,
+        'Sugerido Coltrade': float(random.randint(0, 20)),
+        'Promedio 3 Meses': round(random.random() * 30, 2),
+        'Sugerido Final': 0,
+    } for i in range(n)]
+
+
+def _rows(records):
+    return ([r[c] for c in COLUMNS] for r in records)
+
+
+def _legacy_xlsx(records):
+    df = pd.DataFrame(records, columns=COLUMNS)
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, sheet_name='Cruzado')
+    output.seek(0)
+    yield output.getvalue()
+
+
+def _body(variant, records):
+    if variant == "xlsx openpyxl":
+        return _legacy_xlsx(records)
+    if variant == "xlsx stream":
+        return export_stream.iter_xlsx(COLUMNS, _rows(records), 'Cruzado')
+    return export_stream.iter_csv(COLUMNS, _rows(records))
+
+
+def _peak_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(variant, n):
+    """Mide una variante en este proceso e imprime el resultado como JSON."""
+    records = _records(n)
+    base = _peak_mb()
+    t0 = time.perf_counter()
+    ttfb, size = None, 0
+    for chunk in _body(variant, records):
+        if ttfb is None:
+            ttfb = time.perf_counter() - t0
+        size += len(chunk)
+    total = time.perf_counter() - t0
+    print(json.dumps({"ttfb": ttfb, "total": total, "mb": size / 2**20, "rss": _peak_mb() - base}))
+
+
+def check():
+    records = _records(CHECK_ROWS)
+    expected = pd.read_excel(io.BytesIO(next(_legacy_xlsx(records))), dtype={'Material': str})
+    streamed = pd.read_excel(io.BytesIO(b"".join(_body("xlsx stream", records))), dtype={'Material': str})
+    pd.testing.assert_frame_equal(streamed, expected)
+    csv = pd.read_csv(io.BytesIO(b"".join(_body("csv stream", records))), encoding='utf-8-sig',
+                      dtype={'Material': str})
+    # Excel no distingue 3.0 de 3: se comparan valores, no dtypes
+    pd.testing.assert_frame_equal(csv, expected, check_dtype=False)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], int(sys.argv[3]))
+        return
+    sizes = DEFAULT_SIZES
+    if len(sys.argv) > 1:
+        sizes = [int(x) for x in sys.argv[1].split(",") if x.strip()]
+    check()
+    print(f"{'filas':>9} | {'variante':>13} | {'TTFB s':>8} | {'total s':>8} | {'MB':>7} | {'+RSS MB':>8}")
+    for n in sizes:
+        for variant in VARIANTS:
+            proc = subprocess.run([sys.executable, __file__, "--child", variant, str(n)],
+                                  capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"{n:>9} | {variant:>13} | falló (código {proc.returncode})")
+                continue
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(f"{n:>9} | {variant:>13} | {r['ttfb']:8.3f} | {r['total']:8.3f} | {r['mb']:7.1f} | {r['rss']:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+bench_forecast.py
+Cálculo de /forecast/data: bucle por candidato anterior (iterrows + lookups en
+dicts por mes) vs conexiones/forecast_engine.build_forecast_records.
+
+Datos sintéticos de tiendas × materiales: inventario en ~6% de los pares,
+tránsitos en ~1%, ventas en ~6% con varios meses cada una. Se mide sin filtros
+y con filtros de centro/producto; verifica que ambos devuelvan exactamente
+la misma lista (valores, tipos y orden) en las columnas del cálculo anterior
+(sin las de metas).
+
+Uso:
+    python benchmarks/bench_forecast.py [50x500,500x5000]
+"""
+
+import json
+import random
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from conexiones import forecast_engine  # noqa: E402
+
+DEFAULT_SIZES = [(50, 500), (500, 5000)]
+LEGACY_COLUMNS = forecast_engine.FORECAST_COLUMNS[:16]
+INV_DENSITY = 0.06
+TRA_DENSITY = 0.01
+VENTAS_DENSITY = 0.06
+
+
+def normalize_str(x):
+    if x is None or (isinstance(x, float) and pd.isna(x)):
+        return ''
+    return str(x).strip()
+
+
+def legacy_records(df_inv, df_tra, df_prod, df_puntos, ventas, filters, today):
+    """forecast_abastecimiento.compute_forecast_records antes de forecast_engine"""
+    (centros_filter, puntos_filter, materials_filter,
+     productos_filter, marcas_filter, canales_filter) = filters
+    prod_map = {}
+    if not df_prod.empty and 'Material' in df_prod.columns:
+        for _, r in df_prod.iterrows():
+            m = normalize_str(r.get('Material'))
+            prod_map[m] = {
+                'Producto': normalize_str(r.get('Producto')) if 'Producto' in r else '',
+                'Marca': normalize_str(r.get('Marca')) if 'Marca' in r else ''
+            }
+    puntos_map = {}
+    if not df_puntos.empty and 'Centro Costos' in df_puntos.columns:
+        for _, r in df_puntos.iterrows():
+            cc = normalize_str(r.get('Centro Costos'))
+            puntos_map[cc] = {
+                'Punto de Venta': normalize_str(r.get('Punto de Venta')) if 'Punto de Venta' in r else '',
+                'Canal o Regional': normalize_str(r.get('Canal o Regional')) if 'Canal o Regional' in r else ''
+            }
+    candidates = set()
+    for df in (df_inv, df_tra):
+        if not df.empty and {'Centro Costos', 'Material'}.issubset(df.columns):
+            for _, r in df.iterrows():
+                cc = normalize_str(r.get('Centro Costos'))
+                mat = normalize_str(r.get('Material'))
+                if mat in prod_map:
+                    candidates.add((cc, mat))
+    for cc, mat in ventas['pairs']:
+        if mat in prod_map:
+            candidates.add((cc, mat))
+
+    months = [(today - relativedelta(months=i)).replace(day=1) for i in range(1, 4)]
+    monthly = ventas['monthly']
+    medians = ventas['median']
+    inv_dict = df_inv.groupby(['Centro Costos', 'Material'], dropna=False, observed=True)['Inventario'].sum().to_dict()
+    tra_dict = df_tra.groupby(['Centro Costos', 'Material'], dropna=False, observed=True)['Transitos'].sum().to_dict()
+
+    def matches(cc, mat):
+        if centros_filter and cc.lower() not in centros_filter:
+            return False
+        if puntos_filter and puntos_map.get(cc, {}).get('Punto de Venta', '').lower() not in puntos_filter:
+            return False
+        if materials_filter and mat.lower() not in materials_filter:
+            return False
+        prod_name = prod_map.get(mat, {}).get('Producto', '').lower()
+        if productos_filter and not any(pat in prod_name for pat in productos_filter):
+            return False
+        if marcas_filter and prod_map.get(mat, {}).get('Marca', '').lower() not in marcas_filter:
+            return False
+        if canales_filter and puntos_map.get(cc, {}).get('Canal o Regional', '').lower() not in canales_filter:
+            return False
+        return True
+
+    records = []
+    for cc, mat in sorted(candidates):
+        if not matches(cc, mat):
+            continue
+        month_totals = [int(monthly.get((cc, mat, d.year, d.month), 0)) for d in months]
+        ventas_pasado = month_totals[0]
+        ventas_promedio = round(sum(month_totals) / 3.0, 2)
+        ventas_actual = int(monthly.get((cc, mat, today.year, today.month), 0))
+        inventario = int(inv_dict.get((cc, mat), 0))
+        transitos = int(tra_dict.get((cc, mat), 0))
+        mediana = medians.get((cc, mat))
+        if mediana is not None and pd.notna(mediana):
+            mediana = float(round(float(mediana), 2))
+        else:
+            mediana = None
+        if not (inventario > 0 or transitos > 0 or ventas_actual > 0 or ventas_pasado > 0 or ventas_promedio > 0):
+            continue
+        records.append({
+            'Centro Costos': cc,
+            'Material': mat,
+            'Productos': prod_map.get(mat, {}).get('Producto', ''),
+            'Marca': prod_map.get(mat, {}).get('Marca', ''),
+            'Punto de Venta': puntos_map.get(cc, {}).get('Punto de Venta', ''),
+            'Canal o Regional': puntos_map.get(cc, {}).get('Canal o Regional', ''),
+            'Ventas_Mes_Actual': ventas_actual,
+            'Ventas_Mes_Pasado': ventas_pasado,
+            'Ventas_Promedio_3_Meses': ventas_promedio,
+            'Mediana': mediana,
+            'Inventario': inventario,
+            'Transitos': transitos,
+            'Indicador_3_Meses': round(inventario / ventas_promedio, 4) if ventas_promedio != 0 else None,
+            'Indicador_Mes_Pasado': round(inventario / ventas_pasado, 4) if ventas_pasado != 0 else None,
+            'Envio_3_Meses': round(ventas_promedio - inventario, 2),
+            'Envio_Pasadas': round(ventas_pasado - inventario, 2),
+        })
+    return sorted(records, key=lambda x: (-(x.get('Envio_Pasadas') or 0), x.get('Centro Costos') or '', x.get('Material') or ''))
+
+
+def _pairs(stores, materials, density):
+    n = int(len(stores) * len(materials) * density)
+    return {(random.choice(stores), random.choice(materials)) for _ in range(n)}
+
+
+def _dataset(n_stores, n_materials, today):
+    stores = [f"CC{i:04d}" for i in range(n_stores)]
+    materials = [str(7000000 + i) for i in range(n_materials)]
+    marcas = ["SAMSUNG", "APPLE", "XIAOMI", "MOTOROLA", "HONOR"]
+    df_prod = pd.DataFrame({
+        "Material": materials,
+        "Producto": [f"{random.choice(marcas)} EQUIPO {i % 300}" for i in range(n_materials)],
+        "Marca": [random.choice(marcas) for _ in materials],
+    }).astype(str)
+    df_puntos = pd.DataFrame({
+        "Centro Costos": stores,
+        "Punto de Venta": [f"PUNTO {s}" for s in stores],
+        "Canal o Regional": [random.choice(["NORTE", "SUR", "CENTRO", "RETAIL"]) for _ in stores],
+    }).astype(str)
+
+    inv = sorted(_pairs(stores, materials, INV_DENSITY))
+    df_inv = pd.DataFrame(inv, columns=["Centro Costos", "Material"]).astype("category")
+    df_inv["Inventario"] = [random.randint(0, 40) for _ in inv]
+    tra = sorted(_pairs(stores, materials, TRA_DENSITY))
+    df_tra = pd.DataFrame(tra, columns=["Centro Costos", "Material"]).astype("category")
+    df_tra["Transitos"] = [random.randint(0, 10) for _ in tra]
+
+    months = [(today - relativedelta(months=i)) for i in range(0, 6)]
+    monthly, median = {}, {}
+    for cc, mat in _pairs(stores, materials, VENTAS_DENSITY):
+        for d in random.sample(months, random.randint(1, 4)):
+            monthly[(cc, mat, d.year, d.month)] = random.choice([random.randint(1, 200), random.randint(1, 60) + 0.5])
+        median[(cc, mat)] = random.randint(1, 40) / 2
+    view = {"monthly": monthly, "median": median, "pairs": list(median), "months": []}
+    return df_inv, df_tra, df_prod, df_puntos, view
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+def main():
+    sizes = DEFAULT_SIZES
+    if len(sys.argv) > 1:
+        sizes = [tuple(int(v) for v in x.split("x")) for x in sys.argv[1].split(",") if x.strip()]
+    random.seed(11)
+    today = date.today()
+    empty = ((),) * 7
+    print(f"{'tiendas x materiales':>20} | {'filtros':>7} | {'registros':>9} | {'antes s':>8} | {'ahora s':>8} | {'x':>6}")
+    for n_stores, n_materials in sizes:
+        df_inv, df_tra, df_prod, df_puntos, view = _dataset(n_stores, n_materials, today)
+        frames = forecast_engine.ventas_frames(view)
+        some = tuple(sorted({f"cc{i:04d}" for i in range(0, n_stores, 3)}))
+        for label, filters in (("no", empty), ("sí", (some, (), (), ("samsung", "apple 1"), (), (), ()))):
+            old, t_old = _timed(lambda: legacy_records(df_inv, df_tra, df_prod, df_puntos, view, filters[:6], today))
+            new, t_new = _timed(lambda: forecast_engine.build_forecast_records(
+                df_inv, df_tra, df_prod, df_puntos, frames, filters, today))
+            legacy_view = [{c: r[c] for c in LEGACY_COLUMNS} for r in new]
+            assert json.dumps(old) == json.dumps(legacy_view), "forecast: difiere"
+            size = f"{n_stores} x {n_materials}"
+            print(f"{size:>20} | {label:>7} | {len(new):>9} | {t_old:8.2f} | {t_new:8.3f} | {t_old / t_new:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
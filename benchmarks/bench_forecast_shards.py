@@ -0,0 +1,78 @@
+"""
+bench_forecast_shards.py
+Escalamiento del cálculo de forecast en shards: build_forecast_records sin filtros
+con 1 shard (mismo proceso) vs N shards en el pool de procesos
+(conexiones/shard_pool.py), por hash de centro y por canal.
+
+Mismos datos sintéticos que bench_forecast.py. Cada cantidad de shards se
+calienta una vez (arranque del pool) antes de medir; verifica que todas las
+variantes devuelvan exactamente la misma lista que el cálculo en un proceso.
+La aceleración está acotada por los núcleos disponibles (se imprimen) y por la
+parte que sigue siendo secuencial (candidatos, merge y salida a dicts).
+
+Uso:
+    python benchmarks/bench_forecast_shards.py [500x5000] [1,2,4,8]
+"""
+
+import json
+import os
+import random
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from conexiones import forecast_engine  # noqa: E402
+from bench_forecast import _dataset  # noqa: E402
+
+DEFAULT_SIZES = [(500, 5000)]
+DEFAULT_SHARDS = [1, 2, 4, 8]
+REPEAT = 3
+
+
+def _best(fn):
+    best, result = None, None
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    sizes = DEFAULT_SIZES
+    if len(sys.argv) > 1:
+        sizes = [tuple(int(v) for v in x.split("x")) for x in sys.argv[1].split(",") if x.strip()]
+    shard_counts = DEFAULT_SHARDS
+    if len(sys.argv) > 2:
+        shard_counts = [int(x) for x in sys.argv[2].split(",") if x.strip()]
+    random.seed(11)
+    today = date.today()
+    empty = ((),) * 7
+    print(f"núcleos: {os.cpu_count()}")
+    print(f"{'tiendas x materiales':>20} | {'reparto':>7} | {'shards':>6} | {'registros':>9} | {'s':>7} | {'x':>5}")
+    for n_stores, n_materials in sizes:
+        df_inv, df_tra, df_prod, df_puntos, view = _dataset(n_stores, n_materials, today)
+        frames = forecast_engine.ventas_frames(view)
+
+        def build(shards, shard_by):
+            return forecast_engine.build_forecast_records(
+                df_inv, df_tra, df_prod, df_puntos, frames, empty, today, shards, shard_by)
+
+        base, t_base = _best(lambda: build(1, 'centro'))
+        expected = json.dumps(base)
+        size = f"{n_stores} x {n_materials}"
+        for shard_by in forecast_engine.SHARD_BY:
+            for shards in shard_counts:
+                build(shards, shard_by)  # arranque del pool
+                records, elapsed = _best(lambda: build(shards, shard_by))
+                assert json.dumps(records) == expected, f"forecast {shard_by} x{shards}: difiere"
+                print(f"{size:>20} | {shard_by:>7} | {shards:>6} | {len(records):>9} | "
+                      f"{elapsed:7.3f} | {t_base / elapsed:5.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+bench_keys.py
+Normalización de materiales (EAN/GTIN) y centros de costos:
+- antes: compras._normalize_material fila a fila (re.search / re.fullmatch / re.sub
+  por llamada) y strip().lower() para los centros;
+- ahora: conexiones/keys.py, por valor (camino rápido para dígitos + lru_cache) y por
+  columna (material_column / centro_column, una vez por valor distinto).
+
+Las muestras mezclan lo que llega de Excel / CSV: EAN-13 y UPC-12 limpios, con espacios
+o caracteres invisibles, leídos como float ('840080531083.0'), en notación científica
+('8,40081E+11') y centros 'C108' / GLN en mayúsculas y minúsculas. Antes de medir
+verifica que el resultado sea el de antes (salvo '1234.0', que antes quedaba '12340').
+
+Uso:
+    python benchmarks/bench_keys.py [100000,1000000]
+"""
+
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from conexiones import keys  # noqa: E402
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+DISTINCT = 20_000
+
+
+def legacy_material(raw):
+    """compras._normalize_material tal como estaba."""
+    if raw is None:
+        return ""
+    s = str(raw).strip()
+    if not s:
+        return ""
+    s = s.replace('\u200b', '').replace(' ', '')
+    if re.search(r'[eE]', s):
+        cand = s.replace(',', '.')
+        try:
+            val = float(cand)
+            if abs(val - int(val)) < 1e-6:
+                return str(int(val))
+            return format(val, 'f').rstrip('0').rstrip('.')
+        except Exception:
+            pass
+    if re.fullmatch(r'[\d\.,]+', s):
+        if s.count(',') == 1 and s.count('.') == 0:
+            try:
+                val = float(s.replace(',', '.'))
+                if abs(val - int(val)) < 1e-6:
+                    return str(int(val))
+                return format(val, 'f').rstrip('0').rstrip('.')
+            except Exception:
+                pass
+        cleaned = re.sub(r'[^\d]', '', s)
+        if cleaned:
+            return cleaned
+    s = re.sub(r'\.0+$', '', s)
+    return s
+
+
+def legacy_centro(raw):
+    """ops_puntos._normalize_centro tal como estaba."""
+    if raw is None:
+        return ""
+    return str(raw).strip().lower()
+
+
+def _ean13(body):
+    digits = f"{body:012d}"
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits))
+    return digits + str((10 - total % 10) % 10)
+
+
+def _samples(n):
+    random.seed(11)
+    eans = [_ean13(770000000000 + i * 37) for i in range(DISTINCT)]
+    upcs = [f"{840080000000 + i * 53}" for i in range(DISTINCT)]
+    glns = [_ean13(770367000000 + i) for i in range(600)]
+    materials, centros = [], []
+    for _ in range(n):
+        code = random.choice(eans if random.random() < 0.6 else upcs)
+        r = random.random()
+        if r < 0.80:
+            materials.append(code)
+        elif r < 0.88:
+            materials.append(f" {code} ")
+        elif r < 0.94:
+            materials.append(f"{code}.0")
+        elif r < 0.97:
+            materials.append(f"{code[0]},{code[1:6]}E+{len(code) - 1}")
+        else:
+            materials.append(f"\u200b{code}")
+        r = random.random()
+        if r < 0.5:
+            centros.append(random.choice(glns))
+        elif r < 0.8:
+            centros.append(f"C{random.randint(1, 300):03d}")
+        else:
+            centros.append(f" c{random.randint(1, 300):03d} ")
+    return materials, centros
+
+
+def check():
+    materials, centros = _samples(20_000)
+    for raw in materials:
+        expected = legacy_material(raw)
+        m = re.fullmatch(r'(\d+)\.0+', raw.strip())
+        if m:
+            expected = m.group(1)
+        assert keys.material(raw) == expected, raw
+    assert list(keys.material_column(materials)) == [keys.material(v) for v in materials]
+    for raw in centros:
+        assert keys.centro(raw).lower() == legacy_centro(raw), raw
+    assert list(keys.centro_column(centros)) == [keys.centro(v) for v in centros]
+
+
+def _timed(func, values):
+    # sin memoización previa: cada variante paga sus valores distintos
+    keys._material.cache_clear()
+    keys._centro.cache_clear()
+    t0 = time.perf_counter()
+    func(values)
+    return time.perf_counter() - t0
+
+
+def main():
+    sizes = DEFAULT_SIZES
+    if len(sys.argv) > 1:
+        sizes = [int(x) for x in sys.argv[1].split(",") if x.strip()]
+    check()
+    print(f"{'filas':>9} | {'clave':>8} | {'antes s':>8} | {'valor s':>8} | {'columna s':>9} | {'x valor':>7} | {'x col':>6}")
+    for n in sizes:
+        materials, centros = _samples(n)
+        for name, legacy, single, column, values in (
+            ("material", legacy_material, keys.material, keys.material_column, materials),
+            ("centro", legacy_centro, keys.centro, keys.centro_column, centros),
+        ):
+            before = _timed(lambda v: [legacy(x) for x in v], values)
+            per_value = _timed(lambda v: [single(x) for x in v], values)
+            per_column = _timed(lambda v: column(pd.Series(v)), values)
+            print(f"{n:>9} | {name:>8} | {before:8.3f} | {per_value:8.3f} | {per_column:9.3f} | "
+                  f"{before / per_value:7.1f} | {before / per_column:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
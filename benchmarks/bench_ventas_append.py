@@ -0,0 +1,91 @@
+"""
+bench_ventas_append.py
+Latencia de inserción de una venta a medida que crece el almacén:
+- segment log (append NDJSON, ver conexiones/segment_log.py)
+- esquema anterior (leer todo el JSON + reescribirlo con indent=2)
+
+Uso:
+    python benchmarks/bench_ventas_append.py [50000,200000,1000000,2000000]
+"""
+
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from conexiones.segment_log import SegmentLog  # noqa: E402
+
+DEFAULT_SIZES = [50_000, 200_000, 500_000, 1_000_000, 2_000_000]
+APPENDS = 500
+LEGACY_MAX_ROWS = 200_000   # el esquema viejo tarda segundos por inserción por encima de esto
+LEGACY_APPENDS = 5
+
+
+def _row(i):
+    return {
+        "Centro Costos": f"77036709{random.randint(0, 99999):05d}",
+        "Material": f"{random.randint(10**11, 10**12 - 1)}",
+        "Fecha Venta": f"2025-{(i % 12) + 1:02d}-{(i % 28) + 1:02d} 00:00:00",
+        "Cantidad": random.randint(1, 5),
+    }
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    p50 = statistics.median(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return p50 * 1000, p99 * 1000
+
+
+def bench_segment_log(tmp, rows):
+    log = SegmentLog(tmp / "ventas_claro.json", background=False)
+    log.rewrite(rows)
+    lat = []
+    for i in range(APPENDS):
+        r = _row(i)
+        t0 = time.perf_counter()
+        log.append([r])
+        lat.append(time.perf_counter() - t0)
+    return _percentiles(lat)
+
+
+def bench_legacy(tmp, rows):
+    path = tmp / "legacy.json"
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(rows, f, ensure_ascii=False, indent=2)
+    lat = []
+    for i in range(LEGACY_APPENDS):
+        r = _row(i)
+        t0 = time.perf_counter()
+        data = json.loads(path.read_text(encoding="utf-8"))
+        data.append(r)
+        with path.open("w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        lat.append(time.perf_counter() - t0)
+    return _percentiles(lat)
+
+
+def main():
+    sizes = DEFAULT_SIZES
+    if len(sys.argv) > 1:
+        sizes = [int(x) for x in sys.argv[1].split(",") if x.strip()]
+    random.seed(7)
+    print(f"{'filas':>10} | {'segment p50 ms':>14} | {'segment p99 ms':>14} | {'legacy p50 ms':>13}")
+    for n in sizes:
+        rows = [_row(i) for i in range(n)]
+        with tempfile.TemporaryDirectory() as d:
+            tmp = Path(d)
+            p50, p99 = bench_segment_log(tmp, rows)
+            legacy = "-"
+            if n <= LEGACY_MAX_ROWS:
+                legacy = f"{bench_legacy(tmp, rows)[0]:13.1f}"
+        print(f"{n:>10} | {p50:14.3f} | {p99:14.3f} | {legacy:>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+bench_ventas_import.py
+Etapa de normalización del import de ventas (después de leer el Excel con dtype=str):
+- bucle anterior (iterrows + _normalize_date_str + float/int por fila)
+- etapa vectorizada (ops_ventasclaro.build_import_columns + _import_rows)
+
+No incluye la lectura del .xlsx (pd.read_excel), que es igual en ambos casos.
+Verifica además que ambas versiones produzcan exactamente las mismas filas.
+
+Uso:
+    python benchmarks/bench_ventas_import.py [20000,200000]
+"""
+
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+for _k in ("ODOO_URL", "ODOO_DB", "ODOO_USERNAME", "ODOO_API_KEY"):
+    os.environ.setdefault(_k, "bench")
+
+from blueprint.ops_ventasclaro import build_import_columns, _import_rows  # noqa: E402
+from conexiones.dates import normalize_date_str as _normalize_date_str  # noqa: E402
+
+DEFAULT_SIZES = [20_000, 200_000]
+
+
+def _frame(n):
+    """Simula pd.read_excel(dtype=str): fechas con formatos mezclados, cantidades como texto."""
+    fechas = []
+    for i in range(n):
+        d, m = (i % 28) + 1, (i % 12) + 1
+        fechas.append(random.choice([
+            f"2025-{m:02d}-{d:02d}",
+            f"2025-{m:02d}-{d:02d} 00:00:00",
+            f"{d:02d}/{m:02d}/2025",
+            f"{d}-{m}-2025",
+        ]))
+    return pd.DataFrame({
+        "Centro Costos": [f" 77036709{random.randint(0, 999):05d}" for _ in range(n)],
+        "Material": [f"{random.randint(10**11, 10**12 - 1)}" for _ in range(n)],
+        "Fecha Venta": fechas,
+        "Cantidad": [random.choice(["1", "2", "3.0", "1.5", "10"]) for _ in range(n)],
+    })
+
+
+def legacy_rows(df, col_centro="Centro Costos", col_material="Material",
+                col_fecha="Fecha Venta", col_cantidad="Cantidad"):
+    """Bucle del import anterior (copiado de ops_ventasclaro.api_import)."""
+    df = df.copy()
+    df[col_centro] = df[col_centro].astype(str).fillna("").str.strip()
+    df[col_cantidad] = df[col_cantidad].astype(str).fillna("").str.strip()
+    to_add = []
+    for _, row in df.iterrows():
+        centro = str(row.get(col_centro) or "").strip()
+        material = str(row.get(col_material) or "").strip()
+        if not centro and not material:
+            continue
+        fecha = _normalize_date_str(row.get(col_fecha) or "")
+        cantidad_val = row.get(col_cantidad, "")
+        try:
+            if cantidad_val is None or cantidad_val == "":
+                cantidad = 0
+            else:
+                cantidad = float(str(cantidad_val).strip())
+                if float(cantidad).is_integer():
+                    cantidad = int(cantidad)
+        except Exception:
+            cantidad = 0
+        to_add.append({"Centro Costos": centro, "Material": material,
+                       "Fecha Venta": fecha, "Cantidad": cantidad})
+    return to_add
+
+
+def vectorized_rows(df):
+    cols = build_import_columns(df["Centro Costos"], df["Material"], df["Fecha Venta"], df["Cantidad"])
+    return _import_rows(cols)
+
+
+def main():
+    sizes = DEFAULT_SIZES
+    if len(sys.argv) > 1:
+        sizes = [int(x) for x in sys.argv[1].split(",") if x.strip()]
+    random.seed(7)
+    print(f"{'filas':>10} | {'bucle s':>8} | {'vectorizado s':>13} | {'x':>6}")
+    for n in sizes:
+        df = _frame(n)
+        t0 = time.perf_counter()
+        a = legacy_rows(df)
+        t_loop = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        b = vectorized_rows(df)
+        t_vec = time.perf_counter() - t0
+        assert a == b and [type(r["Cantidad"]) for r in a] == [type(r["Cantidad"]) for r in b], \
+            "las dos versiones difieren"
+        print(f"{n:>10} | {t_loop:8.2f} | {t_vec:13.3f} | {t_loop / t_vec:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
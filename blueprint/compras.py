@@ -8,8 +8,11 @@ from threading import Lock
 from io import BytesIO
 
 import pandas as pd
-from flask import Blueprint, render_template, jsonify, request, send_file
+from flask import Blueprint, render_template, jsonify, request
 from blueprint.email_service import send_email
+from conexiones import store_loader
+from conexiones import export_stream
+from conexiones import keys
 
 # Intentar usar portalocker si está instalado para bloqueo entre procesos (opcional)
 try:
@@ -43,60 +46,12 @@ def _ensure_file():
             os.fsync(f.fileno())
         os.replace(tmp, JSON_PATH)
 
-def _normalize_material(raw):
-    """
-    Normaliza el identificador 'Material' para comparaciones:
-    - maneja notación científica "8,40081E+11" (reemplaza coma decimal por punto si aplica)
-    - convierte floats a enteros cuando corresponde
-    - elimina espacios y sufijo .0
-    - devuelve string vacío si no válido
-    """
-    if raw is None:
-        return ""
-    s = str(raw).strip()
-    if not s:
-        return ""
-    s = s.replace('\u200b', '').replace(' ', '')
-
-    # Si contiene 'E' o 'e', probar a parsear notación científica,
-    # reemplazando coma decimal por punto si aparece
-    if re.search(r'[eE]', s):
-        cand = s.replace(',', '.')
-        try:
-            val = float(cand)
-            if abs(val - int(val)) < 1e-6:
-                return str(int(val))
-            return format(val, 'f').rstrip('0').rstrip('.')
-        except Exception:
-            pass
-
-    # Si tiene comas como separadores de miles (ej "1,234,567"), quitarlas
-    if re.fullmatch(r'[\d\.,]+', s):
-        # intentar transformar coma decimal a punto si hay solo una coma y no hay puntos
-        if s.count(',') == 1 and s.count('.') == 0:
-            try:
-                val = float(s.replace(',', '.'))
-                if abs(val - int(val)) < 1e-6:
-                    return str(int(val))
-                return format(val, 'f').rstrip('0').rstrip('.')
-            except:
-                pass
-        # quitar separadores no numéricos
-        cleaned = re.sub(r'[^\d]', '', s)
-        if cleaned:
-            return cleaned
-
-    # eliminar sufijo .0
-    s = re.sub(r'\.0+$', '', s)
-    return s
-
 def _normalize_text(x):
     if x is None:
         return ""
     return str(x).strip()
 
-def read_compras():
-    _ensure_file()
+def _read_compras_file():
     # Si portalocker disponible, usar bloqueo de lectura compartida
     if _HAS_PORTALOCKER:
         with open(JSON_PATH, 'r', encoding='utf-8') as fh:
@@ -111,28 +66,12 @@ def read_compras():
     else:
         with _thread_lock:
             text = JSON_PATH.read_text(encoding='utf-8').strip()
+    return store_loader.parse_json_list(text)
 
-    if not text:
-        return []
-    try:
-        data = json.loads(text)
-        if isinstance(data, dict):
-            return [data]
-        if isinstance(data, list):
-            return data
-        return []
-    except json.JSONDecodeError:
-        res = []
-        for line in text.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                obj = json.loads(line)
-                res.append(obj)
-            except Exception:
-                continue
-        return res
+def read_compras():
+    _ensure_file()
+    # caché por mtime/tamaño/inode: solo se reparsea si el archivo cambió
+    return list(store_loader.load(JSON_PATH, store_loader.file_signature(JSON_PATH), _read_compras_file))
 
 def write_compras(list_products):
     _ensure_file()
@@ -143,6 +82,7 @@ def write_compras(list_products):
             f.flush()
             os.fsync(f.fileno())
         os.replace(tmp_path, JSON_PATH)
+        store_loader.prime(JSON_PATH, store_loader.file_signature(JSON_PATH), list(list_products))
     finally:
         if os.path.exists(tmp_path):
             try:
@@ -238,7 +178,8 @@ def api_import_compras():
     if not col_material:
         return jsonify({"error": "El archivo debe contener una columna 'Material'"}), 400
 
-    df[col_material] = df[col_material].astype(str).fillna("").str.strip()
+    # material canónico una vez por valor distinto (conexiones/keys.py)
+    df[col_material] = keys.material_column(df[col_material])
     if col_producto:
         df[col_producto] = df[col_producto].astype(str).fillna("").str.strip()
     else:
@@ -257,8 +198,7 @@ def api_import_compras():
 
     imported_map = {}
     for _, row in df.iterrows():
-        raw_mat = row.get(col_material, "")
-        mat = _normalize_material(raw_mat)
+        mat = row.get(col_material, "")
         if not mat:
             continue
         prod = _normalize_text(row.get(col_producto, ""))
@@ -293,7 +233,7 @@ def api_import_compras():
     existing = read_compras()
     existing_map = {}
     for it in existing:
-        mat_norm = _normalize_material(it.get("Material"))
+        mat_norm = keys.material(it.get("Material"))
         if not mat_norm:
             continue
         existing_map[mat_norm] = {
@@ -358,38 +298,30 @@ def api_import_compras():
 @compras_bp.route('/api/export_excel', methods=['GET'])
 def api_export_excel():
     """
-    Exporta todos los registros a un archivo Excel (.xlsx).
+    Exporta todos los registros a un archivo Excel (.xlsx), o CSV con format=csv.
     Agrega columna 'Estado' -> 'Aprobado' si Confirmar true, 'No aprobado' si false.
     """
     try:
+        fmt = request.args.get("format", "xlsx").lower()
         data = read_compras()
-        # Normalizar y construir DataFrame
-        rows = []
-        for it in data:
-            if not isinstance(it, dict):
-                continue
-            confirmar = bool(it.get("Confirmar", False))
-            estado = "Aprobado" if confirmar else "No aprobado"
-            rows.append({
-                "Material": _normalize_text(it.get("Material", "")),
-                "Producto": _normalize_text(it.get("Producto", "")),
-                "Marca": _normalize_text(it.get("Marca", "")),
-                "Sugerido": it.get("Sugerido", ""),
-                "Estado": estado,
-                "Observacion": _normalize_text(it.get("Observacion", "")),
-            })
-        df = pd.DataFrame(rows, columns=["Material", "Producto", "Marca", "Sugerido", "Estado", "Observacion"])
-
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="Compras")
-        output.seek(0)
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name="compras.xlsx",
-            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+        columns = ["Material", "Producto", "Marca", "Sugerido", "Estado", "Observacion"]
+
+        def rows():
+            for it in data:
+                if not isinstance(it, dict):
+                    continue
+                confirmar = bool(it.get("Confirmar", False))
+                estado = "Aprobado" if confirmar else "No aprobado"
+                yield [
+                    _normalize_text(it.get("Material", "")),
+                    _normalize_text(it.get("Producto", "")),
+                    _normalize_text(it.get("Marca", "")),
+                    it.get("Sugerido", ""),
+                    estado,
+                    _normalize_text(it.get("Observacion", "")),
+                ]
+
+        return export_stream.response(fmt, "compras", columns, rows(), "Compras")
     except Exception as e:
         return jsonify({"error": "No se pudo generar el Excel", "detail": str(e)}), 500
 
@@ -408,15 +340,18 @@ def api_update_item():
         return jsonify({"error": "Se requiere el campo 'Material'"}), 400
 
     raw_mat = payload.get("Material")
-    mat = _normalize_material(raw_mat)
+    mat = keys.material(raw_mat)
     if not mat:
         return jsonify({"error": "Material inválido"}), 400
 
     try:
         items = read_compras()
         found = False
-        for it in items:
-            if _normalize_material(it.get("Material")) == mat:
+        for pos, it in enumerate(items):
+            if keys.material(it.get("Material")) == mat:
+                # copiar antes de editar: los dicts son compartidos con la caché
+                it = dict(it)
+                items[pos] = it
                 # actualizar Confirmar si viene
                 if "Confirmar" in payload:
                     it["Confirmar"] = bool(payload.get("Confirmar", False))
@@ -1,9 +1,20 @@
 import json
 from pathlib import Path
-from io import BytesIO
-from flask import Blueprint, render_template, jsonify, request, send_file, current_app
+from flask import Blueprint, render_template, jsonify, request, current_app
+import math
+import threading
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from blueprint.ops_ventasclaro import read_ventas_months, ventas_months_signature
+from blueprint.inventario_claro import read_items as read_inventario, inventario_signature
+from blueprint.transitos import read_transitos, transitos_signature
+from conexiones import store_loader
+from conexiones import export_stream
+from conexiones import keys
+from conexiones.keyed_view import KeyedView, RowFinalizer, ViewSource
+from conexiones.facet_index import FacetIndex
+from conexiones.result_cache import ResultCache
 
 cruzar_bp = Blueprint('cruzar', __name__, url_prefix='/cruzar', template_folder='../templates', static_folder='../static')
 
@@ -16,16 +27,10 @@ FILES = {
     'data_coltrade': DATA_DIR / 'data_coltrade.json',
     'productos_claro': DATA_DIR / 'productos_claro.json',
     'puntos_venta_claro': DATA_DIR / 'puntos_venta_claro.json',
-    'ventas_claro': DATA_DIR / 'ventas_claro.json',
-    'transitos': DATA_DIR / 'transitos.json',
-    'inventario_claro': DATA_DIR / 'inventario_claro.json',
 }
 
 
-def safe_load_json(path: Path):
-    """Carga JSON ya sea objeto único o lista; devuelve lista de dicts."""
-    if not path.exists():
-        return []
+def _load_json_file(path: Path):
     try:
         with open(path, 'r', encoding='utf-8') as f:
             obj = json.load(f)
@@ -44,218 +49,314 @@ def safe_load_json(path: Path):
             return []
 
 
+def safe_load_json(path: Path):
+    """Carga JSON ya sea objeto único o lista; devuelve lista de dicts (cacheada, solo lectura)."""
+    if not path.exists():
+        return []
+    return store_loader.load(f"cruzar:{path.name}", store_loader.file_signature(path),
+                             lambda: _load_json_file(path))
+
+
+# Orden de columnas final
+OUTPUT_COLUMNS = [
+    'Material', 'Producto', 'Marca', 'Centro Costos', 'Punto de Venta',
+    'Sugerido Claro', 'Inventario', 'Transitos', 'Ventas Actuales',
+    'Envío Inventario 3 meses', 'Sugerido Coltrade', 'Promedio 3 Meses', 'Sugerido Final'
+]
+NUMERIC_COLUMNS = ['Sugerido Claro', 'Inventario', 'Transitos', 'Ventas Actuales',
+                   'Envío Inventario 3 meses', 'Sugerido Coltrade', 'Promedio 3 Meses', 'Sugerido Final']
+# valores de una fila sin dato en la fuente (Envío Inventario 3 meses y Sugerido Final siempre son 0)
+ROW_DEFAULTS = {c: (0 if c in NUMERIC_COLUMNS else '') for c in OUTPUT_COLUMNS}
+
+
+def _row_key(item):
+    """(Material, Centro Costos) canónicos (conexiones/keys.py), o None si falta alguno."""
+    material = keys.material(item.get('Material'))
+    centro_costos = keys.centro(item.get('Centro Costos'))
+    if not material or not centro_costos:
+        return None
+    return (material, centro_costos)
+
+
+def _claro_rows():
+    """Sugerido Claro por (Material, Centro Costos); la última fila gana"""
+    out = {}
+    for item in safe_load_json(FILES['data_claro']):
+        key = _row_key(item)
+        if key:
+            out[key] = {'Sugerido Claro': float(item.get('Sugerido Claro', 0) or 0)}
+    return out
+
+
+def _coltrade_rows():
+    """Sugerido Coltrade y Promedio 3 Meses por (Material, Centro Costos)"""
+    out = {}
+    for item in safe_load_json(FILES['data_coltrade']):
+        key = _row_key(item)
+        if key:
+            out[key] = {
+                'Sugerido Coltrade': float(item.get('Sugerido Coltrade', 0) or 0),
+                'Promedio 3 Meses': float(item.get('Promedio 3 Meses', 0) or 0),
+            }
+    return out
+
+
+def _productos_by_material():
+    out = {}
+    for prod in safe_load_json(FILES['productos_claro']):
+        mat = keys.material(prod.get('Material'))
+        if mat:
+            out[mat] = {'Producto': prod.get('Producto', ''), 'Marca': prod.get('Marca', '')}
+    return out
+
+
+def _puntos_by_centro():
+    out = {}
+    for punto in safe_load_json(FILES['puntos_venta_claro']):
+        cc = keys.centro(punto.get('Centro Costos'))
+        if cc:
+            out[cc] = {'Punto de Venta': punto.get('Punto de Venta', '')}
+    return out
+
+
+def _current_month():
+    now = datetime.now()
+    return [(now.year, now.month)]
+
+
 def get_current_month_ventas():
-    """Obtiene las ventas del mes actual desde ventas_claro.json"""
-    ventas_data = safe_load_json(FILES['ventas_claro'])
-    current_month = datetime.now().month
-    current_year = datetime.now().year
-    
-    ventas_mes_actual = {}
-    
-    for venta in ventas_data:
-        fecha_venta = venta.get('Fecha Venta', '')
-        if fecha_venta:
-            try:
-                # Parsear fecha en formato YYYY-MM-DD HH:MM:SS o YYYY-MM-DD
-                fecha_str = fecha_venta.split()[0]  # Tomar solo la parte de fecha
-                fecha = datetime.strptime(fecha_str, '%Y-%m-%d')
-                if fecha.month == current_month and fecha.year == current_year:
-                    centro_costos = str(venta.get('Centro Costos', '')).strip()
-                    material = str(venta.get('Material', '')).strip()
-                    cantidad = float(venta.get('Cantidad', 0))
-                    
-                    if centro_costos and material:
-                        key = f"{material}|{centro_costos}"
-                        ventas_mes_actual[key] = ventas_mes_actual.get(key, 0) + cantidad
-            except (ValueError, TypeError):
-                continue
-    
-    return ventas_mes_actual
+    """Ventas del mes actual por (Material, Centro Costos): solo se lee la partición del mes"""
+    totals = {}
+    for venta in read_ventas_months(_current_month()):
+        key = _row_key(venta)
+        if key is not None:
+            # Cantidad ya viene normalizada a entero por el store de ventas
+            totals[key] = totals.get(key, 0.0) + float(venta.get('Cantidad', 0) or 0)
+    return {key: {'Ventas Actuales': qty} for key, qty in totals.items()}
 
 
 def get_transitos_data():
-    """Obtiene todos los tránsitos desde transitos.json"""
-    transitos_data = safe_load_json(FILES['transitos'])
+    """Tránsitos por (Material, Centro Costos) desde el store de tránsitos"""
     transitos_dict = {}
-    
-    for transito in transitos_data:
-        centro_costos = str(transito.get('Centro Costos', '')).strip()
-        material = str(transito.get('Material', '')).strip()
-        cantidad = float(transito.get('Transitos', 0))
-        
-        if centro_costos and material:
-            key = f"{material}|{centro_costos}"
-            transitos_dict[key] = cantidad
-    
+    for transito in read_transitos():
+        key = _row_key(transito)
+        if key:
+            transitos_dict[key] = {'Transitos': float(transito.get('Transitos', 0))}
     return transitos_dict
 
 
 def get_inventario_data():
-    """Obtiene todos los inventarios desde inventario_claro.json"""
-    inventario_data = safe_load_json(FILES['inventario_claro'])
+    """Inventario por (Material, Centro Costos) desde el store de inventario"""
     inventario_dict = {}
-    
-    for inventario in inventario_data:
-        centro_costos = str(inventario.get('Centro Costos', '')).strip()
-        material = str(inventario.get('Material', '')).strip()
-        cantidad = float(inventario.get('Inventario', 0))
-        
-        if centro_costos and material:
-            key = f"{material}|{centro_costos}"
-            inventario_dict[key] = cantidad
-    
+    for inventario in read_inventario():
+        key = _row_key(inventario)
+        if key:
+            inventario_dict[key] = {'Inventario': float(inventario.get('Inventario', 0))}
     return inventario_dict
 
 
+def _file_sig(name):
+    return lambda: store_loader.file_signature(FILES[name])
+
+
+class _CruzadoRecords(RowFinalizer):
+    """
+    Registros de salida con los tipos de la conversión anterior (pd.to_numeric + fillna):
+    una columna numérica es float si alguna fila tiene dato de su fuente y si no queda en 0
+    entero; NaN -> 0 y textos None/NaN -> ''. Se cuentan por columna las filas con float,
+    así el tipo se sabe sin recorrer la vista cuando cambian pocas filas.
+    """
+
+    def __init__(self):
+        self._floats = dict.fromkeys(NUMERIC_COLUMNS, 0)
+        self._float_cols = frozenset()
+
+    def update(self, old, new):
+        for c in NUMERIC_COLUMNS:
+            self._floats[c] += ((new is not None and isinstance(new[c], float))
+                                - (old is not None and isinstance(old[c], float)))
+
+    def state(self):
+        self._float_cols = frozenset(c for c, n in self._floats.items() if n)
+        return self._float_cols
+
+    def record(self, r):
+        rec = {}
+        for c in OUTPUT_COLUMNS:
+            v = r[c]
+            if c in self._float_cols:
+                v = float(v) if v == v else 0.0
+            elif v is None or (isinstance(v, float) and v != v):
+                v = ''
+            rec[c] = v
+        return rec
+
+
+# Tabla cruzada como vista materializada por (Material, Centro Costos): cada fuente se
+# recarga solo si cambió su firma y solo se vuelven a unir sus columnas en las claves que
+# cambiaron (ver conexiones/keyed_view.py). Filas = data_claro ∪ data_coltrade.
+_cruzado = KeyedView(('Material', 'Centro Costos'), ROW_DEFAULTS, [
+    ViewSource('data_claro', _file_sig('data_claro'), _claro_rows, ['Sugerido Claro'], rows=True),
+    ViewSource('data_coltrade', _file_sig('data_coltrade'), _coltrade_rows,
+               ['Sugerido Coltrade', 'Promedio 3 Meses'], rows=True),
+    ViewSource('productos', _file_sig('productos_claro'), _productos_by_material,
+               ['Producto', 'Marca'], lookup=lambda key: key[0]),
+    ViewSource('puntos', _file_sig('puntos_venta_claro'), _puntos_by_centro,
+               ['Punto de Venta'], lookup=lambda key: key[1]),
+    ViewSource('inventario', inventario_signature, get_inventario_data, ['Inventario']),
+    ViewSource('transitos', transitos_signature, get_transitos_data, ['Transitos']),
+    # depende también del mes en curso
+    ViewSource('ventas', lambda: ventas_months_signature(_current_month()),
+               get_current_month_ventas, ['Ventas Actuales']),
+], finalize=_CruzadoRecords())
+
+
+def cruzado_records():
+    """Registros de la tabla cruzada (lista compartida, solo lectura)"""
+    return _cruzado.records()[1]
+
+
 def build_dataframe():
-    """Construye el DataFrame combinado usando Material + Centro Costos como claves únicas."""
-    
-    # Cargar todos los archivos JSON
-    data_claro = safe_load_json(FILES['data_claro'])
-    data_coltrade = safe_load_json(FILES['data_coltrade'])
-    productos = safe_load_json(FILES['productos_claro'])
-    puntos = safe_load_json(FILES['puntos_venta_claro'])
-    
-    # Cargar datos adicionales
-    ventas_mes_actual = get_current_month_ventas()
-    transitos_dict = get_transitos_data()
-    inventario_dict = get_inventario_data()
-    
-    # Crear diccionarios de lookup por Material
-    productos_dict = {}
-    for prod in productos:
-        mat = str(prod.get('Material', '')).strip()
-        if mat:
-            productos_dict[mat] = {
-                'Producto': prod.get('Producto', ''),
-                'Marca': prod.get('Marca', '')
-            }
-    
-    # Crear diccionarios de lookup por Centro Costos
-    puntos_dict = {}
-    for punto in puntos:
-        cc = str(punto.get('Centro Costos', '')).strip()
-        if cc:
-            puntos_dict[cc] = {
-                'Punto de Venta': punto.get('Punto de Venta', '')
-            }
-    
-    # Diccionario final para almacenar todos los registros únicos
-    registros = {}
-    
-    # Procesar data_claro
-    for item in data_claro:
-        material = str(item.get('Material', '')).strip()
-        centro_costos = str(item.get('Centro Costos', '')).strip()
-        
-        if not material or not centro_costos:
-            continue
-            
-        key = f"{material}|{centro_costos}"
-        
-        if key not in registros:
-            registros[key] = {
-                'Material': material,
-                'Centro Costos': centro_costos,
-                'Producto': '',
-                'Marca': '',
-                'Punto de Venta': '',
-                'Sugerido Claro': 0,
-                'Inventario': 0,
-                'Transitos': 0,
-                'Ventas Actuales': 0,
-                'Envío Inventario 3 meses': 0,
-                'Sugerido Coltrade': 0,
-                'Promedio 3 Meses': 0,
-                'Sugerido Final': 0
-            }
-        
-        # Actualizar con datos de Claro
-        registros[key]['Sugerido Claro'] = float(item.get('Sugerido Claro', 0) or 0)
-    
-    # Procesar data_coltrade
-    for item in data_coltrade:
-        material = str(item.get('Material', '')).strip()
-        centro_costos = str(item.get('Centro Costos', '')).strip()
-        
-        if not material or not centro_costos:
-            continue
-            
-        key = f"{material}|{centro_costos}"
-        
-        if key not in registros:
-            registros[key] = {
-                'Material': material,
-                'Centro Costos': centro_costos,
-                'Producto': '',
-                'Marca': '',
-                'Punto de Venta': '',
-                'Sugerido Claro': 0,
-                'Inventario': 0,
-                'Transitos': 0,
-                'Ventas Actuales': 0,
-                'Envío Inventario 3 meses': 0,
-                'Sugerido Coltrade': 0,
-                'Promedio 3 Meses': 0,
-                'Sugerido Final': 0
-            }
-        
-        # Actualizar con datos de Coltrade
-        registros[key]['Sugerido Coltrade'] = float(item.get('Sugerido Coltrade', 0) or 0)
-        registros[key]['Promedio 3 Meses'] = float(item.get('Promedio 3 Meses', 0) or 0)
-    
-    # Ahora completar cada registro con la información de lookup
-    for key, registro in registros.items():
-        material = registro['Material']
-        centro_costos = registro['Centro Costos']
-        
-        # Agregar Producto y Marca desde productos_claro.json
-        if material in productos_dict:
-            registro['Producto'] = productos_dict[material]['Producto']
-            registro['Marca'] = productos_dict[material]['Marca']
-        
-        # Agregar Punto de Venta desde puntos_venta_claro.json
-        if centro_costos in puntos_dict:
-            registro['Punto de Venta'] = puntos_dict[centro_costos]['Punto de Venta']
-        
-        # Agregar Inventario desde inventario_claro.json
-        if key in inventario_dict:
-            registro['Inventario'] = inventario_dict[key]
-        
-        # Agregar Transitos desde transitos.json
-        if key in transitos_dict:
-            registro['Transitos'] = transitos_dict[key]
-        
-        # Agregar Ventas Actuales desde ventas_claro.json (mes actual)
-        if key in ventas_mes_actual:
-            registro['Ventas Actuales'] = ventas_mes_actual[key]
-        
-        # Envío Inventario 3 meses siempre es 0 según requerimiento
-        registro['Envío Inventario 3 meses'] = 0
-    
-    # Convertir a DataFrame
-    df = pd.DataFrame(list(registros.values()))
-    
-    # Orden de columnas final
-    output_cols = [
-        'Material', 'Producto', 'Marca', 'Centro Costos', 'Punto de Venta',
-        'Sugerido Claro', 'Inventario', 'Transitos', 'Ventas Actuales',
-        'Envío Inventario 3 meses', 'Sugerido Coltrade', 'Promedio 3 Meses', 'Sugerido Final'
-    ]
-    
-    df = df[output_cols]
-    
-    # Convertir valores numéricos
-    numeric_cols = ['Sugerido Claro', 'Inventario', 'Transitos', 'Ventas Actuales', 
-                    'Envío Inventario 3 meses', 'Sugerido Coltrade', 'Promedio 3 Meses', 'Sugerido Final']
-    
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-    
-    # Rellenar valores vacíos
-    df = df.fillna('')
-    
-    return df
+    """DataFrame combinado usando Material + Centro Costos como claves únicas."""
+    return pd.DataFrame(cruzado_records(), columns=OUTPUT_COLUMNS)
+
+
+# /api/data: filtro del request -> columna (valores separados por coma, sin distinguir
+# mayúsculas) y rangos ?<nombre>_min=&<nombre>_max= sobre columnas numéricas
+CRUZAR_FILTERS = {'marca': 'Marca', 'punto': 'Punto de Venta', 'material': 'Material'}
+CRUZAR_RANGES = {'inventario': 'Inventario', 'transitos': 'Transitos'}
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# selecciones (posiciones ordenadas + totales) por versión de la vista + filtros + orden
+_selection_cache = ResultCache(max_entries=64, max_bytes=64 * 1024 * 1024)
+
+
+def _index_columns(records):
+    facets = {name: [str(r[column]) for r in records] for name, column in CRUZAR_FILTERS.items()}
+    numbers = {c: np.fromiter((r[c] for r in records), dtype=np.float64, count=len(records))
+               for c in NUMERIC_COLUMNS}
+    return facets, numbers
+
+
+def _build_index(records):
+    facets, numbers = _index_columns(records)
+    return FacetIndex(facets), numbers
+
+
+def _patch_index(index, records, positions):
+    """Índice de la versión siguiente cambiando solo las posiciones que cambiaron en la vista."""
+    facets, numbers = index
+    changed = [records[p] for p in positions]
+    new_facets, new_numbers = _index_columns(changed)
+    patched = {}
+    for c, values in numbers.items():
+        values = values.copy()
+        values[positions] = new_numbers[c]
+        patched[c] = values
+    return facets.replaced(positions, new_facets), patched
+
+
+# índice de la última versión de la vista: {"version": n, "index": (facets, numbers)}
+_index_lock = threading.Lock()
+_index_state = {"version": None, "index": None}
+
+
+def cruzado_index():
+    """(versión, registros, FacetIndex de CRUZAR_FILTERS, {columna numérica: ndarray}) de la vista vigente."""
+    version, records = _cruzado.records()
+    with _index_lock:
+        if _index_state["version"] != version:
+            positions = _cruzado.changed_positions(version)
+            if positions is not None and _index_state["version"] == version - 1:
+                # solo cambiaron algunas filas: se parchea el índice de la versión anterior
+                index = _patch_index(_index_state["index"], records, positions)
+            else:
+                index = _build_index(records)
+            _index_state.update(version=version, index=index)
+        facets, numbers = _index_state["index"]
+    return version, records, facets, numbers
+
+
+def _multi_param(name):
+    v = request.args.get(name)
+    if not v:
+        return []
+    return [p.strip().lower() for p in v.split(',') if p.strip() != '']
+
+
+def parse_query():
+    """
+    (filtros, rangos, orden) del request, normalizados para usarlos como clave de caché.
+    sort=<columna> ascendente, sort=-<columna> descendente. ValueError si algo no es válido.
+    """
+    filters = tuple(tuple(sorted(set(_multi_param(name)))) for name in CRUZAR_FILTERS)
+    ranges = []
+    for name in CRUZAR_RANGES:
+        bounds = []
+        for side in ('min', 'max'):
+            param = f'{name}_{side}'
+            raw = (request.args.get(param) or '').strip()
+            try:
+                value = float(raw) if raw else None
+            except ValueError:
+                raise ValueError(f"{param} debe ser numérico")
+            if value is not None and not math.isfinite(value):
+                raise ValueError(f"{param} debe ser numérico")
+            bounds.append(value)
+        ranges.append(tuple(bounds))
+    sort = (request.args.get('sort') or '').strip()
+    column = sort[1:] if sort.startswith('-') else sort
+    if column and column not in OUTPUT_COLUMNS:
+        raise ValueError(f"sort: columna desconocida '{column}'")
+    return filters, tuple(ranges), ((column, sort.startswith('-')) if column else None)
+
+
+def _select(records, facets, numbers, filters, ranges, sort):
+    mask = facets.select(dict(zip(CRUZAR_FILTERS, filters)))
+    for (low, high), column in zip(ranges, CRUZAR_RANGES.values()):
+        if low is not None:
+            mask &= numbers[column] >= low
+        if high is not None:
+            mask &= numbers[column] <= high
+    positions = np.flatnonzero(mask)
+    if sort:
+        column, desc = sort
+        if column in numbers:
+            values = numbers[column][positions]
+            positions = positions[np.argsort(-values if desc else values, kind='stable')]
+        else:
+            # texto sin distinguir mayúsculas; sorted es estable también con reverse
+            positions = np.asarray(sorted(positions.tolist(), key=lambda i: str(records[i][column]).lower(),
+                                          reverse=desc), dtype=np.int64)
+    totals = {c: float(numbers[c][mask].sum()) for c in NUMERIC_COLUMNS}
+    return {'positions': positions, 'totals': totals}
+
+
+def cruzado_selection(filters, ranges, sort):
+    """
+    Filas de la vista que cumplen filtros y rangos, en el orden pedido (el de la vista si
+    sort es None): (registros, {'positions': ndarray, 'totals': sumas de las columnas numéricas}).
+    """
+    version, records, facets, numbers = cruzado_index()
+    selection = _selection_cache.get_or_compute(
+        ('cruzar', version, filters, ranges, sort),
+        lambda: _select(records, facets, numbers, filters, ranges, sort))
+    return records, selection
+
+
+def _page_args():
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+    except Exception:
+        page = 1
+    try:
+        page_size = int(request.args.get('page_size', PAGE_SIZE))
+        if page_size <= 0:
+            page_size = PAGE_SIZE
+    except Exception:
+        page_size = PAGE_SIZE
+    return page, min(page_size, MAX_PAGE_SIZE)
 
 
 @cruzar_bp.route('/')
@@ -265,29 +366,72 @@ def cruzar():
 
 @cruzar_bp.route('/api/data')
 def api_data():
+    """
+    Tabla cruzada con ?sort=[-]<columna>, filtros marca, punto y material (separados por
+    coma) y rangos inventario_min/max, transitos_min/max. Con ?page= o ?page_size= devuelve
+    esa página (cruzar.js siempre los envía); sin ninguno de los dos, todas las filas
+    filtradas, como antes de paginar. totals = sumas de las columnas numéricas sobre todas
+    las filas filtradas.
+    """
+    try:
+        query = parse_query()
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    paged = 'page' in request.args or 'page_size' in request.args
+    page, page_size = _page_args()
     try:
-        df = build_dataframe()
-        data = df.to_dict(orient='records')
-        return jsonify({'status': 'ok', 'data': data})
+        records, selection = cruzado_selection(*query)
+        positions = selection['positions']
+        total = len(positions)
+        if not paged:
+            return jsonify({
+                'status': 'ok',
+                'data': [records[i] for i in positions.tolist()],
+                'total': total,
+                'totals': selection['totals'],
+            })
+        total_pages = math.ceil(total / page_size)
+        if page > total_pages and total_pages > 0:
+            page = total_pages
+        start = (page - 1) * page_size
+        return jsonify({
+            'status': 'ok',
+            'data': [records[i] for i in positions[start:start + page_size].tolist()],
+            'total': total,
+            'page': page,
+            'page_size': page_size,
+            'total_pages': total_pages,
+            'totals': selection['totals'],
+        })
     except Exception as e:
         current_app.logger.exception("Error building dataframe")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+@cruzar_bp.route('/api/options')
+def api_options():
+    """Valores de los filtros de lista (marcas y puntos de venta) presentes en la tabla."""
+    _, _, facets, _ = cruzado_index()
+    return jsonify({
+        'marcas': facets.values('marca', skip_empty=True),
+        'puntos': facets.values('punto', skip_empty=True),
+    })
+
+
+@cruzar_bp.route('/api/status')
+def api_status():
+    """Estado de la tabla cruzada: fuentes que cambiaron, filas afectadas y tiempo por etapa del último refresh."""
+    return jsonify({**_cruzado.stats(), 'cache': _selection_cache.stats()})
+
+
 @cruzar_bp.route('/api/export')
 def api_export():
-    """Exporta el excel con el orden y nombres solicitados."""
+    """Exporta el excel (o CSV con format=csv) con el orden y nombres solicitados."""
     try:
-        df = build_dataframe()
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Cruzado')
-        output.seek(0)
-        filename = 'cruzado_export.xlsx'
-        return send_file(output,
-                         as_attachment=True,
-                         download_name=filename,
-                         mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        fmt = request.args.get('format', 'xlsx').lower()
+        records = cruzado_records()
+        rows = ([r[c] for c in OUTPUT_COLUMNS] for r in records)
+        return export_stream.response(fmt, 'cruzado_export', OUTPUT_COLUMNS, rows, 'Cruzado')
     except Exception as e:
         current_app.logger.exception("Error exporting excel")
         return jsonify({'status': 'error', 'message': str(e)}), 500
\ No newline at end of file
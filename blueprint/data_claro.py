@@ -7,6 +7,9 @@ from threading import Lock
 from flask import Blueprint, render_template, jsonify, request, send_file
 from io import BytesIO
 import pandas as pd
+from conexiones import store_loader
+from conexiones import export_stream
+from conexiones import keys
 
 claro_bp = Blueprint(
     'claro', __name__,
@@ -28,11 +31,6 @@ def _ensure_file():
         with JSON_PATH.open("w", encoding="utf-8") as f:
             json.dump([], f, ensure_ascii=False, indent=2)
 
-def _normalize_key(val):
-    if val is None:
-        return ""
-    return str(val).strip().lower()
-
 def _clean_value(v):
     """
     Si v es None / cadena vacía / 'nan' / NaN => devolver 0.
@@ -62,56 +60,31 @@ def _clean_value(v):
 
 def read_items():
     _ensure_file()
-    with _file_lock:
-        text = JSON_PATH.read_text(encoding="utf-8").strip()
-        if not text:
-            return []
-        try:
-            data = json.loads(text)
-            if isinstance(data, dict):
-                items = [data]
-            elif isinstance(data, list):
-                items = data
-            else:
-                items = []
-        except json.JSONDecodeError:
-            # intentar parseo línea por línea (ndjson)
-            res = []
-            for line in text.splitlines():
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    obj = json.loads(line)
-                    res.append(obj)
-                except Exception:
-                    continue
-            items = res
-
-        # Asegurar que cada item tenga un id único (compatibilidad con datos antiguos)
-        changed = False
+    items = store_loader.load_json(JSON_PATH, lock=_file_lock)
+    # Asegurar que cada item tenga un id único (compatibilidad con datos antiguos)
+    if any(not it.get("id") for it in items):
+        items = [dict(it) for it in items]
         for it in items:
-            if "id" not in it or not it.get("id"):
+            if not it.get("id"):
                 it["id"] = str(uuid.uuid4())
-                changed = True
-        # si agregamos ids a items existentes, reescribimos para persistirlos
-        if changed:
-            with JSON_PATH.open("w", encoding="utf-8") as f:
-                json.dump(items, f, ensure_ascii=False, indent=2)
-        return items
+        # persistir los ids agregados
+        write_items(items)
+    return list(items)
 
 def write_items(list_items):
     _ensure_file()
     with _file_lock:
         with JSON_PATH.open("w", encoding="utf-8") as f:
             json.dump(list_items, f, ensure_ascii=False, indent=2)
+        store_loader.prime(JSON_PATH, store_loader.file_signature(JSON_PATH), list(list_items))
 
 def find_by_material(material, items=None):
     if items is None:
         items = read_items()
-    target = _normalize_key(material)
+    # sin distinguir mayúsculas, como antes (códigos no numéricos 'ab12' == 'AB12')
+    target = keys.material(material).casefold()
     for it in items:
-        if _normalize_key(it.get("Material")) == target:
+        if keys.material(it.get("Material")).casefold() == target:
             return it
     return None
 
@@ -174,7 +147,7 @@ def api_update_item(item_id):
     if idx is None:
         return jsonify({"error":"Item no encontrado"}), 404
 
-    target = items[idx]
+    target = dict(items[idx])  # copia: los dicts son compartidos con la caché
 
     new_material = str(payload.get("Material", target.get("Material"))).strip()
     if not new_material:
@@ -214,38 +187,23 @@ def api_delete_all():
     write_items([])
     return jsonify({"ok":True, "deleted_all": True}), 200
 
-# API: exportar (excel o json) - exporta todo y rellena NaN con 0
+# API: exportar (excel, csv o json) - exporta todo y rellena NaN con 0
 @claro_bp.route('/api/export', methods=['GET'])
 def api_export():
     fmt = request.args.get("format", "excel").lower()
     items = read_items()
 
-    df = pd.DataFrame(items)
-    # Aseguramos columnas (incluimos id)
+    # columnas del exporte (incluimos id)
     cols = [
         "id","Material","Producto","Centro Costos","Nombre del Punto",
         "Inventario Claro","Transito Claro","Ventas Pasadas Claro",
         "Ventas Actuales Claro","Sugerido Claro"
     ]
-    for c in cols:
-        if c not in df.columns:
-            df[c] = 0
-    df = df[cols]
-
-    # rellenar NaN por 0 antes de exportar
-    df = df.fillna(0)
-
-    if fmt in ("excel","xlsx"):
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="ClaroData")
-        output.seek(0)
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name="data_claro.xlsx",
-            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+
+    # celdas sin valor como 0 (igual que el fillna(0) anterior)
+    if fmt in ("excel","xlsx","csv"):
+        rows = ([0 if it.get(c) is None else it.get(c) for c in cols] for it in items)
+        return export_stream.response(fmt, "data_claro", cols, rows, "ClaroData")
     else:
         mem = BytesIO()
         mem.write(json.dumps(items, ensure_ascii=False, indent=2).encode("utf-8"))
@@ -1,28 +1,62 @@
-from flask import Blueprint, render_template, jsonify, request
+from flask import Blueprint, render_template, jsonify, request, Response
 from pathlib import Path
 import pandas as pd
 import json
-from datetime import date
-from dateutil.relativedelta import relativedelta
+import base64
+import hashlib
+import os
+from datetime import date, datetime
 import math
+from blueprint.ops_ventasclaro import ventas_cube_view, ventas_signature
+from blueprint.inventario_claro import read_inventario_frame, inventario_signature
+from blueprint.transitos import read_transitos_frame, transitos_signature
+from blueprint.metas import read_metas, metas_signature
+from conexiones import store_loader
+from conexiones import export_stream
+from conexiones.result_cache import ResultCache
+from conexiones import forecast_engine
+from conexiones.facet_index import FacetIndex
+from conexiones.snapshot_worker import SnapshotWorker
 
 forecast_bp = Blueprint('forecast', __name__, url_prefix='/forecast', template_folder='../templates')
 
 DATA_DIR = Path(__file__).resolve().parent.parent / 'conexiones' / 'data_ops'
+FORECAST_FILES = ('productos_claro.json', 'puntos_venta_claro.json')
+FORECAST_FILTERS = ('centro', 'punto', 'material', 'producto', 'marca', 'canal', 'meta')
+
+# cálculo de la tabla en un pool de procesos (forecast_engine._sharded_table):
+# FORECAST_SHARDS=1 (por defecto) lo hace en el mismo proceso; el pool queda apagado hasta
+# medirlo con benchmarks/bench_forecast_shards.py en el servidor. FORECAST_SHARD_BY = centro (hash) | canal
+FORECAST_SHARDS = max(1, int(os.getenv('FORECAST_SHARDS', '1').strip() or 1))
+FORECAST_SHARD_BY = os.getenv('FORECAST_SHARD_BY', 'centro').strip().lower()
+if FORECAST_SHARD_BY not in forecast_engine.SHARD_BY:
+    FORECAST_SHARD_BY = 'centro'
+
+# selecciones filtradas del snapshot de forecast por versión + filtros;
+# cambiar de página es solo un slice
+FORECAST_CACHE_ENTRIES = 64
+FORECAST_CACHE_BYTES = 256 * 1024 * 1024
+_forecast_cache = ResultCache(max_entries=FORECAST_CACHE_ENTRIES, max_bytes=FORECAST_CACHE_BYTES)
+
+# /forecast/export: (campo del registro, encabezado) con los nombres del export de la página
+FORECAST_EXPORT_COLUMNS = (
+    ('Centro Costos', 'Centro Costos'), ('Material', 'Material'), ('Productos', 'Producto'),
+    ('Marca', 'Marca'), ('Punto de Venta', 'Punto de Venta'), ('Canal o Regional', 'Canal o Regional'),
+    ('Ventas_Mes_Actual', 'Ventas Actuales'), ('Ventas_Mes_Pasado', 'Ventas Mes pasado'),
+    ('Ventas_Promedio_3_Meses', 'Promedio 3 Meses'), ('Mediana', 'Mediana'),
+    ('Inventario', 'Inventario'), ('Transitos', 'Transitos'),
+    ('Indicador_3_Meses', 'Indicador 3 Meses'), ('Indicador_Mes_Pasado', 'Indicador Ventas Mes Pasado'),
+    ('Envio_3_Meses', 'Envío Inventario 3 meses'), ('Envio_Pasadas', 'Envío Ventas Actuales'),
+    ('Meta_Mes', 'Meta Mes'), ('Cumplimiento_Meta', 'Cumplimiento Meta'),
+    ('Proyeccion_Cierre', 'Proyección Cierre'), ('Cumplimiento_Proyectado', 'Cumplimiento Proyectado'),
+    ('Estado_Meta', 'Estado Meta'),
+)
 
 def load_json_to_df(p: Path):
     try:
         if not p.exists():
             return pd.DataFrame()
-        try:
-            df = pd.read_json(p, convert_dates=False)
-        except ValueError:
-            with p.open('r', encoding='utf-8') as f:
-                raw = json.load(f)
-            if isinstance(raw, dict):
-                raw = [raw]
-            df = pd.DataFrame(raw)
-        return df
+        return pd.DataFrame(store_loader.load_json(p))
     except Exception as e:
         print(f"Error cargando {p}: {e}")
         return pd.DataFrame()
@@ -39,45 +73,20 @@ def parse_multi_param(name):
     parts = [p.strip() for p in v.split(',') if p.strip() != '']
     return [p.lower() for p in parts]
 
-def prepare_dataframes():
-    inventario_fp = DATA_DIR / 'inventario_claro.json'
-    transitos_fp = DATA_DIR / 'transitos.json'
-    ventas_fp = DATA_DIR / 'ventas_claro.json'
+def _prepare_dataframes():
     productos_fp = DATA_DIR / 'productos_claro.json'
     puntos_fp = DATA_DIR / 'puntos_venta_claro.json'
-    metas_fp = DATA_DIR / 'metas.json'
 
-    df_inv = load_json_to_df(inventario_fp)
-    df_tra = load_json_to_df(transitos_fp)
-    df_ven = load_json_to_df(ventas_fp)
+    # inventario y tránsitos llegan tipados desde su snapshot columnar
+    # (Material/Centro categóricos, cantidades numéricas): sin parsear JSON.
+    # Las ventas no pasan por aquí: se leen del agregado mensual (ventas_cube_view)
+    df_inv = read_inventario_frame()
+    df_tra = read_transitos_frame()
     df_prod = load_json_to_df(productos_fp)
     df_puntos = load_json_to_df(puntos_fp)
-    df_metas = load_json_to_df(metas_fp)
+    df_metas = pd.DataFrame(read_metas())
 
     # Normalizaciones
-    if not df_inv.empty:
-        if 'Inventario' in df_inv.columns:
-            df_inv['Inventario'] = pd.to_numeric(df_inv['Inventario'], errors='coerce').fillna(0)
-        if 'Material' in df_inv.columns:
-            df_inv['Material'] = df_inv['Material'].astype(str)
-        if 'Centro Costos' in df_inv.columns:
-            df_inv['Centro Costos'] = df_inv['Centro Costos'].astype(str)
-    if not df_tra.empty:
-        if 'Transitos' in df_tra.columns:
-            df_tra['Transitos'] = pd.to_numeric(df_tra['Transitos'], errors='coerce').fillna(0)
-        if 'Material' in df_tra.columns:
-            df_tra['Material'] = df_tra['Material'].astype(str)
-        if 'Centro Costos' in df_tra.columns:
-            df_tra['Centro Costos'] = df_tra['Centro Costos'].astype(str)
-    if not df_ven.empty:
-        if 'Cantidad' in df_ven.columns:
-            df_ven['Cantidad'] = pd.to_numeric(df_ven['Cantidad'], errors='coerce').fillna(0)
-        if 'Fecha Venta' in df_ven.columns:
-            df_ven['Fecha Venta'] = pd.to_datetime(df_ven['Fecha Venta'], errors='coerce')
-        if 'Material' in df_ven.columns:
-            df_ven['Material'] = df_ven['Material'].astype(str)
-        if 'Centro Costos' in df_ven.columns:
-            df_ven['Centro Costos'] = df_ven['Centro Costos'].astype(str)
     if not df_prod.empty:
         if 'Material' in df_prod.columns:
             df_prod['Material'] = df_prod['Material'].astype(str)
@@ -100,100 +109,226 @@ def prepare_dataframes():
         if 'Meta Cantidad' in df_metas.columns:
             df_metas['Meta Cantidad'] = pd.to_numeric(df_metas['Meta Cantidad'], errors='coerce').fillna(0)
 
-    return df_inv, df_tra, df_ven, df_prod, df_puntos, df_metas
+    return df_inv, df_tra, df_prod, df_puntos, df_metas
+
+def dataframes_signature():
+    sig = tuple(store_loader.file_signature(DATA_DIR / name) for name in FORECAST_FILES)
+    return sig + (inventario_signature(), transitos_signature(), metas_signature())
+
+def prepare_dataframes():
+    """
+    DataFrames ya normalizados, cacheados mientras ningún store de data_ops cambie.
+    Son compartidos entre requests: no modificarlos.
+    """
+    return store_loader.load('forecast:dataframes', dataframes_signature(), _prepare_dataframes)
+
+def parse_filters():
+    """Filtros del request normalizados (minúsculas, sin duplicados, ordenados) en el orden de FORECAST_FILTERS."""
+    return tuple(tuple(sorted(set(parse_multi_param(name)))) for name in FORECAST_FILTERS)
+
+def parse_horizon():
+    """
+    Ventanas pedidas (?windows=1,3,6,12&stat=mean,median,p80): (windows, stats) ordenados y sin
+    duplicados; ((), ()) si no se pidieron. ValueError con el mensaje para el cliente si son inválidas.
+    """
+    raw = parse_multi_param('windows')
+    if not raw:
+        return (), ()
+    try:
+        windows = tuple(sorted({int(w) for w in raw}))
+    except ValueError:
+        raise ValueError("windows debe ser una lista de meses, p. ej. windows=1,3,6,12")
+    if windows[0] < 1 or windows[-1] > forecast_engine.MAX_WINDOW:
+        raise ValueError(f"windows debe estar entre 1 y {forecast_engine.MAX_WINDOW} meses")
+    stats = parse_multi_param('stat') or ['mean']
+    unknown = [st for st in stats if st not in forecast_engine.WINDOW_STAT_LABELS]
+    if unknown:
+        raise ValueError(f"stat no soportado: {', '.join(unknown)} (use mean, median o p80)")
+    return windows, tuple(st for st in forecast_engine.WINDOW_STAT_LABELS if st in stats)
+
+def window_columns(horizon):
+    windows, stats = horizon
+    return [forecast_engine.window_column(w, st) for w in windows for st in stats]
+
+def parse_cursor():
+    """
+    Clave (-Envio_Pasadas, centro, material) del cursor opaco de /forecast/data, o None si no
+    vino. ValueError si no es un cursor de make_cursor.
+    """
+    raw = request.args.get('cursor')
+    if not raw:
+        return None
+    try:
+        envio, centro, material = json.loads(base64.urlsafe_b64decode(raw + '=' * (-len(raw) % 4)))
+    except Exception:
+        raise ValueError("cursor inválido")
+    if type(envio) is not int or not isinstance(centro, str) or not isinstance(material, str):
+        raise ValueError("cursor inválido")
+    return (-envio, centro, material)
+
+def make_cursor(record):
+    """Cursor opaco que apunta después de record (keyset sobre el orden del forecast)."""
+    raw = json.dumps([record['Envio_Pasadas'], record['Centro Costos'], record['Material']], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def _etag(*parts):
+    """ETag: hash de las versiones de los stores de entrada y de los parámetros normalizados."""
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+def _conditional(etag, build):
+    """
+    304 sin cuerpo si el cliente ya tiene etag (If-None-Match); si no, build() con el ETag.
+    no-cache: el navegador guarda la respuesta pero la revalida en cada navegación.
+    """
+    if request.if_none_match.contains_weak(etag):
+        resp = Response(status=304)
+    else:
+        resp = build()
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'private, no-cache'
+    return resp
 
 @forecast_bp.route('/')
 def forecast_page():
     return render_template('forecast.html')
 
+def ventas_frames():
+    """Cubo de ventas como DataFrames para forecast_engine, cacheado por versión de ventas (solo lectura)."""
+    return store_loader.load('forecast:ventas_frames', ventas_signature(),
+                             lambda: forecast_engine.ventas_frames(ventas_cube_view()))
+
+def _facet_column(df, name):
+    if name in df.columns:
+        return forecast_engine.normalize_column(df[name], name)
+    return [''] * len(df)
+
+def _build_option_facets():
+    df_inv, df_tra, df_prod, df_puntos, df_metas = prepare_dataframes()
+    puntos = FacetIndex({
+        'centro': _facet_column(df_puntos, 'Centro Costos'),
+        'punto': _facet_column(df_puntos, 'Punto de Venta'),
+        'canal': _facet_column(df_puntos, 'Canal o Regional'),
+    })
+    productos = FacetIndex({
+        'material': _facet_column(df_prod, 'Material'),
+        'producto': _facet_column(df_prod, 'Producto'),
+        'marca': _facet_column(df_prod, 'Marca'),
+    })
+    # centros con inventario, tránsitos o ventas (solo los filtra 'centro')
+    activos = set()
+    for df in (df_inv, df_tra):
+        if not df.empty:
+            activos.update(forecast_engine.normalize_column(df['Centro Costos'].dropna().unique(), 'Centro Costos'))
+    activos.update(ventas_frames()['median']['Centro Costos'].tolist())
+    return {'puntos': puntos, 'productos': productos, 'activos': FacetIndex({'centro': sorted(activos)})}
+
+def option_facets():
+    """
+    Índices de facetas de /forecast/options (puntos, productos y centros activos),
+    reconstruidos solo cuando cambian productos, puntos, inventario, tránsitos o ventas.
+    """
+    return store_loader.load('forecast:option_facets', option_facets_signature(), _build_option_facets)
+
+def option_facets_signature():
+    """Versión de los stores que alimentan /forecast/options."""
+    sig = tuple(store_loader.file_signature(DATA_DIR / name) for name in FORECAST_FILES)
+    return sig + (inventario_signature(), transitos_signature(), ventas_signature())
+
 @forecast_bp.route('/options')
 def forecast_options():
-    df_inv, df_tra, df_ven, df_prod, df_puntos, df_metas = prepare_dataframes()
-
     centros_filter = parse_multi_param('centro')
     puntos_filter = parse_multi_param('punto')
     materials_filter = parse_multi_param('material')
-    productos_filter = parse_multi_param('producto')
     marcas_filter = parse_multi_param('marca')
     canales_filter = parse_multi_param('canal')
-
-    centros = set()
-    puntos = set()
-    materials = set()
-    productos = set()
-    marcas = set()
-    canales = set()
-
-    if not df_puntos.empty:
-        for _, r in df_puntos.iterrows():
-            cc = normalize_str(r.get('Centro Costos'))
-            pv = normalize_str(r.get('Punto de Venta'))
-            canal = normalize_str(r.get('Canal o Regional'))
-            if centros_filter and cc.lower() not in centros_filter:
-                continue
-            if puntos_filter and pv.lower() not in puntos_filter:
-                continue
-            if canales_filter and canal.lower() not in canales_filter:
-                continue
-            centros.add(cc)
-            puntos.add(pv)
-            if canal != '':
-                canales.add(canal)
-
-    if not df_inv.empty:
-        for c in df_inv['Centro Costos'].dropna().unique().tolist():
-            c = normalize_str(c)
-            if centros_filter and c.lower() not in centros_filter:
-                continue
-            centros.add(c)
-    if not df_tra.empty:
-        for c in df_tra['Centro Costos'].dropna().unique().tolist():
-            c = normalize_str(c)
-            if centros_filter and c.lower() not in centros_filter:
-                continue
-            centros.add(c)
-    if not df_ven.empty:
-        for c in df_ven['Centro Costos'].dropna().unique().tolist():
-            c = normalize_str(c)
-            if centros_filter and c.lower() not in centros_filter:
-                continue
-            centros.add(c)
-
-    if not df_prod.empty:
-        for _, r in df_prod.iterrows():
-            mat = normalize_str(r.get('Material'))
-            prod = normalize_str(r.get('Producto')) if 'Producto' in r else ''
-            marca = normalize_str(r.get('Marca')) if 'Marca' in r else ''
-            if materials_filter and mat.lower() not in materials_filter:
-                continue
-            if marcas_filter and marca != '' and marca.lower() not in marcas_filter:
-                continue
-            materials.add(mat)
-            if prod != '':
-                productos.add(prod)
-            if marca != '':
-                marcas.add(marca)
-
-    return jsonify({
-        'centros': sorted(list(centros)),
-        'puntos': sorted(list(puntos)),
-        'materials': sorted(list(materials)),
-        'productos': sorted(list(productos)),
-        'marcas': sorted(list(marcas)),
-        'canales': sorted(list(canales))
+    filters = tuple(tuple(sorted(set(f))) for f in
+                    (centros_filter, puntos_filter, materials_filter, marcas_filter, canales_filter))
+    etag = _etag('options', option_facets_signature(), filters)
+    return _conditional(etag, lambda: jsonify(_options_payload(
+        option_facets(), centros_filter, puntos_filter, materials_filter, marcas_filter, canales_filter)))
+
+def _options_payload(facets, centros_filter, puntos_filter, materials_filter, marcas_filter, canales_filter):
+    puntos = facets['puntos']
+    rows = puntos.select({'centro': centros_filter, 'punto': puntos_filter, 'canal': canales_filter})
+    activos = facets['activos']
+    centros = set(puntos.values('centro', rows))
+    centros.update(activos.values('centro', activos.select({'centro': centros_filter})))
+
+    productos = facets['productos']
+    # productos sin marca pasan el filtro de marca
+    prod_rows = productos.select({
+        'material': materials_filter,
+        'marca': marcas_filter + [''] if marcas_filter else None,
     })
 
+    return {
+        'centros': sorted(centros),
+        'puntos': puntos.values('punto', rows),
+        'materials': productos.values('material', prod_rows),
+        'productos': productos.values('producto', prod_rows, skip_empty=True),
+        'marcas': productos.values('marca', prod_rows, skip_empty=True),
+        'canales': puntos.values('canal', rows, skip_empty=True),
+        'estados_meta': list(forecast_engine.META_STATES),
+    }
+
+def forecast_version():
+    """Versión de los datos del forecast: seis stores de entrada + día (las ventanas de meses dependen de la fecha)."""
+    return (dataframes_signature(), ventas_signature(), date.today().isoformat())
+
+def build_forecast_snapshot():
+    """Tabla de forecast completa (sin filtros) para el worker de snapshots."""
+    df_inv, df_tra, df_prod, df_puntos, df_metas = prepare_dataframes()
+    # el índice de trigramas de productos solo se rehace cuando cambia productos_claro.json
+    products = store_loader.load('forecast:product_matcher', store_loader.file_signature(DATA_DIR / 'productos_claro.json'),
+                                 lambda: forecast_engine.ProductMatcher(df_prod))
+    return forecast_engine.ForecastSnapshot.build(
+        df_inv, df_tra, df_prod, df_puntos, ventas_frames(), date.today(), products,
+        shards=FORECAST_SHARDS, shard_by=FORECAST_SHARD_BY, df_metas=df_metas)
+
+# la tabla se reconstruye en segundo plano cuando cambia algún store; los requests
+# filtran el snapshot vigente (o el anterior mientras se reconstruye)
+_forecast_snapshot = SnapshotWorker('forecast', forecast_version, build_forecast_snapshot)
+
+def forecast_records(filters, horizon=((), ()), snapshot=None):
+    """
+    Registros de forecast para los filtros dados, ya ordenados (sin paginar): selección
+    sobre el snapshot vigente (o el dado, de _forecast_snapshot.get()) más las columnas
+    de ventanas de horizon, cacheada por (versión del snapshot, filtros, ventanas).
+    Lista compartida: no modificarla.
+    """
+    if snapshot is None:
+        snapshot = _forecast_snapshot.get()
+    windows, stats = horizon
+    if not any(filters) and not windows:
+        return snapshot.value.records
+    key = (snapshot.version, filters, horizon)
+    return _forecast_cache.get_or_compute(key, lambda: snapshot.value.select(filters, windows, stats))
+
+@forecast_bp.route('/status')
+def forecast_status():
+    """Estado del snapshot de forecast: edad, duración de la última construcción, reconstrucción en curso."""
+    status = _forecast_snapshot.status()
+    snapshot = _forecast_snapshot.current()
+    status['records'] = len(snapshot.value.records) if snapshot else None
+    status['shards'] = FORECAST_SHARDS
+    status['shard_by'] = FORECAST_SHARD_BY
+    status['cache'] = _forecast_cache.stats()
+    return jsonify(status)
+
 @forecast_bp.route('/data')
 def forecast_data():
-    """VERSIÓN OPTIMIZADA - Usa merge en lugar de máscaras repetitivas"""
-    df_inv, df_tra, df_ven, df_prod, df_puntos, df_metas = prepare_dataframes()
-
-    centros_filter = parse_multi_param('centro')
-    puntos_filter = parse_multi_param('punto')
-    materials_filter = parse_multi_param('material')
-    productos_filter = parse_multi_param('producto')
-    marcas_filter = parse_multi_param('marca')
-    canales_filter = parse_multi_param('canal')
+    """
+    Página de forecast: la lista completa sale de forecast_records (snapshot) y aquí solo se pagina.
+    windows/stat agregan columnas Ventas_<Promedio|Mediana|P80>_<n>_Meses a cada registro.
+    cursor (next_cursor de una respuesta anterior) pide la página que sigue a ese registro
+    aunque los datos hayan cambiado; tiene prioridad sobre page.
+    """
+    try:
+        horizon = parse_horizon()
+        cursor = parse_cursor()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    filters = parse_filters()
 
     try:
         page = max(1, int(request.args.get('page', 1)))
@@ -208,197 +343,53 @@ def forecast_data():
     if page_size > 1000:
         page_size = 1000
 
-    # Maps
-    prod_map = {}
-    if not df_prod.empty and 'Material' in df_prod.columns:
-        for _, r in df_prod.iterrows():
-            m = normalize_str(r.get('Material'))
-            prod_map[m] = {
-                'Producto': normalize_str(r.get('Producto')) if 'Producto' in r else '',
-                'Marca': normalize_str(r.get('Marca')) if 'Marca' in r else ''
-            }
-
-    puntos_map = {}
-    if not df_puntos.empty and 'Centro Costos' in df_puntos.columns:
-        for _, r in df_puntos.iterrows():
-            cc = normalize_str(r.get('Centro Costos'))
-            puntos_map[cc] = {
-                'Punto de Venta': normalize_str(r.get('Punto de Venta')) if 'Punto de Venta' in r else '',
-                'Canal o Regional': normalize_str(r.get('Canal o Regional')) if 'Canal o Regional' in r else ''
-            }
-
-    # Candidates
-    candidates = set()
-    if not df_inv.empty and {'Centro Costos','Material'}.issubset(df_inv.columns):
-        for _, r in df_inv.iterrows():
-            cc = normalize_str(r.get('Centro Costos'))
-            mat = normalize_str(r.get('Material'))
-            if mat in prod_map:
-                candidates.add((cc, mat))
-    if not df_tra.empty and {'Centro Costos','Material'}.issubset(df_tra.columns):
-        for _, r in df_tra.iterrows():
-            cc = normalize_str(r.get('Centro Costos'))
-            mat = normalize_str(r.get('Material'))
-            if mat in prod_map:
-                candidates.add((cc, mat))
-    if not df_ven.empty and {'Centro Costos','Material'}.issubset(df_ven.columns):
-        for _, r in df_ven.iterrows():
-            cc = normalize_str(r.get('Centro Costos'))
-            mat = normalize_str(r.get('Material'))
-            if mat in prod_map:
-                candidates.add((cc, mat))
-
-    # ===== OPTIMIZACIÓN: Pre-agrupar y crear diccionarios =====
-    today = date.today()
-    months = [(today - relativedelta(months=i)).replace(day=1) for i in range(1, 4)]
-    
-    # Ventas agrupadas - OPTIMIZADO con set_index
-    ventas_monthly_dict = {}
-    ventas_current_dict = {}
-    ventas_all_dict = {}
-    
-    if not df_ven.empty:
-        df_ven['year'] = df_ven['Fecha Venta'].dt.year
-        df_ven['month'] = df_ven['Fecha Venta'].dt.month
-        
-        # Agrupar ventas históricas
-        ventas_grouped = df_ven.groupby(['Centro Costos','Material','year','month'], dropna=False)['Cantidad'].sum()
-        ventas_monthly_dict = ventas_grouped.to_dict()
-        
-        # Ventas del mes actual
-        cy = today.year
-        cm = today.month
-        df_current = df_ven[(df_ven['year'] == cy) & (df_ven['month'] == cm)]
-        if not df_current.empty:
-            ventas_current = df_current.groupby(['Centro Costos','Material'])['Cantidad'].sum()
-            ventas_current_dict = ventas_current.to_dict()
-        
-        # Mediana - todas las ventas por CC + Material
-        ventas_all = df_ven.groupby(['Centro Costos','Material'])['Cantidad'].median()
-        ventas_all_dict = ventas_all.to_dict()
-
-    # Inventario agrupado - OPTIMIZADO con to_dict
-    inv_dict = {}
-    if not df_inv.empty:
-        inv_grouped = df_inv.groupby(['Centro Costos','Material'], dropna=False)['Inventario'].sum()
-        inv_dict = inv_grouped.to_dict()
-    
-    # Tránsitos agrupados - OPTIMIZADO con to_dict
-    tra_dict = {}
-    if not df_tra.empty:
-        tra_grouped = df_tra.groupby(['Centro Costos','Material'], dropna=False)['Transitos'].sum()
-        tra_dict = tra_grouped.to_dict()
-
-    def candidate_matches_filters(cc, mat):
-        if centros_filter and cc.lower() not in centros_filter:
-            return False
-        punto = puntos_map.get(cc, {}).get('Punto de Venta','').lower()
-        if puntos_filter and punto not in puntos_filter:
-            return False
-        if materials_filter and mat.lower() not in materials_filter:
-            return False
-        prod_name = prod_map.get(mat, {}).get('Producto','').lower()
-        if productos_filter:
-            found = False
-            for pat in productos_filter:
-                if pat in prod_name:
-                    found = True
-                    break
-            if not found:
-                return False
-        marca = prod_map.get(mat, {}).get('Marca','').lower()
-        if marcas_filter and marca not in marcas_filter:
-            return False
-        canal_val = puntos_map.get(cc, {}).get('Canal o Regional','').lower()
-        if canales_filter and canal_val not in canales_filter:
-            return False
-        return True
-
-    records = []
-    for cc, mat in sorted(candidates):
-        if not candidate_matches_filters(cc, mat):
-            continue
-
-        # ===== LOOKUPS OPTIMIZADOS - Sin máscaras booleanas =====
-        
-        # Ventas por mes (últimos 3 meses excluyendo actual)
-        month_totals = []
-        for d in months:
-            key = (cc, mat, d.year, d.month)
-            month_totals.append(int(ventas_monthly_dict.get(key, 0)))
-        
-        ventas_pasado = month_totals[0]
-        ventas_promedio = round(sum(month_totals) / 3.0, 2)
-        
-        # Ventas mes actual
-        ventas_actual = int(ventas_current_dict.get((cc, mat), 0))
-        
-        # Inventario y tránsitos
-        inventario = int(inv_dict.get((cc, mat), 0))
-        transitos = int(tra_dict.get((cc, mat), 0))
-        
-        # Mediana
-        mediana = ventas_all_dict.get((cc, mat))
-        if mediana is not None and pd.notna(mediana):
-            mediana = float(round(float(mediana), 2))
-        else:
-            mediana = None
-
-        # Filtro de inclusión
-        if not (inventario > 0 or transitos > 0 or ventas_actual > 0 or ventas_pasado > 0 or ventas_promedio > 0):
-            continue
-
-        # Cálculos
-        envio_3_meses = round(ventas_promedio - inventario, 2)
-        envio_pasadas = round(ventas_pasado - inventario, 2)
-
-        indicador_3_meses = None
-        if ventas_promedio != 0:
-            indicador_3_meses = round(inventario / ventas_promedio, 4)
-        indicador_mes_pasado = None
-        if ventas_pasado != 0:
-            indicador_mes_pasado = round(inventario / ventas_pasado, 4)
-
-        producto_name = prod_map.get(mat, {}).get('Producto','')
-        marca_name = prod_map.get(mat, {}).get('Marca','')
-        punto_name = puntos_map.get(cc, {}).get('Punto de Venta','')
-        canal_name = puntos_map.get(cc, {}).get('Canal o Regional','')
-
-        rec = {
-            'Centro Costos': cc,
-            'Material': mat,
-            'Productos': producto_name,
-            'Marca': marca_name,
-            'Punto de Venta': punto_name,
-            'Canal o Regional': canal_name,
-            'Ventas_Mes_Actual': ventas_actual,
-            'Ventas_Mes_Pasado': ventas_pasado,
-            'Ventas_Promedio_3_Meses': ventas_promedio,
-            'Mediana': mediana,
-            'Inventario': inventario,
-            'Transitos': transitos,
-            'Indicador_3_Meses': indicador_3_meses,
-            'Indicador_Mes_Pasado': indicador_mes_pasado,
-            'Envio_3_Meses': envio_3_meses,
-            'Envio_Pasadas': envio_pasadas
-        }
-        records.append(rec)
-
-    # Sort por Envio_Pasadas descendente xdd
-    records = sorted(records, key=lambda x: (-(x.get('Envio_Pasadas') or 0), x.get('Centro Costos') or '', x.get('Material') or ''))
+    # la versión es la del snapshot que se sirve (el anterior mientras se reconstruye)
+    snapshot = _forecast_snapshot.get()
+    etag = _etag('data', snapshot.version, filters, horizon, cursor if cursor else page, page_size)
+    return _conditional(etag, lambda: jsonify(
+        _data_payload(forecast_records(filters, horizon, snapshot), horizon, cursor, page, page_size)))
 
+def _data_payload(records, horizon, cursor, page, page_size):
     total = len(records)
     total_pages = math.ceil(total / page_size) if page_size > 0 else 1
-    if page > total_pages and total_pages > 0:
-        page = total_pages
-    start = (page - 1) * page_size
+    if cursor is not None:
+        start = forecast_engine.seek(records, cursor)
+        page = start // page_size + 1
+    else:
+        if page > total_pages and total_pages > 0:
+            page = total_pages
+        start = (page - 1) * page_size
     end = start + page_size
     page_records = records[start:end]
 
-    return jsonify({
+    payload = {
         'records': page_records,
         'total': total,
         'page': page,
         'page_size': page_size,
-        'total_pages': total_pages
-    })
\ No newline at end of file
+        'total_pages': total_pages,
+        'next_cursor': make_cursor(page_records[-1]) if page_records and end < total else None,
+    }
+    if horizon[0]:
+        payload['window_columns'] = window_columns(horizon)
+    return payload
+
+@forecast_bp.route('/export')
+def forecast_export():
+    """
+    Tabla de forecast completa con los filtros (y ventanas) de /forecast/data, sin paginar.
+    CSV o XLSX generado mientras se envía (conexiones/export_stream.py).
+    """
+    fmt = (request.args.get('format') or 'csv').lower()
+    if fmt not in export_stream.FORMATS:
+        return jsonify({'error': "Formato no soportado (use format=csv o format=xlsx)"}), 400
+    try:
+        horizon = parse_horizon()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    records = forecast_records(parse_filters(), horizon)
+    columns = FORECAST_EXPORT_COLUMNS + tuple((name, name) for name in window_columns(horizon))
+    ts = datetime.now().strftime('%Y%m%d_%H%M%S')
+    fields = [field for field, _ in columns]
+    rows = ([r[f] for f in fields] for r in records)
+    return export_stream.response(fmt, f'forecast_{ts}', [header for _, header in columns], rows, 'Forecast')
@@ -1,6 +1,5 @@
 import json
 from pathlib import Path
-from threading import Lock
 from flask import (
     Blueprint, render_template, jsonify, request, send_file
 )
@@ -8,6 +7,12 @@ from io import BytesIO
 import pandas as pd
 import re
 from datetime import datetime
+from conexiones import store_loader
+from conexiones import key_registry
+from conexiones import keys
+from conexiones import export_stream
+from conexiones.record_store import RecordStore
+from conexiones.columnar import ColumnarSnapshot
 
 inventario_bp = Blueprint(
     'inventario', __name__, url_prefix='/inventario',
@@ -22,7 +27,11 @@ JSON_PATH = PROJECT_DIR / JSON_REL_PATH
 PRODUCTOS_JSON_PATH = PROJECT_DIR / Path("conexiones") / "data_ops" / "productos_claro.json"
 PUNTOS_JSON_PATH = PROJECT_DIR / Path("conexiones") / "data_ops" / "puntos_venta_claro.json"
 
-_file_lock = Lock()
+# snapshot columnar tipado para forecast (Material/Centro categóricos, Inventario numérico)
+_columnar = ColumnarSnapshot(
+    JSON_PATH.with_name("inventario_claro.columnar"),
+    {"Centro Costos": "category", "Material": "category", "Inventario": "number"}
+)
 
 def _ensure_file(path=JSON_PATH):
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -31,41 +40,29 @@ def _ensure_file(path=JSON_PATH):
             json.dump([], f, ensure_ascii=False, indent=2)
 
 def read_items():
-    _ensure_file(JSON_PATH)
-    with _file_lock:
-        text = JSON_PATH.read_text(encoding="utf-8").strip()
-    if not text:
-        return []
-    try:
-        data = json.loads(text)
-        if isinstance(data, dict):
-            return [data]
-        if isinstance(data, list):
-            return data
-        return []
-    except json.JSONDecodeError:
-        res = []
-        for line in text.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                obj = json.loads(line)
-                res.append(obj)
-            except Exception:
-                continue
-        return res
+    return _store.read()
+
+def inventario_signature():
+    return _store.signature()
 
 def write_items(list_items):
-    _ensure_file(JSON_PATH)
-    with _file_lock:
-        with JSON_PATH.open("w", encoding="utf-8") as f:
-            json.dump(list_items, f, ensure_ascii=False, indent=2)
+    # reescritura completa (borrar todo): conserva los ids existentes
+    _store.rewrite(list_items)
+    _columnar.refresh_async(_store.signature, _raw_frame)
+
+def _raw_frame():
+    return pd.DataFrame(read_items(), columns=["Centro Costos", "Material", "Inventario"])
+
+def read_inventario_frame():
+    """DataFrame tipado desde el snapshot columnar (solo lectura)."""
+    sig = _store.signature()
+    return store_loader.load(f"{JSON_PATH}:columnar", sig, lambda: _columnar.load_or_build(sig, _raw_frame))
 
 def normalize_item(raw):
     """
     Normaliza keys entrantes a:
     "Centro Costos", "Material", "Inventario"
+    (Centro Costos y Material canónicos, ver conexiones/keys.py)
     """
     if not isinstance(raw, dict):
         return None
@@ -82,128 +79,39 @@ def normalize_item(raw):
     except Exception:
         inventario = 0
     return {
-        "Centro Costos": str(centro).strip(),
-        "Material": str(material).strip(),
+        "Centro Costos": keys.centro(centro),
+        "Material": keys.material(material),
         "Inventario": inventario
     }
 
-# helper para leer JSON genérico (productos / puntos)
-def _read_json(path: Path):
-    _ensure_file(path)
-    try:
-        txt = path.read_text(encoding="utf-8").strip()
-        if not txt:
-            return []
-        data = json.loads(txt)
-        if isinstance(data, dict):
-            return [data]
-        if isinstance(data, list):
-            return data
-        return []
-    except Exception:
-        # intentar newline-delimited
-        res = []
-        try:
-            raw = path.read_text(encoding="utf-8", errors="ignore")
-        except Exception:
-            return []
-        for line in raw.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                res.append(json.loads(line))
-            except Exception:
-                continue
-        return res
+# cada registro lleva un "id" estable; inserciones y ops por id van a inventario_claro.segments/*.ndjson
+_store = RecordStore(JSON_PATH, normalize=normalize_item)
 
-# --------- Canonicalización robusta ----------
-def _canon_material_variants(value):
-    """
-    Devuelve un set de variantes canónicas para un material:
-    - valor original string limpiado
-    - solo dígitos (sin espacios, sin .0)
-    - sin ceros a la izquierda
-    """
-    res = set()
-    if value is None:
-        return res
-    s = str(value).strip()
-    if not s:
-        return res
-    # original trimmed
-    res.add(s)
-    # extraer solo dígitos (si existen)
-    digits = re.sub(r'\D', '', s)
-    if digits:
-        # quitar ceros a la izquierda
-        nozeros = digits.lstrip('0') or '0'
-        res.add(digits)
-        res.add(nozeros)
-    # si tiene decimal como '1234.0', también añadir parte entera
-    m = re.match(r'^(\d+)\.0+$', s)
-    if m:
-        res.add(m.group(1))
-    return set(x for x in res if x is not None and x != "")
+def append_items(new_items):
+    added = _store.append(new_items)
+    _columnar.refresh_async(_store.signature, _raw_frame)
+    return added
 
-def _canon_centro_variants(value):
-    """
-    Devuelve variantes canónicas para centro de costos:
-    - uppercase, trimmed
-    - quitar espacios y caracteres no alfanuméricos
-    - si comienza con 'C' se añade variante sin 'C'
-    - si es sólo dígitos, se añade con prefijo 'C'
-    """
-    res = set()
-    if value is None:
-        return res
-    s = str(value).strip()
-    if not s:
-        return res
-    # original uppercase trimmed
-    s_up = s.upper()
-    res.add(s_up)
-    # solo alfanuméricos
-    alnum = re.sub(r'[^A-Za-z0-9]', '', s_up)
-    if alnum:
-        res.add(alnum)
-    # si empieza con C o c, variante sin C
-    if alnum.upper().startswith('C') and len(alnum) > 1:
-        without_c = alnum[1:]
-        res.add(without_c)
-    # si es solo dígitos, añade con prefijo C
-    only_digits = re.sub(r'\D', '', s)
-    if only_digits:
-        res.add(only_digits)
-        res.add(only_digits.lstrip('0') or '0')
-        res.add('C' + only_digits)
-    return set(x for x in res if x is not None and x != "")
+def update_item(item_id, raw):
+    # O(1): op "upd" en la cola del log
+    saved = _store.update(item_id, raw)
+    if saved is not None:
+        _columnar.refresh_async(_store.signature, _raw_frame)
+    return saved
+
+def delete_item(item_id):
+    ok = _store.delete(item_id)
+    if ok:
+        _columnar.refresh_async(_store.signature, _raw_frame)
+    return ok
 
-# Cargar sets canónicos desde productos/puntos
+# registros canónicos de productos / puntos (conexiones/key_registry.py): variante -> clave
+# del maestro, armados una vez por versión del maestro; validar es un probe O(1)
 def _load_existing_materials_canon():
-    data = _read_json(PRODUCTOS_JSON_PATH)
-    canon = set()
-    for item in data:
-        if not isinstance(item, dict):
-            continue
-        mat = item.get("Material") or item.get("material") or ""
-        for v in _canon_material_variants(mat):
-            canon.add(v)
-    return canon
+    return key_registry.materials(PRODUCTOS_JSON_PATH)
 
 def _load_existing_centros_canon():
-    data = _read_json(PUNTOS_JSON_PATH)
-    canon = set()
-    for item in data:
-        if not isinstance(item, dict):
-            continue
-        # intentar varias keys: "Centro Costos", "Centro", "Punto de Venta"
-        centro = item.get("Centro Costos") or item.get("Centro") or item.get("Punto de Venta") or item.get("punto de venta") or ""
-        for v in _canon_centro_variants(centro):
-            canon.add(v)
-    return canon
-
-# --------------------------------------------
+    return key_registry.centros(PUNTOS_JSON_PATH)
 
 @inventario_bp.route('/')
 def index():
@@ -224,35 +132,28 @@ def api_create_item():
     item = normalize_item(payload)
     if not item or not item.get("Material"):
         return jsonify({"error": "El campo 'Material' es obligatorio"}), 400
-    items = read_items()
-    items.append(item)  # permitimos duplicados
-    write_items(items)
+    item = append_items([item])[0]  # permitimos duplicados
     return jsonify(item), 201
 
-# API: actualizar por índice (no usamos ID en los objetos)
-@inventario_bp.route('/api/items/<int:index>', methods=['PUT'])
-def api_update_item(index):
+# API: actualizar por id
+@inventario_bp.route('/api/items/<int:item_id>', methods=['PUT'])
+def api_update_item(item_id):
     payload = request.get_json(force=True)
     if not payload:
         return jsonify({"error": "Cuerpo inválido"}), 400
-    items = read_items()
-    if index < 0 or index >= len(items):
-        return jsonify({"error": "Registro no encontrado"}), 404
     new_item = normalize_item(payload)
     if not new_item or not new_item.get("Material"):
         return jsonify({"error": "El campo 'Material' es obligatorio"}), 400
-    items[index] = new_item
-    write_items(items)
-    return jsonify(new_item), 200
+    saved = update_item(item_id, new_item)
+    if saved is None:
+        return jsonify({"error": "Registro no encontrado"}), 404
+    return jsonify(saved), 200
 
-# API: borrar uno por índice
-@inventario_bp.route('/api/items/<int:index>', methods=['DELETE'])
-def api_delete_item(index):
-    items = read_items()
-    if index < 0 or index >= len(items):
+# API: borrar uno por id
+@inventario_bp.route('/api/items/<int:item_id>', methods=['DELETE'])
+def api_delete_item(item_id):
+    if not delete_item(item_id):
         return jsonify({"error": "Registro no encontrado"}), 404
-    items.pop(index)
-    write_items(items)
     return jsonify({"ok": True}), 200
 
 # API: borrar todo (confirmación desde frontend)
@@ -265,30 +166,17 @@ def api_delete_all():
     write_items([])
     return jsonify({"ok": True, "deleted_all": True}), 200
 
-# API: exportar (Excel o JSON) - actualizado para incluir timestamp en el nombre de archivo
+# API: exportar (Excel, CSV o JSON) - actualizado para incluir timestamp en el nombre de archivo
 @inventario_bp.route('/api/export', methods=['GET'])
 def api_export():
     fmt = request.args.get("format", "excel").lower()
     items = read_items()
-    df = pd.DataFrame(items)
-    for c in ["Centro Costos", "Material", "Inventario"]:
-        if c not in df.columns:
-            df[c] = ""
-    df = df[["Centro Costos", "Material", "Inventario"]]
+    columns = ["Centro Costos", "Material", "Inventario"]
 
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    if fmt in ("excel", "xlsx"):
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="Inventario")
-        output.seek(0)
-        filename = f"inventario_claro_{ts}.xlsx"
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name=filename,
-            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+    if fmt in ("excel", "xlsx", "csv"):
+        rows = ([it.get(c) for c in columns] for it in items)
+        return export_stream.response(fmt, f"inventario_claro_{ts}", columns, rows, "Inventario")
     else:
         mem = BytesIO()
         mem.write(json.dumps(items, ensure_ascii=False, indent=2).encode("utf-8"))
@@ -325,9 +213,10 @@ def api_import():
             col_invent = get_col(["Inventario", "inventario", "Cantidad", "cantidad", "Qty", "qty"])
             if not col_material:
                 return jsonify({"error": "El archivo Excel debe tener una columna 'Material'"}), 400
-            for _, row in df.iterrows():
-                centro = str(row.get(col_centro) or "").strip() if col_centro else ""
-                material = str(row.get(col_material) or "").strip()
+            # claves canónicas por columna (conexiones/keys.py), una vez por valor distinto
+            centros = keys.centro_column(df[col_centro]) if col_centro else [""] * len(df)
+            materials = keys.material_column(df[col_material])
+            for (_, row), centro, material in zip(df.iterrows(), centros, materials):
                 invent = row.get(col_invent) if col_invent else 0
                 try:
                     invent = int(float(str(invent))) if str(invent).strip() != "" else 0
@@ -357,10 +246,8 @@ def api_import():
             if not n or not n.get("Material"):
                 continue
             norm.append(n)
-        items = read_items()
-        items.extend(norm)
-        write_items(items)
-        return jsonify({"ok": True, "added": len(norm), "total_after": len(items)}), 200
+        added = append_items(norm)
+        return jsonify({"ok": True, "added": len(added), "total_after": _store.count()}), 200
     except Exception as e:
         return jsonify({"error": "No se pudo parsear el archivo", "detail": str(e)}), 400
 
@@ -378,12 +265,10 @@ def api_pending():
         cen_raw = str(it.get("Centro Costos") or "").strip()
 
         # Si el material no tiene representación canónica en existing -> pendiente
-        mat_variants = _canon_material_variants(mat_raw)
-        if mat_raw and not (mat_variants & existing_materials_canon):
+        if mat_raw and existing_materials_canon.canonical(mat_raw) is None:
             missing_materials_set.add(mat_raw)
 
-        cen_variants = _canon_centro_variants(cen_raw)
-        if cen_raw and not (cen_variants & existing_centros_canon):
+        if cen_raw and existing_centros_canon.canonical(cen_raw) is None:
             missing_centros_set.add(cen_raw)
 
     return jsonify({
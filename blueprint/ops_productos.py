@@ -8,6 +8,9 @@ from flask import (
 )
 from io import BytesIO
 import pandas as pd
+from conexiones import store_loader
+from conexiones import export_stream
+from conexiones.trigram_index import TrigramIndex
 
 opsproductos_bp = Blueprint(
     'opsproductos', __name__,
@@ -23,6 +26,9 @@ JSON_PATH = PROJECT_DIR / JSON_REL_PATH
 
 _file_lock = Lock()
 
+SEARCH_LIMIT = 200
+SEARCH_MAX_LIMIT = 5000
+
 def _ensure_file():
     JSON_PATH.parent.mkdir(parents=True, exist_ok=True)
     if not JSON_PATH.exists():
@@ -31,36 +37,15 @@ def _ensure_file():
 
 def read_products():
     _ensure_file()
-    with _file_lock:
-        text = JSON_PATH.read_text(encoding="utf-8").strip()
-        if not text:
-            return []
-        try:
-            data = json.loads(text)
-            if isinstance(data, dict):
-                return [data]
-            if isinstance(data, list):
-                return data
-            return []
-        except json.JSONDecodeError:
-            # intentar parseo línea por línea (newline-delimited JSON)
-            res = []
-            for line in text.splitlines():
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    obj = json.loads(line)
-                    res.append(obj)
-                except Exception:
-                    continue
-            return res
+    # caché por mtime/tamaño (ver conexiones/store_loader.py)
+    return list(store_loader.load_json(JSON_PATH, lock=_file_lock))
 
 def write_products(list_products):
     _ensure_file()
     with _file_lock:
         with JSON_PATH.open("w", encoding="utf-8") as f:
             json.dump(list_products, f, ensure_ascii=False, indent=2)
+        store_loader.prime(JSON_PATH, store_loader.file_signature(JSON_PATH), list(list_products))
 
 def find_by_material(material, products=None):
     if products is None:
@@ -70,6 +55,19 @@ def find_by_material(material, products=None):
             return p
     return None
 
+def search_index():
+    """
+    (productos, TrigramIndex) sobre Material / Producto / Marca, cacheado por la firma
+    del JSON: se reconstruye solo cuando cambian los productos.
+    """
+    def _build():
+        products = read_products()
+        # separador que no puede aparecer en un término: no hay coincidencias entre campos
+        texts = ["\x00".join(str(p.get(k) or "") for k in ("Material", "Producto", "Marca")) for p in products]
+        return products, TrigramIndex(texts)
+    _ensure_file()
+    return store_loader.load(f"{JSON_PATH}:trigrams", store_loader.file_signature(JSON_PATH), _build)
+
 @opsproductos_bp.route('/')
 def index():
     return render_template('opsproductos.html')
@@ -80,6 +78,22 @@ def api_list_products():
     products = read_products()
     return jsonify(products), 200
 
+# API: buscar (subcadena, sin distinguir mayúsculas; varios términos = todos)
+@opsproductos_bp.route('/api/products/search', methods=['GET'])
+def api_search_products():
+    q = (request.args.get("q") or "").strip()
+    try:
+        limit = int(request.args.get("limit", SEARCH_LIMIT))
+    except ValueError:
+        return jsonify({"error": "limit debe ser un entero"}), 400
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    products, index = search_index()
+    ids = index.search_all(q.split())
+    return jsonify({
+        "items": [products[i] for i in ids[:limit].tolist()],
+        "total": int(len(ids)),
+    }), 200
+
 # API: crear
 @opsproductos_bp.route('/api/products', methods=['POST'])
 def api_create_product():
@@ -120,6 +134,10 @@ def api_update_product(material):
         if find_by_material(new_material, products):
             return jsonify({"error":"No se puede cambiar Material, ya existe otro registro con ese número"}), 409
 
+    # copiar antes de editar: los dicts son compartidos con la caché
+    pos = next(i for i, p in enumerate(products) if p is target)
+    target = dict(target)
+    products[pos] = target
     target["Material"] = new_material
     target["Producto"] = payload.get("Producto", target.get("Producto", ""))
     target["Marca"] = payload.get("Marca", target.get("Marca", ""))
@@ -147,33 +165,17 @@ def api_delete_all():
     write_products([])
     return jsonify({"ok":True, "deleted_all": True}), 200
 
-# API: exportar (Excel o JSON)
+# API: exportar (Excel, CSV o JSON)
 @opsproductos_bp.route('/api/export', methods=['GET'])
 def api_export():
     fmt = request.args.get("format", "excel").lower()
     products = read_products()
 
-    # Normalizar estructura a DataFrame
-    df = pd.DataFrame(products)
-    # asegurar columnas
-    for c in ["Material","Producto","Marca"]:
-        if c not in df.columns:
-            df[c] = ""
-
-    df = df[["Material","Producto","Marca"]]
-
-    if fmt in ("excel","xlsx"):
-        output = BytesIO()
-        # Exportar a Excel sin índice
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="Productos")
-        output.seek(0)
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name="productos_claro.xlsx",
-            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+    columns = ["Material","Producto","Marca"]
+
+    if fmt in ("excel","xlsx","csv"):
+        rows = ([it.get(c) for c in columns] for it in products)
+        return export_stream.response(fmt, "productos_claro", columns, rows, "Productos")
     else:
         # exportar JSON por compatibilidad
         mem = BytesIO()
@@ -7,6 +7,8 @@ from flask import (
 )
 from io import BytesIO
 import pandas as pd
+from conexiones import store_loader
+from conexiones import export_stream
 
 opspuntos_bp = Blueprint(
     'opspuntos', __name__,
@@ -28,44 +30,27 @@ def _ensure_file():
         with JSON_PATH.open("w", encoding="utf-8") as f:
             json.dump([], f, ensure_ascii=False, indent=2)
 
-def _normalize_centro(centro):
-    """Normalize Centro Costos for comparison (strip + lower)"""
-    if centro is None:
-        return ""
-    return str(centro).strip().lower()
-
 def read_puntos():
     _ensure_file()
-    with _file_lock:
-        text = JSON_PATH.read_text(encoding="utf-8").strip()
-        if not text:
-            return []
-        try:
-            data = json.loads(text)
-            if isinstance(data, dict):
-                return [data]
-            if isinstance(data, list):
-                return data
-            return []
-        except json.JSONDecodeError:
-            # intentar parseo línea por línea (newline-delimited JSON)
-            res = []
-            for line in text.splitlines():
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    obj = json.loads(line)
-                    res.append(obj)
-                except Exception:
-                    continue
-            return res
+    # caché por mtime/tamaño (ver conexiones/store_loader.py)
+    return list(store_loader.load_json(JSON_PATH, lock=_file_lock))
 
 def write_puntos(list_puntos):
     _ensure_file()
     with _file_lock:
         with JSON_PATH.open("w", encoding="utf-8") as f:
             json.dump(list_puntos, f, ensure_ascii=False, indent=2)
+        store_loader.prime(JSON_PATH, store_loader.file_signature(JSON_PATH), list(list_puntos))
+
+def _normalize_centro(centro):
+    """
+    Normalize Centro Costos for comparison (strip + lower).
+    Es la regla de unicidad del maestro de puntos: no usa keys.centro, que además quita
+    espacios internos ('C 108' y 'c108' son dos puntos distintos aquí).
+    """
+    if centro is None:
+        return ""
+    return str(centro).strip().lower()
 
 def find_by_centro(centro, puntos=None):
     """Busca por Centro Costos normalizado (case-insensitive, trim)"""
@@ -134,6 +119,10 @@ def api_update_punto(centro):
         if find_by_centro(new_centro, puntos):
             return jsonify({"error":"No se puede cambiar Centro Costos, ya existe otro registro con ese número"}), 409
 
+    # copiar antes de editar: los dicts son compartidos con la caché
+    pos = next(i for i, p in enumerate(puntos) if p is target)
+    target = dict(target)
+    puntos[pos] = target
     target["Centro Costos"] = new_centro
     target["Punto de Venta"] = payload.get("Punto de Venta", target.get("Punto de Venta", "")).strip()
     target["Canal o Regional"] = payload.get("Canal o Regional", target.get("Canal o Regional", "")).strip()
@@ -162,33 +151,17 @@ def api_delete_all():
     write_puntos([])
     return jsonify({"ok":True, "deleted_all": True}), 200
 
-# API: exportar (Excel o JSON)
+# API: exportar (Excel, CSV o JSON)
 @opspuntos_bp.route('/api/export', methods=['GET'])
 def api_export():
     fmt = request.args.get("format", "excel").lower()
     puntos = read_puntos()
 
-    # Normalizar estructura a DataFrame
-    df = pd.DataFrame(puntos)
-    # asegurar columnas
-    for c in ["Centro Costos","Punto de Venta","Canal o Regional","Tipo"]:
-        if c not in df.columns:
-            df[c] = ""
-
-    df = df[["Centro Costos","Punto de Venta","Canal o Regional","Tipo"]]
-
-    if fmt in ("excel","xlsx"):
-        output = BytesIO()
-        # Exportar a Excel sin índice
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="PuntosVenta")
-        output.seek(0)
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name="puntos_venta_claro.xlsx",
-            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+    columns = ["Centro Costos","Punto de Venta","Canal o Regional","Tipo"]
+
+    if fmt in ("excel","xlsx","csv"):
+        rows = ([it.get(c) for c in columns] for it in puntos)
+        return export_stream.response(fmt, "puntos_venta_claro", columns, rows, "PuntosVenta")
     else:
         # exportar JSON por compatibilidad
         mem = BytesIO()
@@ -1,11 +1,27 @@
 import json
 from pathlib import Path
-from threading import Lock
-from flask import Blueprint, render_template, jsonify, request, send_file
+from threading import RLock
+from flask import Blueprint, render_template, jsonify, request, send_file, url_for
+from flask_jwt_extended import get_jwt_identity
 from io import BytesIO
+import os
+import tempfile
 import pandas as pd
+from pandas.io.parsers import TextParser
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
 from datetime import datetime, date
-import time
+import math
+import calendar
+import numpy as np
+from conexiones.partitioned_store import PartitionedRecordStore
+from conexiones import store_loader
+from conexiones import key_registry
+from conexiones import keys
+from conexiones import export_stream
+from conexiones.ventas_cube import VentasCube
+from conexiones import dates
+from conexiones.import_jobs import ImportJobQueue, ImportJobError
 
 ventasclaro_bp = Blueprint(
     'ventasclaro', __name__,
@@ -17,15 +33,24 @@ ventasclaro_bp = Blueprint(
 PROJECT_DIR = Path(__file__).resolve().parent.parent
 JSON_REL_PATH = Path("conexiones") / "data_ops" / "ventas_claro.json"
 JSON_PATH = PROJECT_DIR / JSON_REL_PATH
+# ventas particionadas por mes (ventas_claro/2025-09.json, ...); JSON_PATH es solo el origen de la
+# migración inicial (queda en su lugar; el manifest de VENTAS_DIR la registra)
+VENTAS_DIR = JSON_PATH.with_suffix("")
+UNDATED_PARTITION = "sin_fecha"
 
 # rutas relativas adicionales para validar existencia
 PRODUCTOS_JSON_PATH = PROJECT_DIR / Path("conexiones") / "data_ops" / "productos_claro.json"
 PUNTOS_JSON_PATH = PROJECT_DIR / Path("conexiones") / "data_ops" / "puntos_venta_claro.json"
 
-_file_lock = Lock()
-_import_lock = Lock()
-_last_import_time = 0
-_import_cooldown = 30  # 30 segundos de espera
+_VENTAS_CACHE_KEY = "ventas_claro"
+VENTAS_COLUMNS = ["Centro Costos", "Material", "Fecha Venta", "Cantidad"]
+# agregado mensual Centro × Material × Mes mantenido en cada escritura (forecast, cruzar, meses)
+_ventas_cube = VentasCube(JSON_PATH.with_name("ventas_claro.cube.json"))
+_cube_lock = RLock()
+# importaciones en segundo plano: se encolan y se procesan de a una, por bloques de filas;
+# el estado de cada trabajo queda en data_ops/import_jobs/ (visible desde cualquier worker)
+_import_jobs = ImportJobQueue("ventas", JSON_PATH.with_name("import_jobs"))
+IMPORT_CHUNK_ROWS = 10_000
 
 def _ensure_file(path=JSON_PATH):
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -33,177 +58,233 @@ def _ensure_file(path=JSON_PATH):
         with path.open("w", encoding="utf-8") as f:
             json.dump([], f, ensure_ascii=False, indent=2)
 
-def _normalize_date_str(s):
-    if s is None:
-        return ""
-    s = str(s).strip()
-    if not s:
-        return ""
-    for fmt in ("%Y-%m-%d","%d/%m/%Y","%d-%m-%Y","%Y/%m/%d","%m/%d/%Y"):
-        try:
-            dt = datetime.strptime(s, fmt)
-            return dt.strftime("%Y-%m-%d")
-        except Exception:
+def _coerce_cantidad_series(values):
+    """Cantidades a número (vacío / inválido -> 0); enteros como int y el resto como float."""
+    q = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+    q[~np.isfinite(q)] = 0
+    integral = np.mod(q, 1) == 0
+    out = np.array(q.tolist(), dtype=object)
+    out[integral] = q[integral].astype(np.int64).tolist()
+    return out
+
+def build_import_columns(centro, material, fecha=None, cantidad=None):
+    """
+    Etapa vectorizada del import: recibe columnas crudas (Series / arrays) y devuelve
+    un DataFrame con VENTAS_COLUMNS ya normalizadas (centro y material canónicos, ver
+    conexiones/keys.py), sin filas sin centro ni material.
+    """
+    n = len(centro)
+    cols = {
+        "Centro Costos": keys.centro_column(centro),
+        "Material": keys.material_column(material),
+        "Fecha Venta": dates.normalize_dates(fecha) if fecha is not None else np.full(n, "", dtype=object),
+        "Cantidad": _coerce_cantidad_series(cantidad) if cantidad is not None else np.zeros(n, dtype=object),
+    }
+    df = pd.DataFrame(cols, columns=VENTAS_COLUMNS)
+    keep = (df["Centro Costos"] != "") | (df["Material"] != "")
+    return df[keep].reset_index(drop=True)
+
+def _coalesce_columns(df, names):
+    """Primer valor no vacío entre varias columnas alternativas (equivale a a or b or c)."""
+    result = None
+    for name in names:
+        if name not in df.columns:
             continue
-    return s
-
-def _read_json(path):
-    _ensure_file(path)
+        col = df[name]
+        if result is None:
+            result = col.copy()
+            continue
+        falsy = result.isna() | result.isin(["", 0, False])
+        result = result.where(~falsy, col)
+    return result
+
+def _import_rows(df):
+    """DataFrame de build_import_columns -> dicts para el store (único paso fila a fila)."""
+    return [dict(zip(VENTAS_COLUMNS, t)) for t in zip(*(df[c].tolist() for c in VENTAS_COLUMNS))]
+
+def _normalize_venta(o):
+    centro = keys.centro(o.get("Centro Costos") or o.get("centro_costos") or o.get("centro") or "")
+    material = keys.material(o.get("Material") or o.get("material") or "")
+    fecha = dates.normalize_date_str(o.get("Fecha Venta") or o.get("fecha_venta") or o.get("fecha") or "")
+    cantidad_raw = o.get("Cantidad", 0)
     try:
-        text = path.read_text(encoding="utf-8").strip()
-        if not text:
-            return []
-        data = json.loads(text)
-        if isinstance(data, dict):
-            return [data]
-        if isinstance(data, list):
-            return data
-        return []
-    except Exception:
-        res = []
-        raw = path.read_text(encoding="utf-8", errors="ignore")
-        for line in raw.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                res.append(json.loads(line))
-            except Exception:
-                continue
-        return res
-
-def read_ventas():
-    _ensure_file(JSON_PATH)
-    with _file_lock:
-        text = JSON_PATH.read_text(encoding="utf-8").strip()
-        if not text:
-            return []
-        try:
-            data = json.loads(text)
-            if isinstance(data, dict):
-                objs = [data]
-            elif isinstance(data, list):
-                objs = data
+        if cantidad_raw is None or cantidad_raw == "":
+            cantidad = 0
+        else:
+            if isinstance(cantidad_raw, (int, float)):
+                cantidad = cantidad_raw
             else:
-                return []
-            clean = []
-            for o in objs:
-                if not isinstance(o, dict):
-                    continue
-                centro = str(o.get("Centro Costos") or o.get("centro_costos") or o.get("centro") or "").strip()
-                material = str(o.get("Material") or o.get("material") or "").strip()
-                fecha = _normalize_date_str(o.get("Fecha Venta") or o.get("fecha_venta") or o.get("fecha") or "")
-                cantidad_raw = o.get("Cantidad", 0)
-                try:
-                    if cantidad_raw is None or cantidad_raw == "":
-                        cantidad = 0
-                    else:
-                        if isinstance(cantidad_raw, (int, float)):
-                            cantidad = cantidad_raw
-                        else:
-                            cantidad = float(str(cantidad_raw).strip())
-                            if float(cantidad).is_integer():
-                                cantidad = int(cantidad)
-                except Exception:
-                    cantidad = 0
-                if centro == "" and material == "":
-                    continue
-                clean.append({
-                    "Centro Costos": centro,
-                    "Material": material,
-                    "Fecha Venta": fecha,
-                    "Cantidad": cantidad
-                })
-            return clean
-        except json.JSONDecodeError:
-            res = []
-            for line in text.splitlines():
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    o = json.loads(line)
-                except Exception:
-                    continue
-                centro = str(o.get("Centro Costos") or o.get("centro_costos") or o.get("centro") or "").strip()
-                material = str(o.get("Material") or o.get("material") or "").strip()
-                fecha = _normalize_date_str(o.get("Fecha Venta") or o.get("fecha_venta") or o.get("fecha") or "")
-                cantidad_raw = o.get("Cantidad", 0)
-                try:
-                    if cantidad_raw is None or cantidad_raw == "":
-                        cantidad = 0
-                    else:
-                        if isinstance(cantidad_raw, (int, float)):
-                            cantidad = cantidad_raw
-                        else:
-                            cantidad = float(str(cantidad_raw).strip())
-                            if float(cantidad).is_integer():
-                                cantidad = int(cantidad)
-                except Exception:
-                    cantidad = 0
-                if centro == "" and material == "":
-                    continue
-                res.append({
-                    "Centro Costos": centro,
-                    "Material": material,
-                    "Fecha Venta": fecha,
-                    "Cantidad": cantidad
-                })
-            return res
-
-def write_ventas(list_ventas):
-    _ensure_file(JSON_PATH)
-    with _file_lock:
-        with JSON_PATH.open("w", encoding="utf-8") as f:
-            json.dump(list_ventas, f, ensure_ascii=False, indent=2)
-
-# helpers para validar existencia
-def _load_existing_materials():
-    data = _read_json(PRODUCTOS_JSON_PATH)
-    return { str(item.get("Material") or "").strip() for item in data if item }
+                cantidad = float(str(cantidad_raw).strip())
+                if float(cantidad).is_integer():
+                    cantidad = int(cantidad)
+    except Exception:
+        cantidad = 0
+    if centro == "" and material == "":
+        return None
+    return {
+        "Centro Costos": centro,
+        "Material": material,
+        "Fecha Venta": fecha,
+        "Cantidad": cantidad
+    }
 
-def _load_existing_centros():
-    data = _read_json(PUNTOS_JSON_PATH)
-    return { str(item.get("Centro Costos") or item.get("Centro") or "").strip() for item in data if item }
+def _venta_partitions(ventas):
+    # partición = mes de "Fecha Venta" (misma regla que el cubo); sin fecha válida -> UNDATED_PARTITION
+    return [f"{ym[0]:04d}-{ym[1]:02d}" if ym else UNDATED_PARTITION
+            for ym in dates.month_of([v.get("Fecha Venta") for v in ventas])]
 
-# util for parsing normalized date to datetime.date
-def _parse_norm_date_to_date(norm):
-    if norm is None:
-        return None
-    if isinstance(norm, date):
-        return norm
-    if isinstance(norm, datetime):
-        return norm.date()
+# una partición por mes (ver conexiones/partitioned_store.py); cada venta lleva un "id" estable.
+# layout 2: month_of reconoce seriales de Excel (antes iban a sin_fecha)
+_ventas_store = PartitionedRecordStore(
+    VENTAS_DIR, _venta_partitions, normalize=_normalize_venta,
+    cache_key=_VENTAS_CACHE_KEY, legacy_path=JSON_PATH, layout=2
+)
 
-    s = str(norm).strip()
-    if not s:
-        return None
+def ventas_signature():
+    return _ventas_store.signature()
 
-    # Caso serial de Excel (ejemplo: 45292)
-    try:
-        if s.isdigit() and len(s) <= 5:
-            serial = int(s)
-            return (datetime(1899, 12, 30) + pd.to_timedelta(serial, unit="D")).date()
-    except Exception:
-        pass
+def read_ventas_shared():
+    # lista cacheada (compartida, solo lectura) para lectores analíticos
+    return _ventas_store.read_shared()
 
-    # Parseo robusto (incluye valores con hora)
-    try:
-        dt = pd.to_datetime(s, errors="coerce")
-        if pd.notna(dt):
-            return dt.date()
-    except Exception:
-        pass
+def read_ventas():
+    return list(read_ventas_shared())
+
+def _month_partitions(months):
+    return [f"{y:04d}-{m:02d}" for y, m in months]
+
+def ventas_months_signature(months):
+    """Firma de las particiones de los meses pedidos (cambia solo si se escriben esos meses)."""
+    return _ventas_store.partition_signature(_month_partitions(months))
+
+def read_ventas_months(months):
+    """Ventas de los meses pedidos [(año, mes)]: solo se leen esas particiones."""
+    return _ventas_store.read_partitions(_month_partitions(months))
+
+def _sync_cube():
+    """Deja el cubo en la versión actual del store (persistido o reconstruido). Con _cube_lock."""
+    sig = ventas_signature()
+    if _ventas_cube.signature == sig:
+        return
+    if not _ventas_cube.load(sig):
+        _ventas_cube.rebuild(read_ventas_shared())
+        _ventas_cube.signature = sig
+        _ventas_cube.persist_async(_cube_lock)
+
+def _cube_written():
+    # tras aplicar el delta de una escritura: nueva firma + guardado en segundo plano
+    _ventas_cube.signature = ventas_signature()
+    _ventas_cube.persist_async(_cube_lock)
+
+def ventas_cube_view():
+    """
+    Vista del agregado mensual (ver conexiones/ventas_cube.py):
+    {"monthly": {(cc, mat, año, mes): suma}, "median": {(cc, mat): mediana},
+     "pairs": [(cc, mat)], "months": [(año, mes)]}. Compartida, solo lectura.
+    """
+    sig = ventas_signature()
+
+    def _build():
+        with _cube_lock:
+            _sync_cube()
+            return _ventas_cube.view()
+    return store_loader.load(_VENTAS_CACHE_KEY + ":cube_view", sig, _build)
 
-    # Fallback con dayfirst para formatos regionales
-    try:
-        dt = pd.to_datetime(s, dayfirst=True, errors="coerce")
-        if pd.notna(dt):
-            return dt.date()
-    except Exception:
-        pass
+def write_ventas(list_ventas):
+    # reescritura completa (borrado total): nuevas particiones, conserva los ids
+    with _cube_lock:
+        _sync_cube()
+        _ventas_store.rewrite(list_ventas)
+        _ventas_cube.rebuild(list_ventas)
+        _cube_written()
+
+def append_ventas(new_ventas, clean=True):
+    # inserción O(filas nuevas): solo escribe al segmento activo; devuelve las ventas con id
+    # clean=False: filas ya normalizadas (import vectorizado), no se renormalizan una a una
+    with _cube_lock:
+        _sync_cube()
+        added = _ventas_store.append(new_ventas, clean=clean)
+        if added:
+            _ventas_cube.add(added)
+            _cube_written()
+    return added
+
+def get_venta(venta_id):
+    return _ventas_store.get(venta_id)
+
+def update_venta(venta_id, venta):
+    # O(1): op "upd" en la cola del log; el cubo descuenta la versión anterior y suma la nueva
+    with _cube_lock:
+        _sync_cube()
+        old = get_venta(venta_id)
+        saved = _ventas_store.update(venta_id, venta)
+        if saved is not None:
+            _ventas_cube.remove([old])
+            _ventas_cube.add([saved])
+            _cube_written()
+    return saved
+
+def delete_venta(venta_id):
+    with _cube_lock:
+        _sync_cube()
+        old = get_venta(venta_id)
+        ok = _ventas_store.delete(venta_id)
+        if ok:
+            _ventas_cube.remove([old])
+            _cube_written()
+    return ok
+
+def count_ventas():
+    return _ventas_store.count()
+
+def _date_in_range(dt, start_dt, end_dt):
+    if start_dt and dt < start_dt:
+        return False
+    if end_dt and dt > end_dt:
+        return False
+    return True
+
+def delete_ventas_range(start_dt, end_dt):
+    """
+    Borra las ventas con fecha dentro de [start_dt, end_dt] (cualquiera de los dos puede
+    ser None). Devuelve las ventas eliminadas.
+    Los meses completamente dentro del rango se eliminan como partición (sin leer filas);
+    los meses del borde y las ventas sin fecha válida se filtran fila a fila como antes
+    (dates.parse_date; lo que no se puede parsear no se borra).
+    """
+    def keep(v):
+        dt = dates.parse_date(v.get("Fecha Venta") or "")
+        return not (dt and _date_in_range(dt, start_dt, end_dt))
+
+    with _cube_lock:
+        _sync_cube()
+        drop, trim = [], []
+        for part in _ventas_store.partitions():
+            if part == UNDATED_PARTITION:
+                trim.append(part)
+                continue
+            y, m = (int(x) for x in part.split("-"))
+            first = date(y, m, 1)
+            last = date(y, m, calendar.monthrange(y, m)[1])
+            if _date_in_range(first, start_dt, end_dt) and _date_in_range(last, start_dt, end_dt):
+                drop.append(part)
+            elif (end_dt is None or first <= end_dt) and (start_dt is None or last >= start_dt):
+                trim.append(part)
+        removed = _ventas_store.drop_partitions(drop)
+        for part in trim:
+            removed.extend(_ventas_store.filter_partition(part, keep))
+        if removed:
+            _ventas_cube.remove(removed)
+            _cube_written()
+    return removed
+
+# registros de claves de productos / puntos (conexiones/key_registry.py): se arman una vez
+# por versión del maestro y validar es un probe O(1) (`valor in registro`)
+def _load_existing_materials():
+    return key_registry.materials(PRODUCTOS_JSON_PATH)
 
-    return None
+def _load_existing_centros():
+    return key_registry.centros(PUNTOS_JSON_PATH)
 
 # Spanish month names
 SPANISH_MONTHS = [
@@ -215,11 +296,175 @@ SPANISH_MONTHS = [
 def index():
     return render_template('ventasclaro.html')
 
-# Listar
+# ---------- índice en memoria para el listado paginado ----------
+# campos ordenables: parámetro sort -> columna (prefijo "-" = descendente)
+SORT_FIELDS = {
+    "id": None,
+    "centro": "Centro Costos",
+    "material": "Material",
+    "fecha": "Fecha Venta",
+    "cantidad": "Cantidad",
+}
+_NO_DATE = np.iinfo(np.int64).min
+
+def _build_ventas_index():
+    """
+    Índice columnar sobre la lista cacheada (una vez por versión del store):
+    códigos de centro/material, fecha como día ordinal, mes (año*12+mes),
+    rangos para ordenar y cantidades. La lista se guarda junto al índice
+    para que posiciones e items siempre correspondan a la misma versión.
+    """
+    ventas = read_ventas_shared()
+    n = len(ventas)
+    centros = pd.Series([v["Centro Costos"] for v in ventas], dtype=object)
+    materiales = pd.Series([v["Material"] for v in ventas], dtype=object)
+    fechas_raw = pd.Series([v["Fecha Venta"] for v in ventas], dtype=object)
+    cantidades = pd.to_numeric(pd.Series([v["Cantidad"] for v in ventas], dtype=object),
+                               errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+
+    # fechas: se parsea cada string distinto una sola vez (conexiones/dates.py)
+    uniq = pd.unique(fechas_raw)
+    dias_map, meses_map = {}, {}
+    for u, d in zip(uniq, dates.parse_dates(uniq)):
+        dias_map[u] = d.toordinal() if d else _NO_DATE
+        meses_map[u] = d.year * 12 + d.month - 1 if d else -1
+    dias = fechas_raw.map(dias_map).to_numpy(dtype=np.int64)
+    meses = fechas_raw.map(meses_map).to_numpy(dtype=np.int64)
+
+    centro_codes, centro_uniq = pd.factorize(centros.str.lower())
+    material_codes, material_uniq = pd.factorize(materiales.str.lower())
+    return {
+        "rows": ventas,
+        "n": n,
+        "centro_codes": centro_codes,
+        "centro_lookup": {u: i for i, u in enumerate(centro_uniq)},
+        "material_codes": material_codes,
+        "material_lookup": {u: i for i, u in enumerate(material_uniq)},
+        "dias": dias,
+        "meses": meses,
+        "cantidades": cantidades,
+        "rank": {
+            "Centro Costos": pd.factorize(centros, sort=True)[0],
+            "Material": pd.factorize(materiales, sort=True)[0],
+            "Fecha Venta": dias,
+            "Cantidad": cantidades,
+        },
+    }
+
+def ventas_index():
+    return store_loader.load(_VENTAS_CACHE_KEY + ":index", ventas_signature(), _build_ventas_index)
+
+def _parse_month_param(raw):
+    """'YYYY-MM' o 'septiembre-2025' -> año*12+mes-1 (None si no es válido)."""
+    raw = (raw or "").strip().lower()
+    if not raw:
+        return None
+    parts = raw.split("-")
+    if len(parts) != 2:
+        return None
+    a, b = parts
+    try:
+        if a.isdigit():
+            y, m = int(a), int(b)
+        else:
+            y, m = int(b), SPANISH_MONTHS.index(a)
+    except ValueError:
+        return None
+    if not 1 <= m <= 12:
+        return None
+    return y * 12 + m - 1
+
+def _codes_mask(codes, lookup, values):
+    wanted = [lookup[v] for v in values if v in lookup]
+    if not wanted:
+        return np.zeros(len(codes), dtype=bool)
+    return np.isin(codes, wanted)
+
+def query_ventas(centros=None, materiales=None, start=None, end=None, month=None, sort=None):
+    """
+    Filtra/ordena sobre el índice. Devuelve (índice, posiciones) en el orden pedido;
+    el orden por defecto ("id") es el de inserción.
+    """
+    index = ventas_index()
+    mask = np.ones(index["n"], dtype=bool)
+    if centros:
+        mask &= _codes_mask(index["centro_codes"], index["centro_lookup"], centros)
+    if materiales:
+        mask &= _codes_mask(index["material_codes"], index["material_lookup"], materiales)
+    if start or end:
+        dias = index["dias"]
+        mask &= dias != _NO_DATE
+        if start:
+            mask &= dias >= start.toordinal()
+        if end:
+            mask &= dias <= end.toordinal()
+    if month is not None:
+        mask &= index["meses"] == month
+    positions = np.flatnonzero(mask)
+
+    field, desc = "id", False
+    if sort:
+        desc = sort.startswith("-")
+        field = sort.lstrip("-+").lower()
+    column = SORT_FIELDS.get(field)
+    if column is not None:
+        keys = index["rank"][column][positions]
+        order = np.argsort(-keys if desc else keys, kind="stable")
+        positions = positions[order]
+    elif desc:
+        positions = positions[::-1]
+    return index, positions
+
+# Listar (paginado y filtrado en servidor)
 @ventasclaro_bp.route('/api/ventas', methods=['GET'])
 def api_list_ventas():
-    ventas = read_ventas()
-    return jsonify(ventas), 200
+    args = request.args
+    try:
+        page = max(1, int(args.get('page', 1)))
+    except Exception:
+        page = 1
+    try:
+        page_size = int(args.get('page_size', 50))
+        if page_size <= 0:
+            page_size = 50
+    except Exception:
+        page_size = 50
+    if page_size > 1000:
+        page_size = 1000
+
+    def _multi(name):
+        return [p.strip().lower() for p in (args.get(name) or "").split(",") if p.strip()]
+
+    start = dates.parse_date(dates.normalize_date_str(args.get('start_date'))) if args.get('start_date') else None
+    end = dates.parse_date(dates.normalize_date_str(args.get('end_date'))) if args.get('end_date') else None
+    month = None
+    if args.get('month'):
+        month = _parse_month_param(args.get('month'))
+        if month is None:
+            return jsonify({"error": "month inválido, use YYYY-MM"}), 400
+    sort = (args.get('sort') or "").strip()
+    if sort and sort.lstrip("-+").lower() not in SORT_FIELDS:
+        return jsonify({"error": f"sort inválido, use uno de: {', '.join(SORT_FIELDS)}"}), 400
+
+    index, positions = query_ventas(_multi('centro'), _multi('material'), start, end, month, sort)
+
+    total = int(len(positions))
+    total_pages = math.ceil(total / page_size) if total else 1
+    if page > total_pages:
+        page = total_pages
+    page_pos = positions[(page - 1) * page_size: page * page_size]
+    rows = index["rows"]
+    records = [rows[i] for i in page_pos]
+
+    return jsonify({
+        "records": records,
+        "total": total,
+        "total_all": index["n"],
+        "cantidad_total": float(index["cantidades"][positions].sum()) if total else 0,
+        "page": page,
+        "page_size": page_size,
+        "total_pages": total_pages
+    }), 200
 
 # Crear (añade al final) - devuelve missing_materials y missing_centros si aplica
 @ventasclaro_bp.route('/api/ventas', methods=['POST'])
@@ -230,7 +475,7 @@ def api_create_venta():
 
     centro = str(payload.get("Centro Costos","")).strip()
     material = str(payload.get("Material","")).strip()
-    fecha = _normalize_date_str(payload.get("Fecha Venta",""))
+    fecha = dates.normalize_date_str(payload.get("Fecha Venta",""))
     cantidad_raw = payload.get("Cantidad", 0)
     try:
         if cantidad_raw is None or cantidad_raw == "":
@@ -252,9 +497,10 @@ def api_create_venta():
         "Cantidad": cantidad
     }
 
-    ventas = read_ventas()
-    ventas.append(new_obj)
-    write_ventas(ventas)
+    added = append_ventas([new_obj])
+    if not added:
+        return jsonify({"error":"Se requiere Centro Costos o Material"}), 400
+    new_obj = added[0]
 
     existing_materials = _load_existing_materials()
     existing_centros = _load_existing_centros()
@@ -274,22 +520,24 @@ def api_create_venta():
 
     return jsonify(resp), 201
 
-# Actualizar por índice (0-based) - valida y devuelve missing si aplica
-@ventasclaro_bp.route('/api/ventas/<int:idx>', methods=['PUT'])
-def api_update_venta(idx):
+# Actualizar por id - valida y devuelve missing si aplica
+@ventasclaro_bp.route('/api/ventas/<int:venta_id>', methods=['PUT'])
+def api_update_venta(venta_id):
     payload = request.get_json(force=True)
     if not payload:
         return jsonify({"error":"Cuerpo inválido"}), 400
-    ventas = read_ventas()
-    if idx < 0 or idx >= len(ventas):
-        return jsonify({"error":"Índice fuera de rango"}), 404
+    current = get_venta(venta_id)
+    if current is None:
+        return jsonify({"error":"Registro no encontrado"}), 404
+    # copiar la fila: los registros del store son compartidos con la caché
+    venta = dict(current)
 
     if "Centro Costos" in payload:
-        ventas[idx]["Centro Costos"] = str(payload.get("Centro Costos") or "").strip()
+        venta["Centro Costos"] = str(payload.get("Centro Costos") or "").strip()
     if "Material" in payload:
-        ventas[idx]["Material"] = str(payload.get("Material") or "").strip()
+        venta["Material"] = str(payload.get("Material") or "").strip()
     if "Fecha Venta" in payload:
-        ventas[idx]["Fecha Venta"] = _normalize_date_str(payload.get("Fecha Venta") or "")
+        venta["Fecha Venta"] = dates.normalize_date_str(payload.get("Fecha Venta") or "")
     if "Cantidad" in payload:
         try:
             cr = payload.get("Cantidad")
@@ -302,15 +550,19 @@ def api_update_venta(idx):
                     cval = float(str(cr).strip())
                     if float(cval).is_integer():
                         cval = int(cval)
-            ventas[idx]["Cantidad"] = cval
+            venta["Cantidad"] = cval
         except Exception:
             return jsonify({"error":"Campo 'Cantidad' inválido"}), 400
 
-    write_ventas(ventas)
+    vm = update_venta(venta_id, venta)
+    if vm is None:
+        # borrada entre la lectura y la escritura, o quedó sin centro ni material
+        if get_venta(venta_id) is None:
+            return jsonify({"error":"Registro no encontrado"}), 404
+        return jsonify({"error":"Se requiere Centro Costos o Material"}), 400
 
     existing_materials = _load_existing_materials()
     existing_centros = _load_existing_centros()
-    vm = ventas[idx]
     missing_materials = []
     missing_centros = []
     if vm.get("Material") and vm.get("Material") not in existing_materials:
@@ -318,21 +570,18 @@ def api_update_venta(idx):
     if vm.get("Centro Costos") and vm.get("Centro Costos") not in existing_centros:
         missing_centros.append(vm.get("Centro Costos"))
 
-    resp = {"ok": True, "venta": ventas[idx]}
+    resp = {"ok": True, "venta": vm}
     if missing_materials or missing_centros:
         resp["missing_materials"] = list(dict.fromkeys(missing_materials))
         resp["missing_centros"] = list(dict.fromkeys(missing_centros))
 
     return jsonify(resp), 200
 
-# Borrar por índice
-@ventasclaro_bp.route('/api/ventas/<int:idx>', methods=['DELETE'])
-def api_delete_venta(idx):
-    ventas = read_ventas()
-    if idx < 0 or idx >= len(ventas):
-        return jsonify({"error":"Índice fuera de rango"}), 404
-    ventas.pop(idx)
-    write_ventas(ventas)
+# Borrar por id
+@ventasclaro_bp.route('/api/ventas/<int:venta_id>', methods=['DELETE'])
+def api_delete_venta(venta_id):
+    if not delete_venta(venta_id):
+        return jsonify({"error":"Registro no encontrado"}), 404
     return jsonify({"ok":True}), 200
 
 # Borrar todo (confirmaciones)
@@ -365,30 +614,18 @@ def api_pending():
         "missing_centros": sorted(list(missing_centros_set))
     }), 200
 
-# Exportar Excel / JSON (sin ids)
+# Exportar Excel / CSV / JSON (sin ids)
 @ventasclaro_bp.route('/api/export', methods=['GET'])
 def api_export():
     fmt = request.args.get("format", "excel").lower()
-    ventas = read_ventas()
-    df = pd.DataFrame(ventas)
-    for c in ["Centro Costos","Material","Fecha Venta","Cantidad"]:
-        if c not in df.columns:
-            df[c] = ""
-    df = df[["Centro Costos","Material","Fecha Venta","Cantidad"]]
+    # lista compartida: el exporte no copia las ventas
+    ventas = read_ventas_shared()
+    columns = ["Centro Costos","Material","Fecha Venta","Cantidad"]
 
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    if fmt in ("excel","xlsx"):
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="VentasClaro")
-        output.seek(0)
-        filename = f"ventas_claro_{ts}.xlsx"
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name=filename,
-            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+    if fmt in ("excel","xlsx","csv"):
+        rows = ([v.get(c) for c in columns] for v in ventas)
+        return export_stream.response(fmt, f"ventas_claro_{ts}", columns, rows, "VentasClaro")
     else:
         mem = BytesIO()
         mem.write(json.dumps(ventas, ensure_ascii=False, indent=2).encode("utf-8"))
@@ -396,165 +633,203 @@ def api_export():
         filename = f"ventas_claro_{ts}.json"
         return send_file(mem, as_attachment=True, download_name=filename, mimetype="application/json")
 
-# Importar Excel / JSON (devuelve missing lists si aplica) - CON PROTECCIÓN CONTRA IMPORTACIONES DUPLICADAS
-@ventasclaro_bp.route('/api/import', methods=['POST'])
-def api_import():
-    global _last_import_time
-    
-    with _import_lock:
-        current_time = time.time()
-        time_since_last_import = current_time - _last_import_time
-        
-        # Verificar si ha pasado menos de 30 segundos desde la última importación
-        if time_since_last_import < _import_cooldown:
-            remaining_time = int(_import_cooldown - time_since_last_import)
-            return jsonify({
-                "error": f"En proceso de importación, espere {remaining_time} segundos para volver a importar"
-            }), 429
-        
-        # Actualizar el tiempo de la última importación
-        _last_import_time = current_time
-    
-    if 'file' not in request.files:
-        return jsonify({"error":"No se encontró archivo en el formulario (campo 'file')"}), 400
-    f = request.files['file']
-    content = f.read()
-    to_add = []
-
+# columnas aceptadas en el Excel (sin distinguir mayúsculas)
+IMPORT_COLUMNS = {
+    "centro": ["Centro Costos","Centro_Costos","centro costos","centro_costos","centro"],
+    "material": ["Material","material","MATERIAL","Sku","sku"],
+    "fecha": ["Fecha Venta","Fecha_Venta","FechaVenta","fecha venta","fecha_venta","date"],
+    "cantidad": ["Cantidad","cantidad","CANTIDAD","Qty","qty","quantity"],
+}
+
+def _match_import_columns(columns):
+    lower_map = {c.lower(): c for c in columns}
+    found = {}
+    for key, options in IMPORT_COLUMNS.items():
+        found[key] = next((lower_map[o.lower()] for o in options if o.lower() in lower_map), None)
+    if not found["centro"] or not found["material"]:
+        raise ImportJobError("El archivo Excel debe tener al menos las columnas 'Centro Costos' y 'Material'")
+    return found
+
+def _excel_import_columns(df, cols):
+    return build_import_columns(
+        df[cols["centro"]],
+        df[cols["material"]],
+        df[cols["fecha"]] if cols["fecha"] else None,
+        df[cols["cantidad"]] if cols["cantidad"] else None,
+    )
+
+def _excel_cell(cell):
+    # misma conversión que pd.read_excel (motor openpyxl)
+    if cell.value is None:
+        return ""
+    if cell.data_type == TYPE_ERROR:
+        return np.nan
+    if cell.data_type == TYPE_NUMERIC:
+        val = int(cell.value)
+        return val if val == cell.value else float(cell.value)
+    return cell.value
+
+def _excel_chunks(wb, on_total=None, chunk_rows=IMPORT_CHUNK_ROWS):
+    """
+    Primera hoja en streaming (openpyxl read-only), en DataFrames de chunk_rows filas
+    con el mismo resultado que pd.read_excel(dtype=str). El primero es vacío y solo
+    trae los encabezados.
+    """
+    ws = wb.worksheets[0]
+    if on_total and ws.max_row:
+        on_total(max(ws.max_row - 1, 0))
+    ws.reset_dimensions()
+    header = None
+    buf = []
+
+    def _frame(rows):
+        df = TextParser([header] + rows, header=0, dtype=str).read()
+        df.columns = [str(c).strip() for c in df.columns]
+        return df
+
+    for row in ws.rows:
+        values = [_excel_cell(c) for c in row]
+        if header is None:
+            if any(v != "" for v in values):
+                header = values
+                yield _frame([])
+            continue
+        values = values[:len(header)] + [""] * (len(header) - len(values))
+        buf.append(values)
+        if len(buf) >= chunk_rows:
+            yield _frame(buf)
+            buf = []
+    if header is None:
+        yield pd.DataFrame()
+    elif buf:
+        yield _frame(buf)
+
+def _json_import_columns(content):
+    s = content.decode("utf-8", errors="replace").strip()
     try:
-        read_as_excel = False
-        try:
-            df = pd.read_excel(BytesIO(content), dtype=str)
-            read_as_excel = True
-        except Exception:
-            read_as_excel = False
-
-        if read_as_excel:
-            df.columns = [str(c).strip() for c in df.columns]
-            lower_map = {c.lower(): c for c in df.columns}
-            def get_col(possible):
-                for opt in possible:
-                    lo = opt.lower()
-                    if lo in lower_map:
-                        return lower_map[lo]
-                return None
-
-            col_centro = get_col(["Centro Costos","Centro_Costos","centro costos","centro_costos","centro"])
-            col_material = get_col(["Material","material","MATERIAL","Sku","sku"])
-            col_fecha = get_col(["Fecha Venta","Fecha_Venta","FechaVenta","fecha venta","fecha_venta","date"])
-            col_cantidad = get_col(["Cantidad","cantidad","CANTIDAD","Qty","qty","quantity"])
-
-            if not col_centro or not col_material:
-                return jsonify({"error":"El archivo Excel debe tener al menos las columnas 'Centro Costos' y 'Material'"}), 400
-
-            df[col_centro] = df[col_centro].astype(str).fillna("").str.strip()
-            if col_cantidad:
-                df[col_cantidad] = df[col_cantidad].astype(str).fillna("").str.strip()
-
-            for _, row in df.iterrows():
-                centro = str(row.get(col_centro) or "").strip()
-                material = str(row.get(col_material) or "").strip()
-                if not centro and not material:
-                    continue
-                fecha = _normalize_date_str(row.get(col_fecha) or "")
-                cantidad_val = row.get(col_cantidad, "")
-                try:
-                    if cantidad_val is None or cantidad_val == "":
-                        cantidad = 0
-                    else:
-                        cantidad = float(str(cantidad_val).strip())
-                        if float(cantidad).is_integer():
-                            cantidad = int(cantidad)
-                except Exception:
-                    cantidad = 0
-                to_add.append({
-                    "Centro Costos": centro,
-                    "Material": material,
-                    "Fecha Venta": fecha,
-                    "Cantidad": cantidad
-                })
-        else:
-            s = content.decode("utf-8", errors="replace").strip()
-            parsed = json.loads(s)
-            if isinstance(parsed, dict):
-                items = [parsed]
-            elif isinstance(parsed, list):
-                items = parsed
-            else:
-                return jsonify({"error":"Formato JSON inválido"}), 400
-
-            for item in items:
-                if not isinstance(item, dict):
-                    continue
-                centro = str(item.get("Centro Costos") or item.get("centro_costos") or item.get("centro") or "").strip()
-                material = str(item.get("Material") or item.get("material") or "").strip()
-                if not centro and not material:
-                    continue
-                fecha = _normalize_date_str(item.get("Fecha Venta") or item.get("fecha_venta") or item.get("fecha") or "")
-                cantidad_raw = item.get("Cantidad") or item.get("cantidad") or 0
-                try:
-                    if cantidad_raw is None or cantidad_raw == "":
-                        cantidad = 0
-                    else:
-                        if isinstance(cantidad_raw, (int, float)):
-                            cantidad = cantidad_raw
-                        else:
-                            cantidad = float(str(cantidad_raw).strip())
-                            if float(cantidad).is_integer():
-                                cantidad = int(cantidad)
-                except Exception:
-                    cantidad = 0
-                to_add.append({
-                    "Centro Costos": centro,
-                    "Material": material,
-                    "Fecha Venta": fecha,
-                    "Cantidad": cantidad
-                })
+        parsed = json.loads(s)
     except json.JSONDecodeError as jde:
-        return jsonify({"error":"JSON inválido", "detail": str(jde)}), 400
-    except Exception as e:
-        return jsonify({"error":"No se pudo parsear el archivo", "detail": str(e)}), 400
-
-    ventas = read_ventas()
-    added = 0
-
+        raise ImportJobError("JSON inválido", str(jde))
+    if isinstance(parsed, dict):
+        items = [parsed]
+    elif isinstance(parsed, list):
+        items = parsed
+    else:
+        raise ImportJobError("Formato JSON inválido")
+
+    jdf = pd.DataFrame([item for item in items if isinstance(item, dict)])
+    if jdf.empty:
+        return build_import_columns([], [])
+    empty = pd.Series([""] * len(jdf), dtype=object)
+    centro = _coalesce_columns(jdf, ["Centro Costos", "centro_costos", "centro"])
+    material = _coalesce_columns(jdf, ["Material", "material"])
+    return build_import_columns(
+        centro if centro is not None else empty,
+        material if material is not None else empty,
+        _coalesce_columns(jdf, ["Fecha Venta", "fecha_venta", "fecha"]),
+        _coalesce_columns(jdf, ["Cantidad", "cantidad"]),
+    )
+
+def _run_import(job, path):
+    """
+    Trabajo de importación: lee el archivo por bloques y guarda cada bloque al store
+    (append_ventas) a medida que avanza; las filas ya guardadas quedan aunque un
+    bloque posterior falle.
+    """
     existing_materials = _load_existing_materials()
     existing_centros = _load_existing_centros()
     missing_materials_set = set()
     missing_centros_set = set()
+    state = {"added": 0, "processed": 0}
 
-    for item in to_add:
-        ventas.append(item)
-        added += 1
-        mat = str(item.get("Material") or "").strip()
-        cen = str(item.get("Centro Costos") or "").strip()
-        if mat and mat not in existing_materials:
-            missing_materials_set.add(mat)
-        if cen and cen not in existing_centros:
-            missing_centros_set.add(cen)
+    def _commit(rows_df, read_rows):
+        missing_materials_set.update(existing_materials.missing(rows_df["Material"].unique()))
+        missing_centros_set.update(existing_centros.missing(rows_df["Centro Costos"].unique()))
+        state["added"] += len(append_ventas(_import_rows(rows_df), clean=False))
+        state["processed"] += read_rows
+        job.progress(state["processed"])
 
-    write_ventas(ventas)
+    try:
+        wb = load_workbook(path, read_only=True, data_only=True)
+    except Exception:
+        # no es .xlsx: se intenta con pandas y luego como JSON
+        wb = None
+
+    try:
+        if wb is not None:
+            try:
+                chunks = _excel_chunks(wb, on_total=lambda n: job.progress(0, n))
+                cols = _match_import_columns(next(chunks).columns)
+                for df in chunks:
+                    _commit(_excel_import_columns(df, cols), len(df))
+            finally:
+                wb.close()
+        else:
+            try:
+                # otros formatos de Excel que lee pandas (sin streaming)
+                df = pd.read_excel(path, dtype=str)
+            except Exception:
+                df = None
+            if df is not None:
+                df.columns = [str(c).strip() for c in df.columns]
+                cols = _match_import_columns(df.columns)
+                rows_df = _excel_import_columns(df, cols)
+            else:
+                with open(path, "rb") as f:
+                    rows_df = _json_import_columns(f.read())
+            job.progress(0, len(rows_df))
+            for start in range(0, len(rows_df), IMPORT_CHUNK_ROWS):
+                chunk = rows_df.iloc[start:start + IMPORT_CHUNK_ROWS]
+                _commit(chunk, len(chunk))
+    except ImportJobError:
+        raise
+    except Exception as e:
+        raise ImportJobError("No se pudo parsear el archivo", str(e))
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
 
-    resp = {"ok": True, "added": added, "total_after": len(ventas)}
+    resp = {"ok": True, "added": state["added"], "total_after": count_ventas()}
     if missing_materials_set or missing_centros_set:
         resp["missing_materials"] = sorted(list(missing_materials_set))
         resp["missing_centros"] = sorted(list(missing_centros_set))
+    return resp
 
-    return jsonify(resp), 200
+# Importar Excel / JSON en segundo plano: devuelve el id del trabajo de inmediato (202)
+@ventasclaro_bp.route('/api/import', methods=['POST'])
+def api_import():
+    if 'file' not in request.files:
+        return jsonify({"error":"No se encontró archivo en el formulario (campo 'file')"}), 400
+    f = request.files['file']
+
+    # el archivo se guarda en disco y el trabajo lo lee por bloques
+    fd, path = tempfile.mkstemp(prefix="ventas_import_", suffix=Path(f.filename or "").suffix)
+    with os.fdopen(fd, "wb") as out:
+        f.save(out)
+
+    owner = get_jwt_identity()
+    job = _import_jobs.submit(lambda j: _run_import(j, path), owner=owner, filename=f.filename or "")
+    status = _import_jobs.get(job.id, owner)
+    status["status_url"] = url_for("ventasclaro.api_import_status", job_id=job.id)
+    return jsonify(status), 202
+
+# Estado de una importación: filas procesadas, velocidad, ETA y resultado al terminar
+@ventasclaro_bp.route('/api/import/<job_id>', methods=['GET'])
+def api_import_status(job_id):
+    # solo quien encoló la importación puede consultarla
+    status = _import_jobs.get(job_id, get_jwt_identity())
+    if status is None:
+        return jsonify({"error":"Importación no encontrada"}), 404
+    return jsonify(status), 200
 
 # --- NUEVO: devolver meses únicos (Mes - Año) ---
 @ventasclaro_bp.route('/api/months', methods=['GET'])
 def api_months():
-    ventas = read_ventas()
-    unique = set()
-    for v in ventas:
-        fs = v.get("Fecha Venta") or ""
-        dt = _parse_norm_date_to_date(fs)
-        if dt:
-            unique.add((dt.year, dt.month))
-    # ordenar asc por año, mes
-    arr = sorted(list(unique))
-    formatted = [f"{SPANISH_MONTHS[m]}-{y}" for (y, m) in arr]
+    # meses con ventas, desde el agregado mensual (sin recorrer las ventas)
+    months = ventas_cube_view()["months"]
+    formatted = [f"{SPANISH_MONTHS[m]}-{y}" for (y, m) in months]
     # si no hay ventas, devolver vacío
     return jsonify({"months": formatted}), 200
 
@@ -565,41 +840,14 @@ def api_delete_filtered():
     start_raw = data.get("start_date") or ""
     end_raw = data.get("end_date") or ""
 
-    start_norm = _normalize_date_str(start_raw) if start_raw else ""
-    end_norm = _normalize_date_str(end_raw) if end_raw else ""
+    start_norm = dates.normalize_date_str(start_raw) if start_raw else ""
+    end_norm = dates.normalize_date_str(end_raw) if end_raw else ""
 
-    start_dt = _parse_norm_date_to_date(start_norm) if start_norm else None
-    end_dt = _parse_norm_date_to_date(end_norm) if end_norm else None
+    start_dt = dates.parse_date(start_norm) if start_norm else None
+    end_dt = dates.parse_date(end_norm) if end_norm else None
 
     if not start_dt and not end_dt:
         return jsonify({"error":"Se requiere al menos start_date o end_date en formato ISO (YYYY-MM-DD)"}), 400
 
-    ventas = read_ventas()
-    kept = []
-    deleted_count = 0
-    for v in ventas:
-        fs = v.get("Fecha Venta") or ""
-        dt = _parse_norm_date_to_date(fs)
-        # si no podemos parsear la fecha, NO la borramos
-        if not dt:
-            kept.append(v)
-            continue
-        remove = False
-        # LÓGICA CORREGIDA: Eliminar si está DENTRO del rango
-        if start_dt and end_dt:
-            if start_dt <= dt <= end_dt:
-                remove = True
-        elif start_dt and not end_dt:
-            if dt >= start_dt:
-                remove = True
-        elif end_dt and not start_dt:
-            if dt <= end_dt:
-                remove = True
-        
-        if remove:
-            deleted_count += 1
-        else:
-            kept.append(v)
-
-    write_ventas(kept)
-    return jsonify({"ok": True, "deleted": deleted_count, "remaining": len(kept)}), 200
+    removed = delete_ventas_range(start_dt, end_dt)
+    return jsonify({"ok": True, "deleted": len(removed), "remaining": count_ventas()}), 200
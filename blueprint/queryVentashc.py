@@ -5,6 +5,7 @@ import re
 from flask import Blueprint, jsonify, render_template, request, send_file
 import pandas as pd
 from werkzeug.utils import secure_filename
+from conexiones import dates
 
 queryVentasHc_bp = Blueprint(
     'queryVentasHc',
@@ -63,7 +64,8 @@ def _read_and_filter_excel(file_storage):
     filtered.columns = TARGET_COLUMNS
     filtered = filtered.rename(columns=COLUMN_RENAME_MAP)
     filtered = filtered[OUTPUT_COLUMNS]
-    filtered["Fecha Venta"] = pd.to_datetime(filtered["Fecha Venta"], errors='coerce')
+    # cada fecha distinta se parsea una sola vez (conexiones/dates.py)
+    filtered["Fecha Venta"] = dates.to_datetime(filtered["Fecha Venta"])
 
     # Mes actual + 6 meses anteriores (ventana de 7 meses en total).
     now = pd.Timestamp.now()
@@ -1,10 +1,15 @@
 # blueprint/transitos.py
 import json
 from pathlib import Path
-from threading import Lock
 from flask import Blueprint, render_template, jsonify, request, send_file
 from io import BytesIO
 import pandas as pd
+from conexiones import store_loader
+from conexiones import key_registry
+from conexiones import keys
+from conexiones import export_stream
+from conexiones.record_store import RecordStore
+from conexiones.columnar import ColumnarSnapshot
 
 transitos_bp = Blueprint(
     'transitos', __name__, url_prefix='/transitos',
@@ -18,82 +23,35 @@ JSON_PATH = PROJECT_DIR / JSON_REL_PATH
 PRODUCTOS_JSON_PATH = PROJECT_DIR / Path("conexiones") / "data_ops" / "productos_claro.json"
 PUNTOS_JSON_PATH = PROJECT_DIR / Path("conexiones") / "data_ops" / "puntos_venta_claro.json"
 
-_file_lock = Lock()
-
-def _ensure_file():
-    JSON_PATH.parent.mkdir(parents=True, exist_ok=True)
-    if not JSON_PATH.exists():
-        with JSON_PATH.open("w", encoding="utf-8") as f:
-            json.dump([], f, ensure_ascii=False, indent=2)
-
-def _read_json(path: Path):
-    """
-    Lee un JSON que puede ser lista, objeto o line-delimited.
-    Devuelve lista de objetos.
-    """
-    try:
-        path.parent.mkdir(parents=True, exist_ok=True)
-        if not path.exists():
-            return []
-        text = path.read_text(encoding="utf-8").strip()
-        if not text:
-            return []
-        try:
-            data = json.loads(text)
-            if isinstance(data, dict):
-                return [data]
-            if isinstance(data, list):
-                return data
-            return []
-        except json.JSONDecodeError:
-            res = []
-            for line in text.splitlines():
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    res.append(json.loads(line))
-                except Exception:
-                    continue
-            return res
-    except Exception:
-        return []
+# snapshot columnar tipado para forecast (Material/Centro categóricos, Transitos numérico)
+_columnar = ColumnarSnapshot(
+    JSON_PATH.with_name("transitos.columnar"),
+    {"Centro Costos": "category", "Material": "category", "Transitos": "number"}
+)
 
 def read_transitos():
-    _ensure_file()
-    with _file_lock:
-        text = JSON_PATH.read_text(encoding="utf-8").strip()
-    if not text:
-        return []
-    try:
-        data = json.loads(text)
-        if isinstance(data, dict):
-            return [data]
-        if isinstance(data, list):
-            return data
-        return []
-    except json.JSONDecodeError:
-        res = []
-        for line in text.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                obj = json.loads(line)
-                res.append(obj)
-            except Exception:
-                continue
-        return res
+    return _store.read()
+
+def transitos_signature():
+    return _store.signature()
 
 def write_transitos(list_items):
-    _ensure_file()
-    with _file_lock:
-        with JSON_PATH.open("w", encoding="utf-8") as f:
-            json.dump(list_items, f, ensure_ascii=False, indent=2)
+    # reescritura completa (borrar todo): conserva los ids existentes
+    _store.rewrite(list_items)
+    _columnar.refresh_async(_store.signature, _raw_frame)
+
+def _raw_frame():
+    return pd.DataFrame(read_transitos(), columns=["Centro Costos", "Material", "Transitos"])
+
+def read_transitos_frame():
+    """DataFrame tipado desde el snapshot columnar (solo lectura)."""
+    sig = _store.signature()
+    return store_loader.load(f"{JSON_PATH}:columnar", sig, lambda: _columnar.load_or_build(sig, _raw_frame))
 
 def normalize_entry(raw):
     """
     Normaliza keys a: "Centro Costos", "Material", "Transitos"
+    (Centro Costos y Material canónicos, ver conexiones/keys.py)
     """
     if not isinstance(raw, dict):
         return None
@@ -109,39 +67,39 @@ def normalize_entry(raw):
     except Exception:
         transitos = 0
     return {
-        "Centro Costos": str(centro).strip(),
-        "Material": str(material).strip(),
+        "Centro Costos": keys.centro(centro),
+        "Material": keys.material(material),
         "Transitos": transitos
     }
 
-# helpers para validar existencia (productos y puntos)
+# cada registro lleva un "id" estable; inserciones y ops por id van a transitos.segments/*.ndjson
+_store = RecordStore(JSON_PATH, normalize=normalize_entry)
+
+def append_transitos(new_items):
+    added = _store.append(new_items)
+    _columnar.refresh_async(_store.signature, _raw_frame)
+    return added
+
+def update_entry(item_id, raw):
+    # O(1): op "upd" en la cola del log
+    saved = _store.update(item_id, raw)
+    if saved is not None:
+        _columnar.refresh_async(_store.signature, _raw_frame)
+    return saved
+
+def delete_entry(item_id):
+    ok = _store.delete(item_id)
+    if ok:
+        _columnar.refresh_async(_store.signature, _raw_frame)
+    return ok
+
+# registros de claves de productos / puntos (conexiones/key_registry.py): se arman una vez
+# por versión del maestro y validar es un probe O(1) (`valor in registro`)
 def _load_existing_materials():
-    data = _read_json(PRODUCTOS_JSON_PATH)
-    # los archivos de productos pueden tener objetos con key "Material"
-    mats = set()
-    for item in data:
-        if not isinstance(item, dict):
-            continue
-        m = item.get("Material") or item.get("material") or ""
-        if m is not None:
-            mm = str(m).strip()
-            if mm:
-                mats.add(mm)
-    return mats
+    return key_registry.materials(PRODUCTOS_JSON_PATH)
 
 def _load_existing_centros():
-    data = _read_json(PUNTOS_JSON_PATH)
-    cents = set()
-    for item in data:
-        if not isinstance(item, dict):
-            continue
-        # algunos JSON usan "Centro Costos" o "Centro"
-        c = item.get("Centro Costos") or item.get("Centro") or item.get("centro") or item.get("Centro Cost") or ""
-        if c is not None:
-            cc = str(c).strip()
-            if cc:
-                cents.add(cc)
-    return cents
+    return key_registry.centros(PUNTOS_JSON_PATH)
 
 @transitos_bp.route('/')
 def index():
@@ -162,35 +120,28 @@ def api_create():
     entry = normalize_entry(payload)
     if not entry or not entry.get("Material"):
         return jsonify({"error": "El campo 'Material' es obligatorio"}), 400
-    items = read_transitos()
-    items.append(entry)
-    write_transitos(items)
+    entry = append_transitos([entry])[0]
     return jsonify(entry), 201
 
-# API: actualizar por índice
-@transitos_bp.route('/api/items/<int:index>', methods=['PUT'])
-def api_update(index):
+# API: actualizar por id
+@transitos_bp.route('/api/items/<int:item_id>', methods=['PUT'])
+def api_update(item_id):
     payload = request.get_json(force=True)
     if not payload:
         return jsonify({"error": "Cuerpo inválido"}), 400
-    items = read_transitos()
-    if index < 0 or index >= len(items):
-        return jsonify({"error": "Registro no encontrado"}), 404
     new_entry = normalize_entry(payload)
     if not new_entry or not new_entry.get("Material"):
         return jsonify({"error": "El campo 'Material' es obligatorio"}), 400
-    items[index] = new_entry
-    write_transitos(items)
-    return jsonify(new_entry), 200
+    saved = update_entry(item_id, new_entry)
+    if saved is None:
+        return jsonify({"error": "Registro no encontrado"}), 404
+    return jsonify(saved), 200
 
-# API: borrar uno por índice
-@transitos_bp.route('/api/items/<int:index>', methods=['DELETE'])
-def api_delete(index):
-    items = read_transitos()
-    if index < 0 or index >= len(items):
+# API: borrar uno por id
+@transitos_bp.route('/api/items/<int:item_id>', methods=['DELETE'])
+def api_delete(item_id):
+    if not delete_entry(item_id):
         return jsonify({"error": "Registro no encontrado"}), 404
-    items.pop(index)
-    write_transitos(items)
     return jsonify({"ok": True}), 200
 
 # API: borrar todo (requiere 3 confirmaciones desde frontend)
@@ -203,27 +154,15 @@ def api_delete_all():
     write_transitos([])
     return jsonify({"ok": True, "deleted_all": True}), 200
 
-# API: exportar (Excel o JSON)
+# API: exportar (Excel, CSV o JSON)
 @transitos_bp.route('/api/export', methods=['GET'])
 def api_export():
     fmt = request.args.get("format", "excel").lower()
     items = read_transitos()
-    df = pd.DataFrame(items)
-    for c in ["Centro Costos", "Material", "Transitos"]:
-        if c not in df.columns:
-            df[c] = ""
-    df = df[["Centro Costos", "Material", "Transitos"]]
-    if fmt in ("excel", "xlsx"):
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="Transitos")
-        output.seek(0)
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name="transitos.xlsx",
-            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+    columns = ["Centro Costos", "Material", "Transitos"]
+    if fmt in ("excel", "xlsx", "csv"):
+        rows = ([it.get(c) for c in columns] for it in items)
+        return export_stream.response(fmt, "transitos", columns, rows, "Transitos")
     else:
         mem = BytesIO()
         mem.write(json.dumps(items, ensure_ascii=False, indent=2).encode("utf-8"))
@@ -258,9 +197,10 @@ def api_import():
             col_trans = get_col(["Transitos", "transitos", "Cantidad", "cantidad", "Qty", "qty"])
             if not col_material:
                 return jsonify({"error": "El archivo Excel debe tener una columna 'Material'"}), 400
-            for _, row in df.iterrows():
-                centro = str(row.get(col_centro) or "").strip() if col_centro else ""
-                material = str(row.get(col_material) or "").strip()
+            # claves canónicas por columna (conexiones/keys.py), una vez por valor distinto
+            centros = keys.centro_column(df[col_centro]) if col_centro else [""] * len(df)
+            materials = keys.material_column(df[col_material])
+            for (_, row), centro, material in zip(df.iterrows(), centros, materials):
                 trans = row.get(col_trans) if col_trans else 0
                 try:
                     trans = int(float(str(trans))) if str(trans).strip() != "" else 0
@@ -289,10 +229,8 @@ def api_import():
             if not n or not n.get("Material"):
                 continue
             norm.append(n)
-        items = read_transitos()
-        items.extend(norm)
-        write_transitos(items)
-        return jsonify({"ok": True, "added": len(norm), "total_after": len(items)}), 200
+        added = append_transitos(norm)
+        return jsonify({"ok": True, "added": len(added), "total_after": _store.count()}), 200
     except Exception as e:
         return jsonify({"error": "No se pudo parsear el archivo", "detail": str(e)}), 400
 
@@ -0,0 +1,181 @@
+"""
+columnar.py
+Snapshot columnar tipado de un store de data_ops (inventario, tránsitos)
+para los lectores analíticos (forecast, cruzar).
+
+Formato: un directorio <store>.columnar/ con un .npy por columna
+- "category": <col>.codes.npy (int32) + <col>.dict.npy (diccionario de strings)
+- "datetime": <col>.npy datetime64[s]
+- "number":   <col>.npy int64 (float64 si hay decimales)
+más meta.json con la firma del store que lo generó.
+
+Se carga con np.load(mmap_mode='r'): sin parsear JSON ni copiar las columnas.
+(Parquet/Arrow requeriría pyarrow, que no es dependencia del proyecto.)
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from conexiones import dates
+
+logger = logging.getLogger(__name__)
+
+
+def _sig_str(signature):
+    return repr(signature)
+
+
+def _to_number_array(series):
+    values = pd.to_numeric(series, errors="coerce").fillna(0).to_numpy()
+    if values.dtype.kind == "f" and np.all(np.mod(values, 1) == 0):
+        return values.astype(np.int64)
+    if values.dtype.kind in ("i", "u", "b"):
+        return values.astype(np.int64)
+    return values.astype(np.float64)
+
+
+class ColumnarSnapshot:
+    def __init__(self, dir_path, schema):
+        """schema: dict columna -> "category" | "datetime" | "number" (en orden)."""
+        self.dir = Path(dir_path)
+        self.schema = dict(schema)
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._dirty = False
+        self._worker = None
+
+    # ---------- escritura ----------
+    def typed_frame(self, df):
+        """Convierte un DataFrame crudo a los tipos del schema (sin escribir)."""
+        cols = {}
+        n = len(df)
+        for col, kind in self.schema.items():
+            raw = df[col] if col in df.columns else pd.Series([None] * n, dtype=object)
+            if kind == "category":
+                cols[col] = pd.Categorical(raw.fillna("").astype(str).str.strip())
+            elif kind == "datetime":
+                cols[col] = dates.to_datetime(raw, format="ISO8601").astype("datetime64[s]")
+            else:
+                cols[col] = _to_number_array(raw)
+        return pd.DataFrame(cols, index=pd.RangeIndex(n))
+
+    def save(self, df, signature):
+        """Escribe el snapshot (df ya tipado o crudo) de forma atómica (dir temporal + rename)."""
+        df = self.typed_frame(df) if not self._is_typed(df) else df
+        self.dir.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(dir=str(self.dir.parent), prefix=self.dir.name + ".tmp"))
+        try:
+            for i, (col, kind) in enumerate(self.schema.items()):
+                s = df[col]
+                if kind == "category":
+                    cat = s.astype("category").cat
+                    np.save(tmp / f"c{i}.codes.npy", cat.codes.to_numpy().astype(np.int32))
+                    np.save(tmp / f"c{i}.dict.npy", np.asarray(cat.categories.astype(str), dtype=str))
+                elif kind == "datetime":
+                    np.save(tmp / f"c{i}.npy", s.to_numpy().astype("datetime64[s]"))
+                else:
+                    np.save(tmp / f"c{i}.npy", s.to_numpy())
+            meta = {"signature": _sig_str(signature), "rows": int(len(df)),
+                    "columns": [[col, kind] for col, kind in self.schema.items()]}
+            with (tmp / "meta.json").open("w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            with self._lock:
+                old = None
+                if self.dir.exists():
+                    old = self.dir.with_name(self.dir.name + ".old")
+                    shutil.rmtree(old, ignore_errors=True)
+                    os.replace(self.dir, old)
+                os.replace(tmp, self.dir)
+                if old is not None:
+                    shutil.rmtree(old, ignore_errors=True)
+        finally:
+            if tmp.exists():
+                shutil.rmtree(tmp, ignore_errors=True)
+
+    def _is_typed(self, df):
+        for col, kind in self.schema.items():
+            if col not in df.columns:
+                return False
+            dtype = df[col].dtype
+            if kind == "category" and not isinstance(dtype, pd.CategoricalDtype):
+                return False
+            if kind == "datetime" and dtype != np.dtype("datetime64[s]"):
+                return False
+            if kind == "number" and dtype.kind not in ("i", "f"):
+                return False
+        return True
+
+    # ---------- lectura ----------
+    def load(self, signature=None):
+        """Devuelve el DataFrame mapeado en memoria, o None si no existe / está desactualizado."""
+        with self._lock:
+            meta_path = self.dir / "meta.json"
+            try:
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            except Exception:
+                return None
+            if signature is not None and meta.get("signature") != _sig_str(signature):
+                return None
+            if [list(x) for x in meta.get("columns", [])] != [[c, k] for c, k in self.schema.items()]:
+                return None
+            cols = {}
+            try:
+                for i, (col, kind) in enumerate(self.schema.items()):
+                    if kind == "category":
+                        codes = np.load(self.dir / f"c{i}.codes.npy", mmap_mode="r")
+                        categories = np.load(self.dir / f"c{i}.dict.npy")
+                        cols[col] = pd.Categorical.from_codes(codes, categories=pd.Index(categories.astype(object)),
+                                                              validate=False)
+                    else:
+                        cols[col] = np.load(self.dir / f"c{i}.npy", mmap_mode="r")
+            except Exception:
+                logger.exception("Snapshot columnar corrupto en %s", self.dir)
+                return None
+        return pd.DataFrame(cols, index=pd.RangeIndex(int(meta.get("rows", 0))), copy=False)
+
+    def load_or_build(self, signature, build_raw):
+        """Carga el snapshot vigente o lo regenera desde build_raw() (DataFrame crudo)."""
+        df = self.load(signature)
+        if df is not None:
+            return df
+        typed = self.typed_frame(build_raw())
+        try:
+            self.save(typed, signature)
+        except Exception:
+            logger.exception("No se pudo escribir el snapshot columnar %s", self.dir)
+        return typed
+
+    def refresh_async(self, signature_fn, build_raw):
+        """
+        Regenera el snapshot en segundo plano tras una escritura.
+        Varias escrituras seguidas se agrupan en una sola reconstrucción.
+        """
+        with self._rebuild_lock:
+            self._dirty = True
+            if self._worker is not None and self._worker.is_alive():
+                return
+
+            def _run():
+                while True:
+                    with self._rebuild_lock:
+                        if not self._dirty:
+                            self._worker = None
+                            return
+                        self._dirty = False
+                    try:
+                        sig = signature_fn()
+                        if self.load(sig) is None:
+                            self.save(self.typed_frame(build_raw()), sig)
+                    except Exception:
+                        logger.exception("Error regenerando snapshot columnar %s", self.dir)
+
+            self._worker = threading.Thread(target=_run, name="columnar-refresh", daemon=True)
+            self._worker.start()
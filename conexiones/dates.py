@@ -0,0 +1,254 @@
+"""
+dates.py
+Normalización y parseo de fechas compartido por los blueprints.
+
+Los archivos de ventas repiten pocos cientos de fechas distintas: cada valor
+distinto se parsea una sola vez y el resultado queda en un LRU acotado por
+proceso. Las funciones en bloque (normalize_dates, parse_dates, month_of,
+to_datetime) factorizan la columna, buscan en el LRU y parsean los valores
+nuevos con una llamada vectorizada de pandas.
+
+- normalize_date_str / normalize_dates: "Fecha Venta" entrante -> "YYYY-MM-DD"
+  probando DATE_FORMATS en orden; lo que no encaja se conserva tal cual.
+- parse_date / parse_dates: fecha normalizada -> datetime.date | None
+  (serial de Excel, pd.to_datetime, y dayfirst como último recurso).
+- month_of: (año, mes) | None con las mismas reglas que parse_date (cubo y particiones
+  de ventas; un serial de Excel como "45292" cae en su mes).
+- to_datetime: pd.to_datetime sobre una columna, parseando cada valor distinto una vez.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, date
+
+import numpy as np
+import pandas as pd
+
+# formatos aceptados para "Fecha Venta", en orden de prioridad (ambigüedades dd/mm vs mm/dd)
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%m/%d/%Y")
+
+CACHE_SIZE = 65_536   # valores distintos recordados por cada función
+
+# "YYYY-MM-DD" con hora opcional: se parsean en bloque con ISO8601
+_ISO_RE = re.compile(r"^\d{4}-\d{2}-\d{2}( \d{2}:\d{2}:\d{2})?$")
+_MISSING = object()
+
+
+class _LRU:
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=_MISSING):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def lookup(self, keys):
+        """dict con las claves conocidas (una sola toma del lock)."""
+        found = {}
+        with self._lock:
+            for k in keys:
+                if k in self._data:
+                    self._data.move_to_end(k)
+                    found[k] = self._data[k]
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        with self._lock:
+            for k, v in items:
+                self._data[k] = v
+                self._data.move_to_end(k)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+
+_normalized = _LRU()
+_parsed = _LRU()
+_months = _LRU()
+
+
+def cache_stats():
+    return {name: {"size": len(c._data), "hits": c.hits, "misses": c.misses}
+            for name, c in (("normalize", _normalized), ("parse", _parsed), ("month", _months))}
+
+
+def clear_caches():
+    for c in (_normalized, _parsed, _months):
+        c.clear()
+
+
+def _clean_strings(values):
+    s = pd.Series(values, dtype=object)
+    return s.where(s.notna(), "").astype(str).str.strip()
+
+
+def _bulk(values, cache, compute):
+    """
+    Aplica una función cacheada a una columna: factoriza, resuelve los distintos
+    (LRU + compute(list[str]) -> list para los nuevos) y expande al largo original.
+    """
+    codes, uniques = pd.factorize(values)
+    uniques = list(uniques)
+    known = cache.lookup(uniques)
+    new = [u for u in uniques if u not in known]
+    if new:
+        results = compute(new)
+        cache.put_many(zip(new, results))
+        known.update(zip(new, results))
+    table = np.empty(len(uniques) + 1, dtype=object)
+    table[:len(uniques)] = [known[u] for u in uniques]
+    table[-1] = None   # código -1 (nulo)
+    return table[codes]
+
+
+# ---------- normalización ("Fecha Venta" entrante) ----------
+def _normalize_many(strings):
+    uniq = pd.Series(strings, dtype=object)
+    out = uniq.copy()
+    pending = (uniq != "").to_numpy()
+    for fmt in DATE_FORMATS:
+        if not pending.any():
+            break
+        parsed = pd.to_datetime(uniq[pending], format=fmt, errors="coerce")
+        ok = parsed.notna()
+        out[parsed.index[ok]] = parsed[ok].dt.strftime("%Y-%m-%d")
+        pending[parsed.index[ok]] = False
+    return out.tolist()
+
+
+def normalize_date_str(s):
+    if s is None:
+        return ""
+    s = str(s).strip()
+    if not s:
+        return ""
+    value = _normalized.get(s)
+    if value is _MISSING:
+        value = s
+        for fmt in DATE_FORMATS:
+            try:
+                value = datetime.strptime(s, fmt).strftime("%Y-%m-%d")
+                break
+            except Exception:
+                continue
+        _normalized.put_many([(s, value)])
+    return value
+
+
+def normalize_dates(values):
+    """normalize_date_str sobre una columna completa (ndarray de str)."""
+    return _bulk(_clean_strings(values), _normalized, _normalize_many)
+
+
+# ---------- parseo a date ----------
+def _parse_one(s):
+    # Caso serial de Excel (ejemplo: 45292)
+    try:
+        if s.isdigit() and len(s) <= 5:
+            serial = int(s)
+            return (datetime(1899, 12, 30) + pd.to_timedelta(serial, unit="D")).date()
+    except Exception:
+        pass
+
+    # Parseo robusto (incluye valores con hora)
+    try:
+        dt = pd.to_datetime(s, errors="coerce")
+        if pd.notna(dt):
+            return dt.date()
+    except Exception:
+        pass
+
+    # Fallback con dayfirst para formatos regionales
+    try:
+        dt = pd.to_datetime(s, dayfirst=True, errors="coerce")
+        if pd.notna(dt):
+            return dt.date()
+    except Exception:
+        pass
+
+    return None
+
+
+def _parse_many(strings):
+    out = [None] * len(strings)
+    iso = [i for i, s in enumerate(strings) if _ISO_RE.match(s)]
+    rest = set(range(len(strings))) - set(iso)
+    if iso:
+        parsed = pd.to_datetime(pd.Series([strings[i] for i in iso], dtype=object),
+                                errors="coerce", format="ISO8601")
+        for i, ts in zip(iso, parsed):
+            if pd.notna(ts):
+                out[i] = ts.date()
+            else:
+                rest.add(i)
+    for i in rest:
+        if strings[i]:
+            out[i] = _parse_one(strings[i])
+    return out
+
+
+def parse_date(value):
+    """Fecha normalizada (str / date / datetime) -> datetime.date | None."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    s = str(value).strip()
+    if not s:
+        return None
+    d = _parsed.get(s)
+    if d is _MISSING:
+        d = _parse_one(s)
+        _parsed.put_many([(s, d)])
+    return d
+
+
+def parse_dates(values):
+    """parse_date sobre una columna de strings (ndarray de date | None)."""
+    return _bulk(_clean_strings(values), _parsed, _parse_many)
+
+
+# ---------- mes (año, mes) ----------
+def _months_many(strings):
+    return [(d.year, d.month) if d else None for d in _parse_many(strings)]
+
+
+def month_of(values):
+    """Fechas -> [(año, mes) | None], mes de parse_date (ISO en bloque, seriales de Excel...)."""
+    s = pd.Series([str(v or "") for v in values], dtype=object)
+    return _bulk(s, _months, _months_many).tolist()
+
+
+# ---------- datetime64 ----------
+def to_datetime(values, **kwargs):
+    """
+    pd.to_datetime(values, errors="coerce", **kwargs) parseando cada valor distinto
+    una sola vez (mismo resultado, mismo índice si values es una Series).
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    codes, uniques = pd.factorize(series.astype(object))
+    # el último elemento (None) cubre los nulos: take(-1) lo toma
+    parsed = pd.to_datetime(pd.Series(list(uniques) + [None], dtype=object), errors="coerce", **kwargs)
+    out = parsed.take(codes)
+    out.index = series.index
+    return out.rename(series.name)
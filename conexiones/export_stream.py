@@ -0,0 +1,229 @@
+"""
+export_stream.py
+Exportes XLSX / CSV que se generan mientras se envían, con memoria constante.
+
+Las filas llegan como un iterable de listas (una por registro, en el orden de los
+encabezados) y se escriben de a CHUNK_ROWS directo a la respuesta, sin DataFrame ni
+BytesIO con el archivo entero:
+- iter_csv: CSV UTF-8 con BOM (para que Excel respete los acentos);
+- iter_xlsx: el .xlsx se arma a mano como un zip en streaming (zipfile sobre una
+  salida no seekable, con data descriptors) y celdas inlineStr, sin tabla de strings
+  compartidos; cada XLSX_MAX_ROWS filas se abre otra hoja.
+- response(fmt, basename, headers, rows, sheet_name): Response de Flask con el
+  Content-Disposition del archivo.
+
+Valores: None / NaN -> celda vacía; bool, int y float como números de Excel; el
+resto como texto (sin los caracteres de control que XML no admite).
+"""
+
+import csv
+import io
+import math
+import numbers
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from flask import Response, stream_with_context
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CHUNK_ROWS = 5000                 # filas por bloque enviado
+XLSX_MAX_ROWS = 1_048_575         # filas de datos por hoja (más el encabezado)
+FORMATS = ('xlsx', 'csv')
+
+_ILLEGAL_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    # toda otra parte .xml es una hoja: no hace falta saber cuántas hay antes de escribirlas
+    '<Default Extension="xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+# estilo 1 = encabezado en negrita
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_TAIL = '</sheetData></worksheet>'
+
+
+def _missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _text(value):
+    text = _ILLEGAL_XML.sub('', str(value))
+    preserve = ' xml:space="preserve"' if text[:1].isspace() or text[-1:].isspace() else ''
+    return f'<c t="inlineStr"><is><t{preserve}>{escape(text)}</t></is></c>'
+
+
+def _cell(value):
+    if _missing(value):
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, numbers.Integral):
+        return f'<c><v>{int(value)}</v></c>'
+    if isinstance(value, numbers.Real):
+        value = float(value)
+        return f'<c><v>{value!r}</v></c>' if math.isfinite(value) else _text(value)
+    return _text(value)
+
+
+def _header_row(headers):
+    cells = ''.join(f'<c t="inlineStr" s="1"><is><t>{escape(_ILLEGAL_XML.sub("", str(h)))}</t></is></c>'
+                    for h in headers)
+    return f'<row>{cells}</row>'
+
+
+class _Sink(io.RawIOBase):
+    """Salida no seekable del zip: junta lo escrito hasta el próximo drain()."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        out = b''.join(self._chunks)
+        self._chunks = []
+        return out
+
+
+def _workbook(names):
+    sheets = ''.join(f'<sheet name="{escape(name)}" sheetId="{i}" r:id="rId{i}"/>'
+                     for i, name in enumerate(names, 1))
+    workbook = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets>{sheets}</sheets></workbook>'
+    )
+    rels = ''.join(
+        f'<Relationship Id="rId{i}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        f'Target="worksheets/sheet{i}.xml"/>' for i in range(1, len(names) + 1))
+    rels += (f'<Relationship Id="rId{len(names) + 1}" '
+             'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>')
+    rels = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">{rels}</Relationships>')
+    return workbook, rels
+
+
+def iter_xlsx(headers, rows, sheet_name='Hoja1'):
+    """Bytes del .xlsx a medida que se escriben las filas (bloques de CHUNK_ROWS)."""
+    return (chunk for chunk in _xlsx_chunks(headers, rows, sheet_name) if chunk)
+
+
+def _xlsx_chunks(headers, rows, sheet_name):
+    sink = _Sink()
+    header = _header_row(headers).encode('utf-8')
+    names = []
+    rows = iter(rows)
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        zf.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        zf.writestr('_rels/.rels', _ROOT_RELS)
+        done = False
+        while not done:
+            names.append(sheet_name if not names else f'{sheet_name} {len(names) + 1}'[:31])
+            with zf.open(f'xl/worksheets/sheet{len(names)}.xml', 'w') as sheet:
+                sheet.write(_SHEET_HEAD.encode('utf-8'))
+                sheet.write(header)
+                written = 0
+                done = True
+                buf = []
+                for row in rows:
+                    buf.append(f'<row>{"".join(_cell(v) for v in row)}</row>')
+                    written += 1
+                    if len(buf) == CHUNK_ROWS:
+                        sheet.write(''.join(buf).encode('utf-8'))
+                        buf = []
+                        yield sink.drain()
+                    if written == XLSX_MAX_ROWS:
+                        done = False
+                        break
+                if buf:
+                    sheet.write(''.join(buf).encode('utf-8'))
+                sheet.write(_SHEET_TAIL.encode('utf-8'))
+            if not done:
+                # hoja llena: solo se abre otra si quedan filas
+                try:
+                    first = next(rows)
+                except StopIteration:
+                    done = True
+                else:
+                    rows = _prepend(first, rows)
+            yield sink.drain()
+        workbook, workbook_rels = _workbook(names)
+        zf.writestr('xl/workbook.xml', workbook)
+        zf.writestr('xl/_rels/workbook.xml.rels', workbook_rels)
+        zf.writestr('xl/styles.xml', _STYLES)
+    yield sink.drain()
+
+
+def _prepend(first, rows):
+    yield first
+    yield from rows
+
+
+def iter_csv(headers, rows):
+    """CSV (UTF-8 con BOM para Excel) en bloques de CHUNK_ROWS filas."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    buf.write('\ufeff')
+    writer.writerow(headers)
+    count = 0
+    for row in rows:
+        writer.writerow(['' if _missing(v) else v for v in row])
+        count += 1
+        if count == CHUNK_ROWS:
+            yield buf.getvalue().encode('utf-8')
+            buf.seek(0)
+            buf.truncate()
+            count = 0
+    if buf.tell():
+        yield buf.getvalue().encode('utf-8')
+
+
+def response(fmt, basename, headers, rows, sheet_name='Hoja1'):
+    """Response que envía el exporte (fmt 'xlsx' o 'csv') como basename.<fmt> mientras se genera."""
+    if fmt == 'csv':
+        body, mimetype = iter_csv(headers, rows), 'text/csv'
+    else:
+        fmt, body, mimetype = 'xlsx', iter_xlsx(headers, rows, sheet_name), XLSX_MIMETYPE
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={basename}.{fmt}'},
+    )
@@ -0,0 +1,115 @@
+"""
+facet_index.py
+Índice de facetas para listas de opciones con filtros cruzados.
+
+Por cada dimensión (columna) de un maestro se guarda:
+- el diccionario de valores distintos, ordenado (sorted de Python);
+- el código de valor de cada fila (array de enteros);
+- valor en minúsculas -> códigos, para resolver los filtros del request.
+
+select() arma la máscara de filas (bitmap booleano) intersectando las
+dimensiones filtradas con una búsqueda allowed[códigos] (isin() igual, con
+valores exactos); values() devuelve
+los valores presentes en esas filas, ya ordenados. Todo es O(filas) en numpy:
+microsegundos para maestros de miles de filas. El índice es de solo lectura;
+se reconstruye cuando cambian los datos de origen, o replaced() arma una copia con
+algunas filas cambiadas (sin refactorizar las dimensiones cuyos valores ya conoce).
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class FacetIndex:
+    def __init__(self, columns):
+        """columns: {dimensión: secuencia de str}, todas del mismo largo (una fila por posición)."""
+        self.size = None
+        self._values = {}
+        self._codes = {}
+        self._lower = {}
+        for name, column in columns.items():
+            column = np.asarray(column, dtype=object)
+            if self.size is None:
+                self.size = len(column)
+            elif len(column) != self.size:
+                raise ValueError(f"la dimensión {name} tiene {len(column)} filas, se esperaban {self.size}")
+            self._set_column(name, column)
+        self.size = self.size or 0
+
+    def _set_column(self, name, column):
+        # factorizar y ordenar solo los distintos (orden de sorted de Python)
+        codes, uniques = pd.factorize(column)
+        order = np.argsort(np.asarray(uniques, dtype=object), kind='stable')
+        rank = np.empty(len(order), dtype=np.int32)
+        rank[order] = np.arange(len(order), dtype=np.int32)
+        values = np.asarray(uniques, dtype=object)[order]
+        lower = {}
+        for code, value in enumerate(values.tolist()):
+            lower.setdefault(value.lower(), []).append(code)
+        self._values[name] = values
+        self._codes[name] = rank[codes]
+        self._lower[name] = {k: np.asarray(v, dtype=np.int32) for k, v in lower.items()}
+
+    def replaced(self, positions, columns):
+        """
+        Copia del índice con las filas positions cambiadas ({dimensión: valores nuevos, uno
+        por posición}). Si todos los valores nuevos ya están en la dimensión solo se
+        reasignan sus códigos; si no, se rearma esa dimensión. El índice original no cambia.
+        """
+        out = FacetIndex({})
+        out.size = self.size
+        out._values, out._codes, out._lower = dict(self._values), dict(self._codes), dict(self._lower)
+        positions = np.asarray(positions, dtype=np.intp)
+        for name, column in columns.items():
+            column = np.asarray(column, dtype=object)
+            known = self._values[name]
+            pos = np.searchsorted(known, column) if len(known) else np.zeros(len(column), dtype=np.intp)
+            if len(column) and (pos.max() >= len(known) or (known[pos] != column).any()):
+                full = known[self._codes[name]]
+                full[positions] = column
+                out._set_column(name, full)
+                continue
+            codes = self._codes[name].copy()
+            codes[positions] = pos
+            out._codes[name] = codes
+        return out
+
+    def select(self, filters):
+        """
+        Máscara de filas que cumplen todos los filtros {dimensión: valores en minúsculas}.
+        Un filtro vacío (o None) no restringe esa dimensión.
+        """
+        mask = np.ones(self.size, dtype=bool)
+        for name, selected in filters.items():
+            if not selected:
+                continue
+            allowed = np.zeros(len(self._values[name]), dtype=bool)
+            lower = self._lower[name]
+            for value in selected:
+                codes = lower.get(value)
+                if codes is not None:
+                    allowed[codes] = True
+            mask &= allowed[self._codes[name]]
+        return mask
+
+    def isin(self, name, values):
+        """Máscara de filas cuyo valor es exactamente uno de values."""
+        known = self._values[name]
+        values = np.asarray(list(values), dtype=object)
+        pos = np.searchsorted(known, values) if len(known) else np.zeros(len(values), dtype=np.intp)
+        hit = pos < len(known)
+        pos = pos[hit]
+        pos = pos[known[pos] == values[hit]]
+        allowed = np.zeros(len(known), dtype=bool)
+        allowed[pos] = True
+        return allowed[self._codes[name]]
+
+    def values(self, name, mask=None, skip_empty=False):
+        """Valores distintos de la dimensión en las filas de mask (todas si es None), ordenados."""
+        codes = self._codes[name] if mask is None else self._codes[name][mask]
+        present = np.zeros(len(self._values[name]), dtype=bool)
+        present[codes] = True
+        out = self._values[name][present].tolist()
+        if skip_empty and out and out[0] == '':
+            out = out[1:]
+        return out
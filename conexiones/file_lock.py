@@ -0,0 +1,58 @@
+"""
+file_lock.py
+Lock entre procesos (gunicorn con varios workers) y entre hilos para los stores de data_ops.
+
+FileLock(path) combina un RLock del proceso con fcntl.flock exclusivo sobre path:
+- reentrante en el mismo hilo (el flock se toma solo en el primer nivel);
+- el archivo de lock se crea vacío y no se borra (borrarlo rompería la exclusión).
+Sin fcntl (Windows, desarrollo local) queda solo el lock entre hilos.
+"""
+
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:     # Windows: un solo proceso
+    fcntl = None
+
+
+class FileLock:
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fh = None
+
+    def acquire(self):
+        self._lock.acquire()
+        if self._depth == 0:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                fh = open(self.path, "a+b")
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+                    except BaseException:
+                        fh.close()
+                        raise
+                self._fh = fh
+            except BaseException:
+                self._lock.release()
+                raise
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            fh, self._fh = self._fh, None
+            fh.close()     # cerrar libera el flock
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
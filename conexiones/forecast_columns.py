@@ -0,0 +1,136 @@
+"""
+forecast_columns.py
+Columnas calculadas del forecast sobre arrays alineados a los candidatos, y el
+cálculo de un shard en el pool de procesos (evaluate_shard).
+
+Es lo único que importan los procesos del pool (contexto spawn): solo depende de
+numpy y de conexiones/shard_pool.py, sin efectos al importarse (no lee .env ni
+stores ni registra blueprints).
+
+- table_columns: Ventas_*, Indicador_*, Envio_*, metas y máscara de inclusión;
+- round_values: round() de Python sobre una columna float;
+- as_int: int(v) por elemento con 0 para faltantes;
+- evaluate_shard: columnas de un shard, ya ordenadas (ver forecast_engine._sharded_table).
+"""
+
+import calendar
+
+import numpy as np
+
+from conexiones import shard_pool
+
+# metas.json: meta del mes por (centro, material). Estado_Meta (filtro 'meta'): sin meta,
+# meta ya cumplida, cumplida al ritmo de ventas del mes (proyección al cierre) o en riesgo
+META_STATES = ('Sin meta', 'Cumplida', 'En camino', 'En riesgo')
+
+# sumas por (centro, material) de inventario, tránsitos y metas
+SUM_COLUMNS = ('Inventario', 'Transitos', 'Meta Cantidad')
+
+# meses del cubo que usa el forecast: 0..2 = los tres anteriores (0 = mes pasado), 3 = actual
+MONTH_SLOTS = ('m0', 'm1', 'm2', 'm3')
+
+# |valor escalado| a partir del cual np.round deja de ser confiable frente a round()
+_ROUND_EXACT_LIMIT = 1e8
+
+
+def round_values(values, ndigits):
+    """
+    round(v, ndigits) de Python sobre una columna float. np.round (x·10ⁿ, rint, /10ⁿ)
+    da el mismo float salvo cerca de un empate .5 o con valores muy grandes:
+    esos pocos se redondean con round().
+    """
+    values = np.asarray(values, dtype=float)
+    scale = 10.0 ** ndigits
+    scaled = values * scale
+    out = np.rint(scaled) / scale
+    risky = ~(np.abs(scaled) < _ROUND_EXACT_LIMIT) | (np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    if risky.any():
+        out[risky] = [round(v, ndigits) for v in values[risky].tolist()]
+    return out
+
+
+def as_int(values):
+    """int(v) por elemento (trunca), con 0 para faltantes."""
+    return np.trunc(np.nan_to_num(np.asarray(values, dtype=float), nan=0.0)).astype(np.int64)
+
+
+def table_columns(inventario, transitos, m0, m1, m2, actual, mediana, meta, today):
+    """Columnas calculadas de FORECAST_COLUMNS (más banderas de nulos) y máscara de inclusión."""
+    pasado = m0
+    promedio = round_values((m0 + m1 + m2) / 3.0, 2)
+
+    # metas: ventas del mes contra la meta y proyección lineal al cierre del mes
+    days = calendar.monthrange(today.year, today.month)[1]
+    proyeccion = round_values(actual * days / today.day, 2)
+    has_meta = meta != 0
+    cumplimiento = round_values(actual / np.where(has_meta, meta, 1), 4)
+    cumplimiento_proyectado = round_values(proyeccion / np.where(has_meta, meta, 1), 4)
+    estado = np.select([~has_meta, cumplimiento >= 1, cumplimiento_proyectado >= 1],
+                       META_STATES[:3], META_STATES[3]).astype(object)
+
+    # filtro de inclusión
+    keep = (inventario > 0) | (transitos > 0) | (actual > 0) | (pasado > 0) | (promedio > 0)
+
+    columns = {
+        'Ventas_Mes_Actual': actual,
+        'Ventas_Mes_Pasado': pasado,
+        'Ventas_Promedio_3_Meses': promedio,
+        'Mediana': round_values(mediana, 2),
+        'Inventario': inventario,
+        'Transitos': transitos,
+        'Indicador_3_Meses': round_values(inventario / np.where(promedio != 0, promedio, 1), 4),
+        'Indicador_Mes_Pasado': round_values(inventario / np.where(pasado != 0, pasado, 1), 4),
+        'Envio_3_Meses': round_values(promedio - inventario, 2),
+        'Envio_Pasadas': pasado - inventario,
+        'Meta_Mes': meta,
+        'Cumplimiento_Meta': cumplimiento,
+        'Proyeccion_Cierre': proyeccion,
+        'Cumplimiento_Proyectado': cumplimiento_proyectado,
+        'Estado_Meta': estado,
+        '_mediana': ~np.isnan(mediana),
+        '_ind3': promedio != 0,
+        '_indp': pasado != 0,
+        '_meta': has_meta,
+    }
+    return columns, keep
+
+
+def lookup(keys, source_keys, source_values):
+    """Valor de la fuente para cada clave, NaN si no está (como un reindex)."""
+    out = np.full(len(keys), np.nan)
+    if len(source_keys):
+        pos = np.minimum(np.searchsorted(source_keys, keys), len(source_keys) - 1)
+        hit = source_keys[pos] == keys
+        out[hit] = source_values[pos[hit]]
+    return out
+
+
+def evaluate_shard(task):
+    """Proceso del pool: columnas de la tabla de un shard, ya ordenadas, y su posición en cand."""
+    spec, shard, n_mat, pack, today = task
+    with shard_pool.attached(spec) as arrays:
+        pos = np.flatnonzero(arrays['shard'] == shard)
+        cc, mat = arrays['cc'][pos], arrays['mat'][pos]
+        keys = cc * n_mat + mat
+        values = {name: lookup(keys, arrays[f'{name}:key'], arrays[f'{name}:value'])
+                  for name in (*SUM_COLUMNS, *MONTH_SLOTS, 'Mediana')}
+    columns, keep = table_columns(
+        as_int(values['Inventario']), as_int(values['Transitos']),
+        *(as_int(values[s]) for s in MONTH_SLOTS), values['Mediana'],
+        as_int(values['Meta Cantidad']), today,
+    )
+    pos, cc, mat = pos[keep], cc[keep], mat[keep]
+    columns = {c: v[keep] for c, v in columns.items()}
+    orden = -columns['Envio_Pasadas']
+    if pack is not None:
+        lo, n_cc = pack
+        key = ((orden - lo) * n_cc + cc) * n_mat + mat
+        order = np.argsort(key, kind='stable')
+    else:
+        key = None
+        order = np.lexsort((mat, cc, orden))
+    out = {c: v[order] for c, v in columns.items()}
+    out['pos'] = pos[order]
+    out['_orden'] = orden[order]
+    out['key'] = None if key is None else key[order]
+    return out
@@ -0,0 +1,512 @@
+"""
+forecast_engine.py
+Cálculo de los registros de forecast (Centro × Material) con operaciones de
+columnas en lugar de un bucle por candidato.
+
+Pasos de build_forecast_records:
+1. candidatos = unión de los pares (centro, material) de inventario, tránsitos y
+   ventas, restringida a materiales del maestro de productos;
+2. atributos (producto, marca, punto, canal) por join y filtros como máscaras;
+3. inventario, tránsitos, ventas de los cuatro meses y mediana alineados a los
+   candidatos en un solo reindex sobre la clave (centro, material);
+4. Envio_* e Indicador_* como expresiones de columna, orden y salida a dicts.
+   Las metas (metas.json) se suman en la misma agrupación que inventario y
+   tránsitos y entran en el mismo reindex: Meta_Mes, Cumplimiento_* (ventas del
+   mes / meta), Proyeccion_Cierre (ritmo diario del mes) y Estado_Meta (filtrable).
+
+Los pasos 3 y 4 pueden repartirse en shards (por canal o por hash de centro) y
+calcularse en un pool de procesos con las columnas en memoria compartida
+(shards > 1, ver _sharded_table y conexiones/shard_pool.py); las columnas calculadas y
+el cálculo de un shard están en conexiones/forecast_columns.py.
+
+ForecastSnapshot guarda la tabla completa (sin filtros) con un FacetIndex para
+filtrar por request sin recalcular (ver forecast_abastecimiento), y el historial
+de ventas de los últimos MAX_WINDOW meses por registro para las ventanas
+configurables (windows × stats) en una sola pasada sobre una matriz densa.
+
+El resultado es idéntico al cálculo fila a fila anterior (mismos valores, tipos
+y orden): los redondeos usan _round, que coincide con round() de Python.
+"""
+
+import os
+import zlib
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from conexiones import shard_pool
+from conexiones.facet_index import FacetIndex
+from conexiones.forecast_columns import (
+    META_STATES, MONTH_SLOTS, SUM_COLUMNS, as_int, evaluate_shard, round_values, table_columns,
+)
+from conexiones.keys import centro_column, material_column, text_column
+from conexiones.trigram_index import TrigramIndex
+
+KEY = ['Centro Costos', 'Material']
+
+FORECAST_COLUMNS = (
+    'Centro Costos', 'Material', 'Productos', 'Marca', 'Punto de Venta', 'Canal o Regional',
+    'Ventas_Mes_Actual', 'Ventas_Mes_Pasado', 'Ventas_Promedio_3_Meses', 'Mediana',
+    'Inventario', 'Transitos', 'Indicador_3_Meses', 'Indicador_Mes_Pasado',
+    'Envio_3_Meses', 'Envio_Pasadas',
+    'Meta_Mes', 'Cumplimiento_Meta', 'Proyeccion_Cierre', 'Cumplimiento_Proyectado', 'Estado_Meta',
+)
+
+# columnas de texto (atributos) y numéricas (más banderas de nulos) de la tabla
+ATTRIBUTE_COLUMNS = FORECAST_COLUMNS[:6]
+TABLE_COLUMNS = FORECAST_COLUMNS[6:] + ('_mediana', '_ind3', '_indp', '_meta')
+
+# reparto de candidatos para el cálculo en paralelo (ver _sharded_table)
+SHARD_BY = ('centro', 'canal')
+
+# ventanas de /forecast/data?windows=...&stat=...: meses hacia atrás (sin el actual)
+MAX_WINDOW = 24
+WINDOW_STAT_LABELS = {'mean': 'Promedio', 'median': 'Mediana', 'p80': 'P80'}
+
+# columnas filtrables -> dimensión del FacetIndex de ForecastSnapshot
+SNAPSHOT_FACETS = {
+    'Centro Costos': 'centro', 'Punto de Venta': 'punto', 'Material': 'material',
+    'Productos': 'producto', 'Marca': 'marca', 'Canal o Regional': 'canal', 'Estado_Meta': 'meta',
+}
+
+# normalización por columna (conexiones/keys.py): claves canónicas, atributos con strip
+KEY_NORMALIZERS = {'Centro Costos': centro_column, 'Material': material_column}
+
+
+def normalize_column(values, name=None):
+    """Columna normalizada (ndarray de str): canónica si name es una columna de KEY, si no keys.text."""
+    return KEY_NORMALIZERS.get(name, text_column)(values)
+
+
+def _nullable(values, valid):
+    """Lista de Python con None donde valid es False."""
+    out = np.asarray(values).astype(object)
+    out[~np.asarray(valid)] = None
+    return out.tolist()
+
+
+def ventas_frames(view):
+    """
+    Vista del cubo de ventas (ops_ventasclaro.ventas_cube_view) como DataFrames:
+    - monthly: Centro Costos, Material, y, m, Ventas
+    - median:  Centro Costos, Material, Mediana (un par por cada (centro, material) con ventas)
+    """
+    monthly = pd.DataFrame(list(view['monthly'].keys()), columns=KEY + ['y', 'm'])
+    monthly['Ventas'] = pd.Series(list(view['monthly'].values()), dtype=float)
+    median = pd.DataFrame(list(view['median'].keys()), columns=KEY)
+    median['Mediana'] = pd.Series(list(view['median'].values()), dtype=float)
+    return {'monthly': monthly, 'median': median}
+
+
+def past_months(today, count):
+    """[(año, mes)] de los count meses anteriores al actual, del más reciente al más viejo."""
+    past = [(today - relativedelta(months=i)).replace(day=1) for i in range(1, count + 1)]
+    return [(d.year, d.month) for d in past]
+
+
+def forecast_months(today):
+    """[(año, mes)] en el orden de MONTH_SLOTS."""
+    return past_months(today, 3) + [(today.year, today.month)]
+
+
+def _sales_history(monthly, keys, today):
+    """
+    Ventas de los MAX_WINDOW meses anteriores al actual para las claves dadas (MultiIndex
+    en el orden de los registros), en formato disperso: (fila, mes hacia atrás - 1, int(ventas)).
+    """
+    slot_of = {y * 100 + m: j for j, (y, m) in enumerate(past_months(today, MAX_WINDOW))}
+    slot = (monthly['y'] * 100 + monthly['m']).map(slot_of)
+    sel = slot.notna().to_numpy()
+    rows = keys.get_indexer(pd.MultiIndex.from_frame(monthly.loc[sel, KEY]))
+    found = rows >= 0
+    return (rows[found].astype(np.int64), slot.to_numpy()[sel][found].astype(np.int64),
+            as_int(monthly['Ventas'].to_numpy()[sel][found]))
+
+
+def window_stats(matrix, windows, stats):
+    """
+    Estadísticos por ventana sobre la matriz densa (clave × mes, columna 0 = mes pasado):
+    media con sumas acumuladas, mediana y p80 sobre el prefijo de cada ventana.
+    {columna: lista de float}, en el orden de windows y stats.
+    """
+    out = {}
+    csum = np.cumsum(matrix, axis=1) if 'mean' in stats else None
+    for w in windows:
+        for stat in stats:
+            if stat == 'mean':
+                values = csum[:, w - 1] / float(w)
+            elif stat == 'median':
+                values = np.median(matrix[:, :w], axis=1)
+            else:
+                values = np.percentile(matrix[:, :w], 80, axis=1)
+            out[window_column(w, stat)] = round_values(values, 2).tolist()
+    return out
+
+
+def window_column(window, stat):
+    return f"Ventas_{WINDOW_STAT_LABELS[stat]}_{window}_Meses"
+
+
+def _sum_by_key(df, column):
+    """Suma de column por (centro, material) canónicos, claves como object."""
+    keyed = pd.DataFrame({c: normalize_column(df[c], c) for c in KEY})
+    keyed[column] = df[column].to_numpy()
+    return keyed.groupby(KEY, sort=True)[column].sum().reset_index()
+
+
+def _monthly_slots(monthly, today):
+    """Ventas de los meses de MONTH_SLOTS en formato ancho, indexado por (centro, material)."""
+    slot_of = {y * 100 + m: slot for (y, m), slot in zip(forecast_months(today), MONTH_SLOTS)}
+    slot = (monthly['y'] * 100 + monthly['m']).map(slot_of)
+    sel = monthly[slot.notna()]
+    if sel.empty:
+        return None
+    return sel.assign(slot=slot[slot.notna()]).set_index(KEY + ['slot'])['Ventas'].unstack('slot')
+
+
+def _attributes(df, key, columns):
+    """Maestro (productos / puntos) normalizado e indexado por key; la última fila gana como en un dict."""
+    out = pd.DataFrame({key: normalize_column(df[key], key)})
+    for source, target in columns:
+        out[target] = normalize_column(df[source]) if source in df.columns else ''
+    return out.drop_duplicates(key, keep='last').set_index(key)
+
+
+def _candidates(df_inv, df_tra, df_prod, df_puntos, ventas, df_metas=None):
+    """
+    Pares candidatos con atributos (Productos, Marca, Punto de Venta, Canal o Regional)
+    y las sumas por clave de origen de SUM_COLUMNS ({columna: DataFrame o None}): (cand, sums).
+    Las metas no agregan candidatos.
+    """
+    if df_prod.empty or 'Material' not in df_prod.columns:
+        return None, None
+    prod = _attributes(df_prod, 'Material', (('Producto', 'Productos'), ('Marca', 'Marca')))
+    if not df_puntos.empty and 'Centro Costos' in df_puntos.columns:
+        puntos = _attributes(df_puntos, 'Centro Costos',
+                             (('Punto de Venta', 'Punto de Venta'), ('Canal o Regional', 'Canal o Regional')))
+    else:
+        puntos = pd.DataFrame(columns=['Punto de Venta', 'Canal o Regional'], index=pd.Index([], dtype=object))
+
+    # sumas en una sola agrupación por fuente
+    sums = {
+        'Inventario': _sum_by_key(df_inv, 'Inventario') if not df_inv.empty else None,
+        'Transitos': _sum_by_key(df_tra, 'Transitos') if not df_tra.empty else None,
+        'Meta Cantidad': None,
+    }
+    if df_metas is not None and not df_metas.empty and set(KEY + ['Meta Cantidad']).issubset(df_metas.columns):
+        sums['Meta Cantidad'] = _sum_by_key(df_metas, 'Meta Cantidad')
+
+    # unión de pares de inventario, tránsitos y ventas
+    pairs = []
+    for df, column in ((df_inv, 'Inventario'), (df_tra, 'Transitos')):
+        if sums[column] is not None and set(KEY).issubset(df.columns):
+            pairs.append(sums[column][KEY])
+    pairs.append(ventas['median'][KEY])
+    cand = pd.concat(pairs, ignore_index=True).drop_duplicates()
+    cand = cand[cand['Material'].isin(prod.index)]
+
+    cand = cand.join(prod, on='Material').join(puntos, on='Centro Costos')
+    cand[['Punto de Venta', 'Canal o Regional']] = cand[['Punto de Venta', 'Canal o Regional']].fillna('')
+    return cand, sums
+
+
+def filter_mask(frame, filters):
+    """
+    Máscara de filas de frame que cumplen los filtros de atributos (todos salvo 'meta', que
+    depende de la tabla calculada: ver build_forecast_records).
+    """
+    (centros_filter, puntos_filter, materials_filter,
+     productos_filter, marcas_filter, canales_filter, meta_filter) = filters
+    mask = np.ones(len(frame), dtype=bool)
+    for column, selected in (('Centro Costos', centros_filter), ('Punto de Venta', puntos_filter),
+                             ('Material', materials_filter), ('Marca', marcas_filter),
+                             ('Canal o Regional', canales_filter)):
+        if selected:
+            mask &= frame[column].str.lower().isin(selected).to_numpy()
+    if productos_filter:
+        names = frame['Productos'].str.lower()
+        found = np.zeros(len(frame), dtype=bool)
+        for pat in productos_filter:
+            found |= names.str.contains(pat, regex=False).to_numpy()
+        mask &= found
+    return mask
+
+
+def _forecast_table(cand, sums, ventas, today, shards=1, shard_by='centro'):
+    """
+    Tabla de forecast (FORECAST_COLUMNS + banderas de nulos) de los candidatos, ya ordenada.
+    Con shards > 1 se calcula en paralelo (ver _sharded_table); el resultado es el mismo.
+    """
+    if shards > 1:
+        return _sharded_table(cand, sums, ventas, today, shards, shard_by)
+
+    # valores alineados a los candidatos en un solo reindex
+    sources = [s.set_index(KEY)[col] for col, s in sums.items() if s is not None]
+    monthly = _monthly_slots(ventas['monthly'], today)
+    if monthly is not None:
+        sources.append(monthly)
+    sources.append(ventas['median'].set_index(KEY)['Mediana'])
+    values = pd.concat(sources, axis=1).reindex(
+        index=pd.MultiIndex.from_frame(cand[KEY]),
+        columns=[*SUM_COLUMNS, *MONTH_SLOTS, 'Mediana'],
+    )
+
+    columns, keep = table_columns(
+        as_int(values['Inventario']), as_int(values['Transitos']),
+        *(as_int(values[s]) for s in MONTH_SLOTS), values['Mediana'].to_numpy(),
+        as_int(values['Meta Cantidad']), today,
+    )
+    out = pd.DataFrame({**{c: cand[c].to_numpy() for c in ATTRIBUTE_COLUMNS}, **columns})[keep]
+
+    # orden: Envio_Pasadas descendente, luego centro y material
+    out['_orden'] = -out['Envio_Pasadas']
+    return out.sort_values(['_orden', 'Centro Costos', 'Material'], kind='stable')
+
+
+def _sorted_codes(values):
+    """(códigos, valores distintos): el orden de los códigos es el de sorted() sobre los valores."""
+    codes, uniques = pd.factorize(values)
+    uniques = np.asarray(uniques, dtype=object)
+    order = np.argsort(uniques, kind='stable')
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order), dtype=np.int64)
+    return rank[codes], uniques[order]
+
+
+def _shard_ids(cand, cc, cc_values, shards, shard_by):
+    """
+    Shard de cada candidato. 'canal': cada Canal o Regional entero en un shard (el más
+    grande al shard con menos filas); 'centro': crc32 del centro (estable entre procesos).
+    """
+    if shard_by == 'canal':
+        codes, uniques = pd.factorize(cand['Canal o Regional'])
+        sizes = np.bincount(codes, minlength=len(uniques))
+        owner = np.empty(len(uniques), dtype=np.int32)
+        load = np.zeros(shards, dtype=np.int64)
+        for c in np.argsort(-sizes, kind='stable').tolist():
+            target = int(np.argmin(load))
+            owner[c] = target
+            load[target] += sizes[c]
+        return owner[codes]
+    table = np.array([zlib.crc32(v.encode('utf-8')) % shards for v in cc_values.tolist()], dtype=np.int32)
+    return table[cc]
+
+
+def _encode_source(df, column, cc_index, mat_index, n_mat):
+    """(claves enteras ordenadas, valores float) de una fuente (centro, material, column)."""
+    if df is None or df.empty:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=float)
+    cc = cc_index.get_indexer(df['Centro Costos'])
+    mat = mat_index.get_indexer(df['Material'])
+    # como en el reindex: solo cuentan las claves idénticas a las de algún candidato
+    found = (cc >= 0) & (mat >= 0)
+    keys = cc[found].astype(np.int64) * n_mat + mat[found]
+    values = df[column].to_numpy(dtype=float)[found]
+    order = np.argsort(keys, kind='stable')
+    return keys[order], values[order]
+
+
+def _int_bounds(values):
+    """(mínimo, máximo) de as_int(values) incluyendo el 0 de los faltantes."""
+    values = as_int(values)
+    if not len(values):
+        return 0, 0
+    return min(0, int(values.min())), max(0, int(values.max()))
+
+
+def _sharded_table(cand, sums, ventas, today, shards, shard_by):
+    """
+    _forecast_table repartido en shards (por canal o por hash de centro) en el pool de
+    conexiones/shard_pool.py. Centros y materiales viajan como códigos con el orden de
+    los strings y las fuentes como (clave, valor) en memoria compartida; cada proceso
+    arma y ordena la tabla de su shard y aquí se combinan con un k-way merge sobre
+    (-Envio_Pasadas, centro, material). Los atributos de texto no salen del proceso.
+    """
+    if shard_by not in SHARD_BY:
+        raise ValueError(f"shard_by debe ser uno de {', '.join(SHARD_BY)}")
+    cc, cc_values = _sorted_codes(cand['Centro Costos'].to_numpy(dtype=object))
+    mat, mat_values = _sorted_codes(cand['Material'].to_numpy(dtype=object))
+    cc_index, mat_index = pd.Index(cc_values), pd.Index(mat_values)
+    n_cc, n_mat = len(cc_values), len(mat_values)
+
+    monthly = ventas['monthly']
+    slot_of = {y * 100 + m: slot for (y, m), slot in zip(forecast_months(today), MONTH_SLOTS)}
+    slot = (monthly['y'] * 100 + monthly['m']).map(slot_of)
+    sources = {
+        **{column: _encode_source(sums[column], column, cc_index, mat_index, n_mat) for column in SUM_COLUMNS},
+        **{s: _encode_source(monthly[(slot == s).to_numpy()], 'Ventas', cc_index, mat_index, n_mat)
+           for s in MONTH_SLOTS},
+        'Mediana': _encode_source(ventas['median'], 'Mediana', cc_index, mat_index, n_mat),
+    }
+
+    # clave de orden empaquetada en un int64 si alcanza: (-Envio_Pasadas, centro, material)
+    inv_lo, inv_hi = _int_bounds(sources['Inventario'][1])
+    pas_lo, pas_hi = _int_bounds(sources['m0'][1])
+    lo = inv_lo - pas_hi
+    span = inv_hi - pas_lo - lo + 1
+    pack = (lo, n_cc) if span * n_cc * n_mat < 2 ** 62 else None
+
+    shard = _shard_ids(cand, cc, cc_values, shards, shard_by)
+    arrays = {'cc': cc, 'mat': mat, 'shard': shard}
+    for name, (keys, values) in sources.items():
+        arrays[f'{name}:key'], arrays[f'{name}:value'] = keys, values
+    present = np.flatnonzero(np.bincount(shard, minlength=shards)).tolist()
+    with shard_pool.SharedArrays(arrays) as shared:
+        tasks = [(shared.spec, s, n_mat, pack, today) for s in present]
+        parts = shard_pool.run(evaluate_shard, tasks, min(shards, os.cpu_count() or 1))
+
+    if pack is not None:
+        order = shard_pool.merge_sorted([p['key'] for p in parts])
+    else:
+        pos = np.concatenate([p['pos'] for p in parts])
+        order = np.lexsort((mat[pos], cc[pos], np.concatenate([p['_orden'] for p in parts])))
+    pos = np.concatenate([p['pos'] for p in parts])[order]
+    out = pd.DataFrame({
+        **{c: cand[c].to_numpy()[pos] for c in ATTRIBUTE_COLUMNS},
+        **{c: np.concatenate([p[c] for p in parts])[order] for c in TABLE_COLUMNS},
+    })
+    out['_orden'] = -out['Envio_Pasadas']
+    return out
+
+
+def _table_records(out):
+    columns = [out[c].tolist() for c in FORECAST_COLUMNS]
+    for name, flag in (('Mediana', '_mediana'), ('Indicador_3_Meses', '_ind3'),
+                       ('Indicador_Mes_Pasado', '_indp'), ('Cumplimiento_Meta', '_meta'),
+                       ('Cumplimiento_Proyectado', '_meta')):
+        columns[FORECAST_COLUMNS.index(name)] = _nullable(out[name], out[flag])
+    return [dict(zip(FORECAST_COLUMNS, row)) for row in zip(*columns)]
+
+
+def record_order_key(record):
+    """Clave del orden de los registros: (-Envio_Pasadas, centro, material); única por registro."""
+    return (-record['Envio_Pasadas'], record['Centro Costos'], record['Material'])
+
+
+def seek(records, key):
+    """Posición del primer registro de records (ya ordenados) posterior a key (búsqueda binaria)."""
+    lo, hi = 0, len(records)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if record_order_key(records[mid]) <= key:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def build_forecast_records(df_inv, df_tra, df_prod, df_puntos, ventas, filters, today,
+                           shards=1, shard_by='centro', df_metas=None):
+    """
+    Registros de forecast ya ordenados (sin paginar).
+    ventas = ventas_frames(...); filters en el orden de forecast_abastecimiento.FORECAST_FILTERS;
+    shards / shard_by: cálculo en paralelo (ver _sharded_table); df_metas: metas.json (opcional).
+    """
+    cand, sums = _candidates(df_inv, df_tra, df_prod, df_puntos, ventas, df_metas)
+    if cand is None:
+        return []
+    cand = cand[filter_mask(cand, filters)]
+    if cand.empty:
+        return []
+    out = _forecast_table(cand, sums, ventas, today, shards, shard_by)
+    meta_filter = filters[-1]
+    if meta_filter:
+        out = out[out['Estado_Meta'].str.lower().isin(meta_filter).to_numpy()]
+    return _table_records(out)
+
+
+class ProductMatcher:
+    """
+    Filtro 'producto' resuelto a materiales: TrigramIndex sobre el Producto de cada
+    material del maestro (mismo texto y misma fila ganadora que el forecast).
+    """
+
+    def __init__(self, df_prod):
+        if df_prod.empty or 'Material' not in df_prod.columns:
+            self.materials = np.empty(0, dtype=object)
+            self.index = TrigramIndex([])
+            return
+        prod = _attributes(df_prod, 'Material', (('Producto', 'Productos'),))
+        self.materials = prod.index.to_numpy(dtype=object)
+        self.index = TrigramIndex(prod['Productos'].tolist())
+
+    def materials_matching(self, patterns):
+        """Materiales cuyo Producto contiene alguno de los patrones."""
+        return self.materials[self.index.search_any(patterns)]
+
+
+class ForecastSnapshot:
+    """
+    Tabla de forecast completa (sin filtros) de solo lectura: los registros ordenados
+    y un FacetIndex de las columnas filtrables. select() filtra sin recalcular;
+    filtrar no cambia el orden ni los valores, así que coincide con
+    build_forecast_records(..., filters, ...).
+    """
+
+    def __init__(self, records, facets, history=None, products=None):
+        self.records = records
+        self.facets = facets
+        self.products = products
+        empty = np.empty(0, dtype=np.int64)
+        self.history = history or (empty, empty, empty)
+
+    @classmethod
+    def build(cls, df_inv, df_tra, df_prod, df_puntos, ventas, today, products=None,
+              shards=1, shard_by='centro', df_metas=None):
+        """
+        products: ProductMatcher del mismo df_prod (se construye si no se pasa);
+        shards / shard_by / df_metas como en build_forecast_records.
+        """
+        if products is None:
+            products = ProductMatcher(df_prod)
+        cand, sums = _candidates(df_inv, df_tra, df_prod, df_puntos, ventas, df_metas)
+        if cand is None or cand.empty:
+            return cls([], FacetIndex({name: [] for name in SNAPSHOT_FACETS.values()}), products=products)
+        out = _forecast_table(cand, sums, ventas, today, shards, shard_by)
+        facets = FacetIndex({name: out[column].to_numpy() for column, name in SNAPSHOT_FACETS.items()})
+        keys = pd.MultiIndex.from_arrays([out['Centro Costos'].to_numpy(), out['Material'].to_numpy()])
+        return cls(_table_records(out), facets, _sales_history(ventas['monthly'], keys, today), products)
+
+    def select_index(self, filters):
+        """Posiciones (ndarray) de los registros que cumplen filters; None si no hay filtros."""
+        if not any(filters):
+            return None
+        (centros_filter, puntos_filter, materials_filter,
+         productos_filter, marcas_filter, canales_filter, meta_filter) = filters
+        mask = self.facets.select({
+            'centro': centros_filter, 'punto': puntos_filter, 'material': materials_filter,
+            'marca': marcas_filter, 'canal': canales_filter, 'meta': meta_filter,
+        })
+        if productos_filter:
+            # subcadena de Producto -> materiales (índice de trigramas) -> filas
+            mask &= self.facets.isin('material', self.products.materials_matching(productos_filter))
+        return np.flatnonzero(mask)
+
+    def select(self, filters, windows=(), stats=()):
+        """
+        Registros que cumplen filters (la lista compartida si no hay filtros ni ventanas).
+        Con windows/stats cada registro es una copia con las columnas de window_stats agregadas.
+        """
+        idx = self.select_index(filters)
+        records = self.records if idx is None else [self.records[i] for i in idx.tolist()]
+        if not windows:
+            return records
+        extra = window_stats(self.sales_matrix(idx, max(windows)), windows, stats)
+        names = list(extra)
+        return [{**rec, **dict(zip(names, row))} for rec, row in zip(records, zip(*extra.values()))]
+
+    def sales_matrix(self, idx, width):
+        """Matriz densa (registro × mes hacia atrás) de los registros idx (todos si es None)."""
+        rows, slot, value = self.history
+        if idx is None:
+            n = len(self.records)
+        else:
+            n = len(idx)
+            pos = np.full(len(self.records), -1, dtype=np.int64)
+            pos[idx] = np.arange(n)
+            rows = pos[rows]
+        keep = (rows >= 0) & (slot < width)
+        matrix = np.zeros((n, width), dtype=np.int64)
+        matrix[rows[keep], slot[keep]] = value[keep]
+        return matrix
@@ -0,0 +1,253 @@
+"""
+import_jobs.py
+Cola de trabajos de importación en segundo plano (un worker por cola).
+
+- submit(fn, owner=..., **info) encola fn(job) y devuelve el trabajo de inmediato.
+- Los trabajos se ejecutan de a uno, en orden de llegada: varios usuarios pueden
+  encolar importaciones sin bloquearse entre sí ni bloquear el request.
+- fn reporta avance con job.progress(procesadas, total) y devuelve el dict
+  de resultado; una excepción ImportJobError marca el trabajo como "error" con su mensaje.
+- El estado de cada trabajo se guarda en <state_dir>/<id>.json (escritura atómica,
+  bajo el lock del trabajo): con varios procesos (gunicorn con más de un worker)
+  cualquiera responde el estado aunque la importación corra en otro.
+- get(job_id, owner) solo devuelve el trabajo a quien lo encoló.
+- Los trabajos terminados se conservan JOB_TTL segundos para consultar el resultado.
+"""
+
+import itertools
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+import logging
+from collections import OrderedDict, deque
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+JOB_TTL = 3600        # segundos que se conserva un trabajo terminado
+MAX_FINISHED = 200    # tope de trabajos terminados en memoria
+SAVE_INTERVAL = 0.5   # segundos mínimos entre guardados de avance (los cambios de estado se guardan siempre)
+
+_JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+
+class ImportJobError(Exception):
+    """Error esperado de un trabajo (archivo inválido, columnas faltantes...): se informa tal cual."""
+
+    def __init__(self, message, detail=None):
+        super().__init__(message)
+        self.message = message
+        self.detail = detail
+
+
+def job_status(state, position=None):
+    """Estado público de un trabajo (dict guardado por ImportJob.snapshot) con velocidad y ETA."""
+    now = time.time()
+    end = state["finished_at"] or now
+    started = state["started_at"]
+    elapsed = round(end - started, 3) if started else 0.0
+    processed = state["processed"]
+    throughput = round(processed / elapsed, 1) if elapsed > 0 else None
+    eta = None
+    if state["status"] == "running" and throughput and state["total"]:
+        eta = round(max(state["total"] - processed, 0) / throughput, 1)
+    elif state["status"] == "done":
+        eta = 0.0
+    out = {
+        "job_id": state["id"],
+        "status": state["status"],
+        "rows_processed": processed,
+        "rows_total": state["total"],
+        "elapsed_seconds": elapsed,
+        "rows_per_second": throughput,
+        "eta_seconds": eta,
+        **state["info"],
+    }
+    if position is not None:
+        out["queue_position"] = position
+    if state["result"] is not None:
+        out["result"] = state["result"]
+    if state["error"] is not None:
+        out["error"] = state["error"]
+        if state["detail"]:
+            out["detail"] = state["detail"]
+    return out
+
+
+class ImportJob:
+    def __init__(self, fn, info, owner=None, on_change=None):
+        self.id = uuid.uuid4().hex
+        self.fn = fn
+        self.info = dict(info)
+        self.owner = owner
+        self.status = "queued"        # queued | running | done | error
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.processed = 0
+        self.total = None             # filas estimadas (None si no se conocen)
+        self.result = None
+        self.error = None
+        self.detail = None
+        self._on_change = on_change
+        self._saved_at = 0.0
+        self._lock = threading.Lock()
+
+    def progress(self, processed, total=None):
+        with self._lock:
+            self.processed = int(processed)
+            if total is not None:
+                self.total = int(total)
+            self._changed(force=total is not None)
+
+    def set(self, **fields):
+        """Cambio de estado (status, tiempos, resultado, error): se aplica y se guarda bajo el lock."""
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self._changed(force=True)
+
+    def _changed(self, force=False):
+        # con self._lock tomado
+        now = time.time()
+        if self._on_change is not None and (force or now - self._saved_at >= SAVE_INTERVAL):
+            self._saved_at = now
+            self._on_change(self._snapshot())
+
+    def _snapshot(self):
+        return {
+            "id": self.id, "owner": self.owner, "info": self.info, "status": self.status,
+            "created_at": self.created_at, "started_at": self.started_at,
+            "finished_at": self.finished_at, "processed": self.processed, "total": self.total,
+            "result": self.result, "error": self.error, "detail": self.detail,
+        }
+
+    def snapshot(self):
+        with self._lock:
+            return self._snapshot()
+
+    def to_dict(self, position=None):
+        return job_status(self.snapshot(), position)
+
+
+class ImportJobQueue:
+    def __init__(self, name, state_dir=None):
+        """state_dir: directorio donde se guarda el estado de cada trabajo (None = solo en memoria)."""
+        self.name = name
+        self.state_dir = Path(state_dir) if state_dir else None
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()    # id -> ImportJob (orden de llegada)
+        self._pending = deque()
+        self._wakeup = threading.Condition(self._lock)
+        self._worker = None
+        self._seq = itertools.count(1)
+
+    # ---------- estado en disco ----------
+    def _path(self, job_id):
+        return self.state_dir / f"{job_id}.json"
+
+    def _save(self, state):
+        if self.state_dir is None:
+            return
+        try:
+            self.state_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=str(self.state_dir), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False, default=str)
+            os.replace(tmp, self._path(state["id"]))
+        except Exception:
+            logger.exception("No se pudo guardar el estado de la importación %s (%s)", state["id"], self.name)
+
+    def _load(self, job_id):
+        if self.state_dir is None:
+            return None
+        try:
+            return json.loads(self._path(job_id).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _prune_files(self):
+        if self.state_dir is None or not self.state_dir.exists():
+            return
+        cutoff = time.time() - JOB_TTL
+        active = {jid for jid, j in self._jobs.items() if j.finished_at is None}
+        for path in self.state_dir.glob("*.json"):
+            try:
+                if path.stem not in active and path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError:
+                continue
+
+    # ---------- API ----------
+    def submit(self, fn, owner=None, **info):
+        job = ImportJob(fn, info, owner=owner, on_change=self._save)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            self._save(job.snapshot())
+            self._ensure_worker()
+            self._wakeup.notify()
+        return job
+
+    def get(self, job_id, owner=None):
+        """
+        Estado del trabajo como dict (None si no existe, expiró o es de otro dueño).
+        Los trabajos de otro proceso se leen de su archivo de estado.
+        """
+        if not _JOB_ID.fullmatch(job_id or ""):
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+            position = None
+            if job is not None and job.status == "queued":
+                position = next((i for i, j in enumerate(self._pending, 1) if j is job), None)
+        state = job.snapshot() if job is not None else self._load(job_id)
+        if state is None or state.get("owner") != owner:
+            return None
+        return job_status(state, position)
+
+    def _prune(self):
+        now = time.time()
+        finished = [j for j in self._jobs.values() if j.finished_at is not None]
+        expired = {j.id for j in finished if now - j.finished_at > JOB_TTL}
+        overflow = len(finished) - len(expired) - MAX_FINISHED
+        if overflow > 0:
+            alive = [j for j in finished if j.id not in expired]
+            expired.update(j.id for j in alive[:overflow])
+        for jid in expired:
+            self._jobs.pop(jid, None)
+        self._prune_files()
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._worker = threading.Thread(
+            target=self._run, name=f"{self.name}-import-{next(self._seq)}", daemon=True
+        )
+        self._worker.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._pending:
+                    if not self._wakeup.wait(timeout=60):
+                        if not self._pending:
+                            self._worker = None
+                            return
+                job = self._pending.popleft()
+            job.set(status="running", started_at=time.time())
+            fn, job.fn = job.fn, None
+            try:
+                result = fn(job)
+                job.set(result=result, status="done", finished_at=time.time())
+            except ImportJobError as e:
+                job.set(error=e.message, detail=e.detail, status="error", finished_at=time.time())
+            except Exception as e:
+                logger.exception("Error en importación %s (%s)", job.id, self.name)
+                job.set(error="Error inesperado durante la importación", detail=str(e),
+                        status="error", finished_at=time.time())
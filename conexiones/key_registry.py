@@ -0,0 +1,97 @@
+"""
+key_registry.py
+Registro de claves de los maestros para validar Material (productos_claro.json) y
+Centro Costos (puntos_venta_claro.json) en inventario, tránsitos, metas y ventas.
+
+Por cada versión del archivo maestro se arma una sola vez (store_loader, cacheado
+por la firma del archivo):
+- values: el conjunto de claves tal cual (keys.text) para la validación exacta;
+- variante -> clave canónica del maestro (keys.material_variants / centro_variants),
+  para la validación tolerante a formatos (ceros a la izquierda, '.0', prefijo 'C', ...).
+
+Validar un valor es un probe O(1) (`valor in registro` o registro.canonical(valor)),
+sin releer el maestro ni recalcular sus variantes (memoizadas en conexiones/keys.py).
+"""
+
+from pathlib import Path
+
+from conexiones import store_loader
+from conexiones.keys import centro_variants, material_variants, text
+
+DATA_DIR = Path(__file__).resolve().parent / "data_ops"
+PRODUCTOS_PATH = DATA_DIR / "productos_claro.json"
+PUNTOS_PATH = DATA_DIR / "puntos_venta_claro.json"
+
+# keys aceptadas en los maestros, en orden de preferencia
+MATERIAL_KEYS = ("Material", "material")
+CENTRO_KEYS = ("Centro Costos", "Centro", "centro", "Centro Cost")
+
+
+class KeyRegistry:
+    def __init__(self, values, variants):
+        """values: claves del maestro (limpias, en orden); variants(valor) -> tupla de variantes."""
+        self.values = frozenset(values)
+        self._variants = variants
+        self._canonical = {}
+        for value in values:
+            for variant in variants(value):
+                # con variantes repetidas gana la primera clave del maestro
+                self._canonical.setdefault(variant, value)
+
+    def __contains__(self, value):
+        return value in self.values
+
+    def __len__(self):
+        return len(self.values)
+
+    def canonical(self, value):
+        """Clave del maestro que corresponde a value por alguna de sus variantes, o None."""
+        for variant in self._variants(value):
+            found = self._canonical.get(variant)
+            if found is not None:
+                return found
+        return None
+
+    def missing(self, values):
+        """Valores (no vacíos) que no están tal cual en el maestro."""
+        return {v for v in values if v and v not in self.values}
+
+
+def _master_values(data, keys):
+    out = []
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        value = text(next((item[k] for k in keys if item.get(k)), ""))
+        if value:
+            out.append(value)
+    return out
+
+
+def _material_registry(data):
+    return KeyRegistry(_master_values(data, MATERIAL_KEYS), material_variants)
+
+
+def _centro_registry(data):
+    return KeyRegistry(_master_values(data, CENTRO_KEYS), centro_variants)
+
+
+def _registry(path, build):
+    def _load():
+        try:
+            data = store_loader.load_json(path)
+        except ValueError:
+            data = []   # maestro ilegible: todo queda pendiente hasta que se corrija
+        return build(data)
+    # firma antes de leer: si el maestro cambia durante la carga, la próxima llamada reconstruye
+    return store_loader.load(f"{path}::{build.__name__}", store_loader.file_signature(path), _load)
+
+
+def materials(path=PRODUCTOS_PATH):
+    """KeyRegistry de los materiales del maestro de productos (compartido, solo lectura)."""
+    return _registry(path, _material_registry)
+
+
+def centros(path=PUNTOS_PATH):
+    """KeyRegistry de los centros de costos del maestro de puntos de venta (compartido, solo lectura)."""
+    return _registry(path, _centro_registry)
@@ -0,0 +1,239 @@
+"""
+keyed_view.py
+Vista materializada por clave (tabla "cruzada") mantenida de forma incremental.
+
+Cada fila tiene una clave (tupla, p. ej. (material, centro)) y sus columnas salen de
+fuentes ViewSource(name, signature, load, columns, lookup=None, rows=False):
+- load() -> {clave de la fuente: {columna: valor}} (solo se llama si signature() cambió);
+- lookup(clave de fila) -> clave de la fuente (None = la misma clave de fila);
+- rows=True: la fuente además define qué filas existen (unión de las fuentes de
+  filas en orden de primera aparición, como un dict que se va llenando).
+
+refresh() compara las firmas con las de la última carga y, por cada fuente que
+cambió, la recarga, calcula qué claves cambiaron (diff contra el mapa anterior) y
+vuelve a unir solo sus columnas en las filas afectadas. Las filas nuevas se unen con
+los mapas ya cargados de las demás fuentes, sin releerlas. records() devuelve los
+registros de salida (RowFinalizer.record por fila): solo se vuelven a convertir las
+filas que cambiaron, en una copia de la lista anterior; changed_positions(versión)
+dice qué posiciones cambiaron respecto de la versión anterior (None = cambió el
+conjunto u orden de filas, o el estado del finalizador: todo es nuevo). stats()
+informa qué fuentes cambiaron, cuántas filas tocó y la duración de cada etapa.
+"""
+
+import threading
+import time
+
+_MISSING = object()
+
+
+class ViewSource:
+    def __init__(self, name, signature, load, columns, lookup=None, rows=False):
+        self.name = name
+        self.signature = signature
+        self.load = load
+        self.columns = tuple(columns)
+        self.lookup = lookup
+        self.rows = rows
+
+
+class RowFinalizer:
+    """
+    Fila de la vista -> registro de salida, de a una fila.
+    update(anterior, nueva) se llama por cada fila agregada (anterior None), cambiada o
+    quitada (nueva None) para mantener lo que depende de todas las filas (p. ej. el tipo
+    de una columna); state() lo resume y, si cambia, se convierten de nuevo todas las
+    filas. record(fila) usa el estado de la última llamada a state().
+    """
+
+    def update(self, old, new):
+        pass
+
+    def state(self):
+        return None
+
+    def record(self, row):
+        return row
+
+
+class KeyedView:
+    def __init__(self, key_columns, defaults, sources, finalize=None):
+        """
+        key_columns: nombres de las partes de la clave de fila (van a cada fila);
+        defaults: {columna: valor sin fuente} en el orden de salida (incluye key_columns);
+        finalize: RowFinalizer (por defecto, la fila tal cual; record debe devolver un
+        dict nuevo si la cambia).
+        """
+        self.key_columns = tuple(key_columns)
+        self.defaults = dict(defaults)
+        self.sources = list(sources)
+        self.finalize = finalize or RowFinalizer()
+        self._lock = threading.Lock()
+        self._sigs = {}
+        self._maps = {}
+        self._rows = {}
+        self._order = []
+        self._pos = {}
+        # fuentes con lookup: {nombre: {clave de la fuente: {claves de fila}}}
+        self._index = {s.name: {} for s in self.sources if s.lookup is not None}
+        self._records = []
+        self._state = _MISSING
+        self._version = 0
+        self._changes = (0, None)
+        self._stats = {"refreshes": 0, "rows": 0, "last": None}
+
+    def records(self):
+        """(versión, registros) vigentes, refrescando antes si alguna fuente cambió. Lista compartida."""
+        self.refresh()
+        return self._version, self._records
+
+    def changed_positions(self, version):
+        """
+        Posiciones (ordenadas) de los registros que cambiaron de version - 1 a version,
+        o None si no se sabe (otra versión) o cambió todo.
+        """
+        changed_in, positions = self._changes
+        return positions if changed_in == version else None
+
+    def stats(self):
+        return {**self._stats, "version": self._version}
+
+    def refresh(self):
+        """Aplica los cambios de las fuentes; True si la vista cambió."""
+        with self._lock:
+            t_start = time.perf_counter()
+            stages = {}
+            t0 = time.perf_counter()
+            sigs = {s.name: s.signature() for s in self.sources}
+            stages["firmas"] = time.perf_counter() - t0
+            changed = [s for s in self.sources if sigs[s.name] != self._sigs.get(s.name, _MISSING)]
+            if not changed:
+                return False
+
+            diffs = {}
+            for source in changed:
+                t0 = time.perf_counter()
+                new = source.load()
+                stages[f"carga:{source.name}"] = time.perf_counter() - t0
+                t0 = time.perf_counter()
+                old = self._maps.get(source.name, {})
+                diff = [k for k, v in new.items() if old.get(k, _MISSING) != v]
+                diff += [k for k in old if k not in new]
+                stages[f"diff:{source.name}"] = time.perf_counter() - t0
+                diffs[source.name] = diff
+                self._maps[source.name] = new
+                self._sigs[source.name] = sigs[source.name]
+
+            added, removed, reordered = set(), 0, False
+            if any(s.rows for s in changed):
+                t0 = time.perf_counter()
+                old_order = self._order
+                added, removed = self._sync_rows()
+                reordered = self._order != old_order
+                stages["filas"] = time.perf_counter() - t0
+
+            affected = {}
+            updated = set()
+            for source in changed:
+                t0 = time.perf_counter()
+                touched = 0
+                for skey in diffs[source.name]:
+                    for key in self._rows_for(source, skey):
+                        if key not in added:
+                            old = self._rows[key]
+                            row = dict(old)
+                            self._join(row, key, source)
+                            self._rows[key] = row
+                            self.finalize.update(old, row)
+                            updated.add(key)
+                            touched += 1
+                affected[source.name] = touched
+                stages[f"union:{source.name}"] = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            positions = self._materialize(updated, reordered)
+            stages["materializar"] = time.perf_counter() - t0
+            self._version += 1
+            self._changes = (self._version, positions)
+            self._stats = {
+                "refreshes": self._stats["refreshes"] + 1,
+                "rows": len(self._order),
+                "last": {
+                    "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "changed": [s.name for s in changed],
+                    "added_rows": len(added),
+                    "removed_rows": removed,
+                    "rebuilt": positions is None,
+                    "affected_rows": affected,
+                    "stages_ms": {k: round(v * 1000, 3) for k, v in stages.items()},
+                    "total_ms": round((time.perf_counter() - t_start) * 1000, 3),
+                },
+            }
+            return True
+
+    def _materialize(self, updated, reordered):
+        """
+        Registros de la nueva versión. Con las mismas filas en el mismo orden y el mismo estado
+        del finalizador, copia la lista y convierte solo las filas cambiadas (devuelve sus
+        posiciones); si no, reusa los registros de las filas sin cambios y devuelve None.
+        """
+        state = self.finalize.state()
+        record = self.finalize.record
+        if state != self._state:
+            self._state = state
+            self._records = [record(self._rows[k]) for k in self._order]
+        elif reordered:
+            old_pos, old_records = self._pos, self._records
+            self._records = [old_records[old_pos[k]] if k in old_pos and k not in updated
+                             else record(self._rows[k]) for k in self._order]
+        else:
+            records = list(self._records)
+            positions = sorted(self._pos[k] for k in updated)
+            for p in positions:
+                records[p] = record(self._rows[self._order[p]])
+            self._records = records
+            return positions
+        self._pos = {k: i for i, k in enumerate(self._order)}
+        return None
+
+    def _rows_for(self, source, skey):
+        if source.lookup is None:
+            return (skey,) if skey in self._rows else ()
+        return self._index[source.name].get(skey, ())
+
+    def _join(self, row, key, source):
+        values = self._maps.get(source.name, {}).get(key if source.lookup is None else source.lookup(key))
+        for column in source.columns:
+            row[column] = self.defaults[column] if values is None else values[column]
+
+    def _sync_rows(self):
+        """
+        Filas según las fuentes de filas: quita las que ya no están y une las nuevas.
+        Devuelve (claves agregadas, cantidad de filas quitadas).
+        """
+        order = {}
+        for source in self.sources:
+            if source.rows:
+                order.update(dict.fromkeys(self._maps.get(source.name, {})))
+        gone = [k for k in self._rows if k not in order]
+        for key in gone:
+            self.finalize.update(self._rows.pop(key), None)
+            for source in self.sources:
+                if source.lookup is not None:
+                    keys = self._index[source.name].get(source.lookup(key))
+                    if keys is not None:
+                        keys.discard(key)
+        added = set()
+        for key in order:
+            if key in self._rows:
+                continue
+            row = dict(self.defaults)
+            row.update(zip(self.key_columns, key))
+            for source in self.sources:
+                self._join(row, key, source)
+                if source.lookup is not None:
+                    self._index[source.name].setdefault(source.lookup(key), set()).add(key)
+            self._rows[key] = row
+            self.finalize.update(None, row)
+            added.add(key)
+        self._order = list(order)
+        return added, len(gone)
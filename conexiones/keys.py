@@ -0,0 +1,196 @@
+"""
+keys.py
+Normalización de las claves de cruce (Material y Centro Costos) para todos los
+stores, cruces e importaciones.
+
+- material(v): forma canónica de un material (EAN/GTIN o código): sin espacios ni
+  caracteres invisibles, notación científica de Excel ("8,40081E+11") y decimales
+  enteros ("840080531083.0") a entero, separadores de miles fuera;
+- centro(v): forma canónica de un centro de costos: sin espacios ni invisibles, en
+  mayúsculas y sin el '.0' de un número leído como float;
+- text(v): str(v).strip() con None / NaN -> '' (atributos y comparaciones exactas);
+- material_column / centro_column / text_column: lo mismo sobre una columna
+  (Series, ndarray o lista), aplicado una vez por valor distinto (ndarray de str);
+- material_variants / centro_variants: variantes tolerantes para los registros de
+  los maestros (ver conexiones/key_registry.py).
+
+Un valor que ya es una cadena de dígitos (el caso común) sale por el camino rápido
+sin expresiones regulares; el resto pasa por patrones precompilados y queda
+memoizado (lru_cache): un mismo material en miles de filas se normaliza una vez.
+"""
+
+import functools
+import math
+import re
+
+import numpy as np
+import pandas as pd
+
+CACHE_SIZE = 65536
+
+_INVISIBLE = re.compile('[\\s\u200b\u200c\u200d\u2060\ufeff]+')
+_EXPONENT = re.compile(r'[eE]')
+_NUMERIC = re.compile(r'[\d.,]+')
+_INT_DECIMAL = re.compile(r'(\d+)\.0+')
+_NON_DIGIT = re.compile(r'\D')
+_NON_ALNUM = re.compile(r'[^A-Za-z0-9]')
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _plain_int(value):
+    return isinstance(value, (int, np.integer)) and not isinstance(value, (bool, np.bool_))
+
+
+def _number(s):
+    """'123.0' -> '123', '12.5' -> '12.5' (None si s no es un número)."""
+    try:
+        val = float(s)
+    except ValueError:
+        return None
+    if not math.isfinite(val):
+        return None
+    if abs(val - int(val)) < 1e-6:
+        return str(int(val))
+    return format(val, 'f').rstrip('0').rstrip('.')
+
+
+def text(value):
+    """str(value).strip(); None / NaN -> ''."""
+    if type(value) is str:
+        return value.strip()
+    if _is_missing(value):
+        return ''
+    return str(value).strip()
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _material(s):
+    s = _INVISIBLE.sub('', s)
+    if not s:
+        return ''
+    if _EXPONENT.search(s):
+        num = _number(s.replace(',', '.'))
+        if num is not None:
+            return num
+    m = _INT_DECIMAL.fullmatch(s)
+    if m:
+        return m.group(1)
+    if _NUMERIC.fullmatch(s):
+        # una sola coma y sin puntos: coma decimal ("12,0" -> "12")
+        if s.count(',') == 1 and '.' not in s:
+            num = _number(s.replace(',', '.'))
+            if num is not None:
+                return num
+        digits = _NON_DIGIT.sub('', s)
+        if digits:
+            return digits
+    return s
+
+
+def material(value):
+    """Material canónico (str, '' si no hay valor)."""
+    if type(value) is str:
+        if value.isdigit() and value.isascii():
+            return value
+        return _material(value)
+    if _is_missing(value):
+        return ''
+    if _plain_int(value):
+        return str(int(value))
+    if isinstance(value, float):
+        return _number(repr(value)) or ''
+    return _material(str(value))
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _centro(s):
+    s = _INVISIBLE.sub('', s).upper()
+    m = _INT_DECIMAL.fullmatch(s)
+    return m.group(1) if m else s
+
+
+def centro(value):
+    """Centro de costos canónico (str, '' si no hay valor)."""
+    if type(value) is str:
+        if value.isdigit() and value.isascii():
+            return value
+        return _centro(value)
+    if _is_missing(value):
+        return ''
+    if _plain_int(value):
+        return str(int(value))
+    return _centro(str(value))
+
+
+def _column(func, values):
+    if isinstance(values, (list, tuple)):
+        values = np.array(values, dtype=object)
+    codes, uniques = pd.factorize(values)
+    table = np.array([func(u) for u in uniques] + [''], dtype=object)
+    return table[codes]
+
+
+def material_column(values):
+    """material() sobre una columna (ndarray de str; nulos -> '')."""
+    return _column(material, values)
+
+
+def centro_column(values):
+    """centro() sobre una columna (ndarray de str; nulos -> '')."""
+    return _column(centro, values)
+
+
+def text_column(values):
+    """text() sobre una columna (ndarray de str; nulos -> '')."""
+    return _column(text, values)
+
+
+# ---------- variantes para los registros de los maestros ----------
+def _unique(values):
+    return tuple(dict.fromkeys(v for v in values if v))
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _material_variants(s):
+    variants = [s, _material(s)]
+    digits = _NON_DIGIT.sub('', s)
+    if digits:
+        variants += [digits, digits.lstrip('0') or '0']
+    m = _INT_DECIMAL.fullmatch(s)
+    if m:
+        variants.append(m.group(1))
+    return _unique(variants)
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _centro_variants(s):
+    s_up = s.upper()
+    alnum = _NON_ALNUM.sub('', s_up)
+    variants = [s_up, alnum]
+    if alnum.startswith('C') and len(alnum) > 1:
+        variants.append(alnum[1:])
+    digits = _NON_DIGIT.sub('', s)
+    if digits:
+        variants += [digits, digits.lstrip('0') or '0', 'C' + digits]
+    return _unique(variants)
+
+
+def material_variants(value):
+    """
+    Variantes de un material, en orden de preferencia: el valor limpio, el canónico,
+    solo dígitos, sin ceros a la izquierda y la parte entera de '1234.0'.
+    """
+    s = text(value)
+    return _material_variants(s) if s else ()
+
+
+def centro_variants(value):
+    """
+    Variantes de un centro de costos: en mayúsculas, solo alfanuméricos, sin la 'C'
+    inicial, solo dígitos (con y sin ceros a la izquierda) y con prefijo 'C'.
+    """
+    s = text(value)
+    return _centro_variants(s) if s else ()
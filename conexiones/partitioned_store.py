@@ -0,0 +1,537 @@
+"""
+partitioned_store.py
+Store de registros con id estable repartido en particiones (ventas por mes).
+
+Disposición en disco (<dir>, p. ej. data_ops/ventas_claro/):
+    manifest.json               {"partitions": [...], "next_id": n, "layout": v, "migrated": {...}}
+    .lock                       FileLock de todo el store (manifest, ids y particiones)
+    2025-09.json                base de la partición (SegmentLog)
+    2025-09.segments/*.ndjson   cola de la partición
+Cada partición es un SegmentLog: inserciones y ops upd/del por id van a la cola
+de la partición donde vive el registro. Un registro que cambia de partición al
+editarse se borra de la vieja y se agrega a la nueva con el mismo id.
+
+- Cada partición se cachea por separado con su propia firma: una escritura solo
+  obliga a releer la partición que tocó, y read_partitions parsea solo las pedidas.
+- drop_partitions borra los archivos de particiones completas (sin leer el resto);
+  filter_partition reescribe solo una partición.
+- Misma interfaz que RecordStore (read_shared, get, append, update, delete, rewrite);
+  el orden de lectura es el de los ids (= orden de inserción).
+- Si no hay manifest ni particiones y existe el JSON anterior (legacy_path, SegmentLog
+  con ids), se reparte en particiones una sola vez; el archivo anterior queda como está
+  (versionado en git) y el manifest registra la migración ("migrated").
+- Si falta el manifest pero hay particiones, se reconstruye a partir de los archivos
+  (sin volver a migrar el JSON anterior).
+- Varios procesos (gunicorn con más de un worker): el manifest se relee cuando cambia en
+  disco, las firmas salen de los archivos (manifest y particiones) y los ids se asignan
+  y guardan en el manifest bajo el FileLock del store.
+- layout identifica la regla de partition_keys: si el manifest trae otra, los registros
+  que ya no están en su partición se mueven una vez (p. ej. al cambiar cómo se lee el mes).
+
+Los registros devueltos son compartidos con la caché: no modificarlos.
+"""
+
+import json
+import os
+import shutil
+import logging
+from operator import itemgetter
+from pathlib import Path
+
+from conexiones import store_loader
+from conexiones.file_lock import FileLock
+from conexiones.segment_log import SegmentLog
+from conexiones.record_store import _valid_id
+from conexiones.store_loader import parse_json_list
+
+logger = logging.getLogger(__name__)
+
+
+class PartitionedRecordStore:
+    def __init__(self, dir_path, partition_keys, normalize=None, cache_key=None,
+                 legacy_path=None, layout=1, **log_kwargs):
+        """
+        partition_keys(list[dict]) -> list[str]: partición de cada registro (en bloque).
+        normalize(dict) -> dict | None: igual que en RecordStore.
+        layout: versión de partition_keys (subirla reubica los registros existentes).
+        """
+        self.dir = Path(dir_path)
+        self.manifest_path = self.dir / "manifest.json"
+        self.partition_keys = partition_keys
+        self.normalize = normalize
+        self.cache_key = cache_key or str(dir_path)
+        self.legacy_path = Path(legacy_path) if legacy_path else None
+        self.layout = layout
+        self.log_kwargs = log_kwargs
+        self._lock = FileLock(self.dir / ".lock")
+        self._manifest = None
+        self._manifest_sig = None
+        self._logs = {}
+
+    # ---------- manifest / particiones ----------
+    def _ensure(self):
+        """Manifest vigente en disco (otro proceso pudo cambiarlo). Con el lock tomado."""
+        sig = store_loader.file_signature(self.manifest_path)
+        if self._manifest is not None and sig is not None and sig == self._manifest_sig:
+            return self._manifest
+        self.dir.mkdir(parents=True, exist_ok=True)
+        try:
+            manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except Exception:
+            manifest = None
+        if manifest is None:
+            found = self._partition_files()
+            self._manifest = {"partitions": found, "next_id": 1, "layout": self.layout}
+            if found:
+                # manifest perdido: next_id se recalcula desde los ids guardados (_load_state)
+                logger.warning("Manifest de %s reconstruido desde %d particiones", self.dir, len(found))
+            else:
+                self._migrate_legacy()
+            self._write_manifest()
+        else:
+            self._manifest = {"partitions": sorted(manifest.get("partitions") or []),
+                              "next_id": int(manifest.get("next_id") or 1),
+                              "layout": manifest.get("layout", 1)}
+            if manifest.get("migrated"):
+                self._manifest["migrated"] = manifest["migrated"]
+            self._manifest_sig = sig
+        # particiones borradas por otro proceso
+        for part in [p for p in self._logs if p not in self._manifest["partitions"]]:
+            del self._logs[part]
+            store_loader.invalidate(self._part_key(part))
+        if self._manifest["layout"] != self.layout:
+            self._repartition()
+            self._manifest["layout"] = self.layout
+            self._write_manifest()
+        return self._manifest
+
+    def _partition_files(self):
+        return sorted(p.stem for p in self.dir.glob("*.json") if p != self.manifest_path)
+
+    def _write_manifest(self):
+        tmp = self.manifest_path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(self._manifest, f)
+        os.replace(tmp, self.manifest_path)
+        self._manifest_sig = store_loader.file_signature(self.manifest_path)
+
+    def _migrate_legacy(self):
+        if self.legacy_path is None or not self.legacy_path.exists():
+            return
+        if self.legacy_path.with_name(self.legacy_path.stem + ".segments").exists():
+            legacy = SegmentLog(self.legacy_path, background=False)
+            raw_rows, legacy_next = legacy.read(), legacy.get_meta("next_id", 1)
+        else:
+            # JSON plano: se lee sin crear archivos junto a él
+            raw_rows, legacy_next = parse_json_list(self.legacy_path.read_text(encoding="utf-8")), 1
+        rows, seen, pending = [], set(), []
+        max_id = 0
+        for raw in raw_rows:
+            rec = self._clean(raw)
+            if rec is None:
+                continue
+            rid = raw.get("id")
+            if _valid_id(rid) and rid not in seen:
+                seen.add(rid)
+                max_id = max(max_id, rid)
+                rows.append({"id": rid, **rec})
+            else:
+                pending.append((len(rows) + len(pending), rec))
+        next_id = max(max_id + 1, int(legacy_next or 1))
+        for pos, rec in pending:
+            rows.insert(pos, {"id": next_id, **rec})
+            next_id += 1
+        for part, recs in self._group(rows).items():
+            self._log(part, create=True).rewrite(recs)
+        self._manifest["next_id"] = next_id
+        # el archivo anterior queda en su lugar; desde ahora el origen es el manifest
+        self._manifest["migrated"] = {"from": self.legacy_path.name, "rows": len(rows)}
+        self._write_manifest()
+        logger.info("Migradas %d filas de %s a %s", len(rows), self.legacy_path, self.dir)
+
+    def _repartition(self):
+        """Mueve a su partición los registros que partition_keys ubica en otra."""
+        groups, changed = {}, set()
+        for part in list(self._manifest["partitions"]):
+            st = self._load_part(self._log(part))
+            recs = list(st["rows"].values()) + st["pending"]
+            for new, rec in zip(self.partition_keys(recs), recs):
+                groups.setdefault(new, []).append(rec)
+                if new != part:
+                    changed.update((part, new))
+        for part in sorted(changed):
+            recs = groups.get(part)
+            if recs:
+                recs.sort(key=lambda r: r.get("id", float("inf")))
+                self._log(part, create=True).rewrite(recs)
+            else:
+                self._manifest["partitions"].remove(part)
+                self._drop_files(part)
+        if changed:
+            logger.info("Reparticionado %s: %s", self.dir, ", ".join(sorted(changed)))
+
+    def _log(self, part, create=False):
+        log = self._logs.get(part)
+        if log is None:
+            if not create and part not in self._ensure()["partitions"]:
+                return None
+            log = self._logs[part] = SegmentLog(self.dir / f"{part}.json", lock=self._lock, **self.log_kwargs)
+            if part not in self._manifest["partitions"]:
+                self._manifest["partitions"].append(part)
+                self._manifest["partitions"].sort()
+        return log
+
+    def _group(self, recs):
+        groups = {}
+        for part, rec in zip(self.partition_keys(recs), recs):
+            groups.setdefault(part, []).append(rec)
+        return groups
+
+    def _drop_files(self, part):
+        # por ruta: la partición pudo crearla otro proceso (sin SegmentLog en este)
+        self._logs.pop(part, None)
+        base = self.dir / f"{part}.json"
+        try:
+            base.unlink()
+        except FileNotFoundError:
+            pass
+        shutil.rmtree(base.with_name(base.stem + ".segments"), ignore_errors=True)
+        store_loader.invalidate(self._part_key(part))
+
+    def partitions(self):
+        with self._lock:
+            return list(self._ensure()["partitions"])
+
+    def signature(self):
+        with self._lock:
+            parts = self._ensure()["partitions"]
+            return (store_loader.file_signature(self.manifest_path),
+                    tuple((part, self._log(part).signature()) for part in parts))
+
+    def partition_signature(self, parts):
+        """Firma de solo las particiones pedidas (None las que no existen)."""
+        with self._lock:
+            self._ensure()
+            return tuple((part, log.signature() if log is not None else None)
+                         for part, log in ((p, self._log(p)) for p in sorted(set(parts))))
+
+    # ---------- estado por partición ----------
+    def _clean(self, raw):
+        if not isinstance(raw, dict):
+            return None
+        body = {k: v for k, v in raw.items() if k != "id"}
+        return self.normalize(body) if self.normalize else body
+
+    def _part_key(self, part):
+        return f"{self.cache_key}:part:{part}"
+
+    def _load_part(self, log):
+        rows, pending = {}, []
+        try:
+            raw_rows = log.read()
+        except FileNotFoundError:
+            # partición borrada mientras se leía
+            raw_rows = []
+        for raw in raw_rows:
+            rec = self._clean(raw)
+            if rec is None:
+                continue
+            rid = raw.get("id")
+            if _valid_id(rid) and rid not in rows:
+                rows[rid] = {"id": rid, **rec}
+            else:
+                pending.append(rec)
+        return {"rows": rows, "pending": pending}
+
+    def _part(self, part):
+        """{"rows": {id: registro}, "pending": [registros sin id]} de una partición (cacheado)."""
+        with self._lock:
+            log = self._log(part)
+            if log is None:
+                return {"rows": {}, "pending": []}
+            sig = log.signature()
+        return store_loader.load(self._part_key(part), sig, lambda: self._load_part(log))
+
+    def _update_part(self, part, before, fn):
+        log = self._logs.get(part)
+        if log is not None:
+            store_loader.update(self._part_key(part), before, log.signature(), fn)
+
+    # ---------- estado global ----------
+    def _load_state(self):
+        """id -> partición y siguiente id; asigna ids a registros que no traen (editados a mano)."""
+        where, max_id, fix = {}, 0, []
+        for part in self.partitions():
+            st = self._part(part)
+            where.update(dict.fromkeys(st["rows"], part))
+            if st["rows"]:
+                max_id = max(max_id, max(st["rows"]))
+            if st["pending"]:
+                fix.append(part)
+        with self._lock:
+            manifest = self._ensure()
+            next_id = max(max_id + 1, manifest["next_id"])
+            for part in fix:
+                st = self._part(part)
+                recs = list(st["rows"].values())
+                for rec in st["pending"]:
+                    recs.append({"id": next_id, **rec})
+                    where[next_id] = part
+                    next_id += 1
+                log = self._log(part)
+                log.rewrite(recs)
+                store_loader.prime(self._part_key(part), log.signature(),
+                                   {"rows": {r["id"]: r for r in recs}, "pending": []})
+            if fix:
+                manifest["next_id"] = next_id
+                self._write_manifest()
+        return {"where": where, "next_id": next_id}
+
+    def _state(self):
+        return store_loader.load(self.cache_key + ":state", self.signature(), self._load_state)
+
+    def _apply(self, before, fn):
+        store_loader.update(self.cache_key + ":state", before, self.signature(), fn)
+
+    def _next_id(self, state):
+        # con el lock tomado: el manifest puede ir por delante de un estado cacheado
+        return max(state["next_id"], self._ensure()["next_id"])
+
+    # ---------- lectura ----------
+    def _materialize(self):
+        recs = []
+        for part in self.partitions():
+            st = self._part(part)
+            with self._lock:
+                recs.extend(st["rows"].values())
+        recs.sort(key=itemgetter("id"))
+        return recs
+
+    def read_shared(self):
+        """Todos los registros en orden de id (compartida, solo lectura)."""
+        return store_loader.load(self.cache_key, self.signature(), self._materialize)
+
+    def read(self):
+        return list(self.read_shared())
+
+    def read_partitions(self, parts):
+        """Registros de las particiones pedidas (solo se leen esas), en orden de id."""
+        recs = []
+        existing = set(self.partitions())
+        for part in sorted(set(parts) & existing):
+            st = self._part(part)
+            with self._lock:
+                recs.extend(st["rows"].values())
+        recs.sort(key=itemgetter("id"))
+        return recs
+
+    def get(self, rid):
+        part = self._state()["where"].get(rid)
+        if part is None:
+            return None
+        return self._part(part)["rows"].get(rid)
+
+    def count(self):
+        return len(self._state()["where"])
+
+    # ---------- escritura ----------
+    def _append_to(self, part, recs):
+        """Agrega registros (ya con id) a una partición, creándola si no existe."""
+        is_new = part not in self._ensure()["partitions"]
+        log = self._log(part, create=True)
+        if is_new:
+            self._write_manifest()
+        before = log.signature()
+        log.append(recs)
+        if is_new:
+            store_loader.prime(self._part_key(part), log.signature(),
+                               {"rows": {r["id"]: r for r in recs}, "pending": []})
+            return
+
+        def _fn(st):
+            st["rows"].update((r["id"], r) for r in recs)
+            return st
+        self._update_part(part, before, _fn)
+
+    def _remove_from(self, part, rid):
+        log = self._log(part)
+        before = log.signature()
+        log.append([{"_op": "del", "id": rid}])
+
+        def _fn(st):
+            st["rows"].pop(rid, None)
+            return st
+        self._update_part(part, before, _fn)
+
+    def append(self, rows, clean=True):
+        """
+        Inserta registros nuevos (se ignora cualquier "id" entrante). Devuelve los guardados.
+        clean=False: las filas ya vienen normalizadas y no se pasan por normalize.
+        """
+        with self._lock:
+            state = self._state()
+            before = self.signature()
+            added = []
+            next_id = self._next_id(state)
+            for raw in rows:
+                rec = self._clean(raw) if clean else raw
+                if rec is None:
+                    continue
+                added.append({"id": next_id, **rec})
+                next_id += 1
+            if not added:
+                return []
+            groups = self._group(added)
+            # los ids quedan reservados en el manifest antes de escribir las filas
+            self._manifest["next_id"] = next_id
+            self._write_manifest()
+            for part, recs in groups.items():
+                self._append_to(part, recs)
+
+            def _fn(st):
+                for part, recs in groups.items():
+                    st["where"].update((r["id"], part) for r in recs)
+                st["next_id"] = next_id
+                return st
+            self._apply(before, _fn)
+            return added
+
+    def update(self, rid, row):
+        """Reemplaza el registro rid. Devuelve el registro guardado o None si no existe."""
+        with self._lock:
+            state = self._state()
+            old_part = state["where"].get(rid)
+            if old_part is None:
+                return None
+            rec = self._clean(row)
+            if rec is None:
+                return None
+            rec = {"id": rid, **rec}
+            new_part = self.partition_keys([rec])[0]
+            before = self.signature()
+            if new_part == old_part:
+                log = self._log(old_part)
+                pbefore = log.signature()
+                log.append([{"_op": "upd", "id": rid, "row": rec}])
+
+                def _fn_part(st):
+                    st["rows"][rid] = rec
+                    return st
+                self._update_part(old_part, pbefore, _fn_part)
+            else:
+                self._remove_from(old_part, rid)
+                self._append_to(new_part, [rec])
+
+            def _fn(st):
+                st["where"][rid] = new_part
+                return st
+            self._apply(before, _fn)
+            return rec
+
+    def delete(self, rid):
+        with self._lock:
+            state = self._state()
+            part = state["where"].get(rid)
+            if part is None:
+                return False
+            before = self.signature()
+            self._remove_from(part, rid)
+            # el id no se reutiliza aunque fuera el último asignado
+            self._manifest["next_id"] = self._next_id(state)
+            self._write_manifest()
+
+            def _fn(st):
+                st["where"].pop(rid, None)
+                return st
+            self._apply(before, _fn)
+            return True
+
+    def drop_partitions(self, parts):
+        """Elimina particiones completas (borra sus archivos). Devuelve los registros eliminados."""
+        with self._lock:
+            state = self._state()
+            manifest = self._ensure()
+            parts = [p for p in dict.fromkeys(parts) if p in manifest["partitions"]]
+            if not parts:
+                return []
+            before = self.signature()
+            removed = []
+            for part in parts:
+                removed.extend(self._part(part)["rows"].values())
+            manifest["partitions"] = [p for p in manifest["partitions"] if p not in parts]
+            manifest["next_id"] = self._next_id(state)
+            self._write_manifest()
+            for part in parts:
+                self._drop_files(part)
+
+            def _fn(st):
+                for rec in removed:
+                    st["where"].pop(rec["id"], None)
+                return st
+            self._apply(before, _fn)
+            return removed
+
+    def filter_partition(self, part, keep):
+        """
+        Deja en la partición solo los registros con keep(registro) verdadero
+        (reescribe esa partición; si no queda ninguno la elimina). Devuelve los eliminados.
+        """
+        with self._lock:
+            state = self._state()
+            if part not in self._ensure()["partitions"]:
+                return []
+            recs = list(self._part(part)["rows"].values())
+            kept = [r for r in recs if keep(r)]
+            if len(kept) == len(recs):
+                return []
+            if not kept:
+                return self.drop_partitions([part])
+            removed = [r for r in recs if not keep(r)]
+            before = self.signature()
+            log = self._log(part)
+            log.rewrite(kept)
+            self._manifest["next_id"] = self._next_id(state)
+            self._write_manifest()
+            store_loader.prime(self._part_key(part), log.signature(),
+                               {"rows": {r["id"]: r for r in kept}, "pending": []})
+
+            def _fn(st):
+                for rec in removed:
+                    st["where"].pop(rec["id"], None)
+                return st
+            self._apply(before, _fn)
+            return removed
+
+    def rewrite(self, rows):
+        """
+        Reemplaza todo el contenido (borrado masivo).
+        Conserva los ids existentes; asigna nuevos a los registros que no traen.
+        """
+        with self._lock:
+            state = self._state()
+            next_id = self._next_id(state)
+            by_id = {}
+            for raw in rows:
+                rec = self._clean(raw)
+                if rec is None:
+                    continue
+                rid = raw.get("id")
+                if not _valid_id(rid) or rid in by_id:
+                    rid = next_id
+                    next_id += 1
+                by_id[rid] = {"id": rid, **rec}
+            groups = self._group(list(by_id.values()))
+            manifest = self._ensure()
+            for part in [p for p in manifest["partitions"] if p not in groups]:
+                manifest["partitions"].remove(part)
+                self._drop_files(part)
+            for part, recs in groups.items():
+                log = self._log(part, create=True)
+                log.rewrite(recs)
+                store_loader.prime(self._part_key(part), log.signature(),
+                                   {"rows": {r["id"]: r for r in recs}, "pending": []})
+            manifest["next_id"] = next_id
+            self._write_manifest()
+            where = {rid: part for part, recs in groups.items() for rid in (r["id"] for r in recs)}
+            store_loader.prime(self.cache_key + ":state", self.signature(),
+                               {"where": where, "next_id": next_id})
@@ -0,0 +1,191 @@
+"""
+record_store.py
+Store de registros con id estable sobre un SegmentLog (ventas, inventario,
+tránsitos, metas).
+
+- Cada registro lleva "id": entero compacto asignado en orden de inserción.
+  Los ids no se reutilizan (el siguiente id se guarda en el manifest del log) y se
+  asignan bajo el lock del log (FileLock): con varios procesos, cada escritura parte
+  del estado en disco, así dos workers no entregan el mismo id.
+- En memoria se mantiene un dict id -> registro (ordenado = orden de inserción),
+  cacheado en store_loader con la firma del log (tomada de los archivos en disco:
+  lo que escribe otro proceso se ve en la siguiente lectura).
+- update/delete por id: búsqueda O(1) + una línea de op en la cola del log;
+  la caché se actualiza en sitio en lugar de releer el archivo.
+
+Los registros devueltos son compartidos con la caché: no modificarlos.
+"""
+
+from conexiones import store_loader
+from conexiones.segment_log import SegmentLog
+
+
+def _valid_id(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+class RecordStore:
+    def __init__(self, base_path, normalize=None, cache_key=None, **log_kwargs):
+        """
+        normalize(dict) -> dict | None: limpia un registro entrante (sin "id");
+        None descarta el registro.
+        """
+        self.log = SegmentLog(base_path, **log_kwargs)
+        self.normalize = normalize
+        self.cache_key = cache_key or str(base_path)
+        self._lock = self.log.lock
+
+    # ---------- estado ----------
+    def signature(self):
+        return self.log.signature()
+
+    def _clean(self, raw):
+        if not isinstance(raw, dict):
+            return None
+        body = {k: v for k, v in raw.items() if k != "id"}
+        return self.normalize(body) if self.normalize else body
+
+    def _load_state(self):
+        by_id = {}
+        pending = []   # registros sin id válido (datos antiguos / editados a mano)
+        max_id = 0
+        for raw in self.log.read():
+            rec = self._clean(raw)
+            if rec is None:
+                continue
+            rid = raw.get("id")
+            if _valid_id(rid) and rid not in by_id:
+                by_id[rid] = {"id": rid, **rec}
+                max_id = max(max_id, rid)
+            else:
+                pending.append((len(by_id) + len(pending), rec))
+        next_id = max(max_id + 1, int(self.log.get_meta("next_id", 1) or 1))
+        if pending:
+            # asignar ids conservando el orden original y persistirlos una vez
+            ordered = list(by_id.values())
+            for pos, rec in pending:
+                ordered.insert(pos, {"id": next_id, **rec})
+                next_id += 1
+            by_id = {r["id"]: r for r in ordered}
+            with self._lock:
+                self.log.rewrite(ordered)
+                self.log.set_meta("next_id", next_id)
+        return {"by_id": by_id, "next_id": next_id}
+
+    def _state(self):
+        return store_loader.load(self.cache_key + ":state", self.signature(), self._load_state)
+
+    def _next_id(self, state):
+        # con el lock tomado: el manifest puede ir por delante de un estado cacheado
+        return max(state["next_id"], int(self.log.get_meta("next_id", 1) or 1))
+
+    def _materialize(self):
+        state = self._state()
+        with self._lock:
+            return list(state["by_id"].values())
+
+    def _apply(self, before, fn):
+        """Actualiza la caché en sitio si sigue en la versión 'before'; si no, se descarta."""
+        after = self.signature()
+        store_loader.update(self.cache_key + ":state", before, after, fn)
+
+    # ---------- lectura ----------
+    def read_shared(self):
+        """Lista de registros en orden de inserción (compartida, solo lectura)."""
+        return store_loader.load(self.cache_key, self.signature(), self._materialize)
+
+    def read(self):
+        return list(self.read_shared())
+
+    def get(self, rid):
+        return self._state()["by_id"].get(rid)
+
+    def count(self):
+        return len(self._state()["by_id"])
+
+    # ---------- escritura ----------
+    def append(self, rows, clean=True):
+        """
+        Inserta registros nuevos (se ignora cualquier "id" entrante). Devuelve los guardados.
+        clean=False: las filas ya vienen normalizadas y no se pasan por normalize.
+        """
+        with self._lock:
+            state = self._state()
+            before = self.signature()
+            added = []
+            next_id = self._next_id(state)
+            for raw in rows:
+                rec = self._clean(raw) if clean else raw
+                if rec is None:
+                    continue
+                added.append({"id": next_id, **rec})
+                next_id += 1
+            if not added:
+                return []
+            self.log.append(added)
+            self.log.set_meta("next_id", next_id)
+
+            def _fn(st):
+                st["by_id"].update((r["id"], r) for r in added)
+                st["next_id"] = next_id
+                return st
+            self._apply(before, _fn)
+            return added
+
+    def update(self, rid, row):
+        """Reemplaza el registro rid. Devuelve el registro guardado o None si no existe."""
+        with self._lock:
+            state = self._state()
+            if rid not in state["by_id"]:
+                return None
+            rec = self._clean(row)
+            if rec is None:
+                return None
+            rec = {"id": rid, **rec}
+            before = self.signature()
+            self.log.append([{"_op": "upd", "id": rid, "row": rec}])
+
+            def _fn(st):
+                st["by_id"][rid] = rec
+                return st
+            self._apply(before, _fn)
+            return rec
+
+    def delete(self, rid):
+        with self._lock:
+            state = self._state()
+            if rid not in state["by_id"]:
+                return False
+            before = self.signature()
+            # el id no se reutiliza aunque fuera el último asignado
+            self.log.set_meta("next_id", self._next_id(state))
+            self.log.append([{"_op": "del", "id": rid}])
+
+            def _fn(st):
+                st["by_id"].pop(rid, None)
+                return st
+            self._apply(before, _fn)
+            return True
+
+    def rewrite(self, rows):
+        """
+        Reemplaza todo el contenido (borrado masivo / filtrado).
+        Conserva los ids existentes; asigna nuevos a los registros que no traen.
+        """
+        with self._lock:
+            state = self._state()
+            next_id = self._next_id(state)
+            by_id = {}
+            for raw in rows:
+                rec = self._clean(raw)
+                if rec is None:
+                    continue
+                rid = raw.get("id")
+                if not _valid_id(rid) or rid in by_id:
+                    rid = next_id
+                    next_id += 1
+                by_id[rid] = {"id": rid, **rec}
+            self.log.rewrite(list(by_id.values()))
+            self.log.set_meta("next_id", next_id)
+            store_loader.prime(self.cache_key + ":state", self.signature(),
+                               {"by_id": by_id, "next_id": next_id})
@@ -0,0 +1,97 @@
+"""
+result_cache.py
+Caché LRU de resultados calculados (p. ej. la lista completa de forecast por
+versión de datos + filtros), acotada por número de entradas y por memoria.
+
+La clave debe incluir la versión de los datos de entrada (firmas de los
+stores): cuando un archivo cambia, la clave nueva no coincide y las entradas
+viejas salen solas por LRU. El tamaño de cada entrada es una estimación
+(muestra de elementos con sys.getsizeof), suficiente para respetar el tope.
+
+Los valores devueltos son compartidos: no modificarlos.
+"""
+
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+SAMPLE_SIZE = 32   # elementos medidos para estimar el tamaño de una lista
+
+
+def _deep_size(obj):
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(sys.getsizeof(v) for v in obj)
+    return size
+
+
+def estimate_size(value):
+    """Bytes aproximados de una lista de dicts (o de un objeto simple)."""
+    if isinstance(value, (list, tuple)) and value:
+        step = max(1, len(value) // SAMPLE_SIZE)
+        sample = value[::step][:SAMPLE_SIZE]
+        per_item = sum(_deep_size(v) for v in sample) / len(sample)
+        return int(sys.getsizeof(value) + per_item * len(value))
+    return _deep_size(value)
+
+
+class ResultCache:
+    def __init__(self, max_entries=32, max_bytes=256 * 1024 * 1024, size_fn=estimate_size):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_fn = size_fn
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (value, bytes)
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "last_compute_ms": None}
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value):
+        size = self.size_fn(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if size > self.max_bytes:
+                # más grande que todo el tope: no se guarda
+                return value
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self._stats["evictions"] += 1
+        return value
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[0]
+            self._stats["misses"] += 1
+        t0 = time.perf_counter()
+        value = compute()
+        with self._lock:
+            self._stats["last_compute_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        return self.put(key, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries), "bytes": self._bytes}
@@ -0,0 +1,350 @@
+"""
+segment_log.py
+Almacén append-only para los JSON de data_ops:
+- snapshot base (JSON lista, mismo formato que antes)
+- cola de segmentos NDJSON (una fila por línea) en <nombre>.segments/
+- compactación periódica (en segundo plano) que funde la cola en la base
+
+Insertar cuesta O(filas nuevas); leer devuelve base + cola en orden.
+
+La cola también admite operaciones sobre registros con "id" (ver record_store.py):
+    {"_op": "upd", "id": 7, "row": {...}}   reemplaza el registro 7 en su posición
+    {"_op": "del", "id": 7}                 lo elimina
+Se aplican al leer y la compactación las deja materializadas en la base.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import logging
+from pathlib import Path
+
+from conexiones.file_lock import FileLock
+from conexiones.store_loader import file_signature, parse_json_list
+
+SEGMENT_MAX_ROWS = 50_000      # filas por segmento antes de rotar
+COMPACT_MIN_ROWS = 200_000     # filas en cola que disparan la compactación
+COMPACT_MAX_SEGMENTS = 16      # o demasiados segmentos abiertos
+
+logger = logging.getLogger(__name__)
+
+
+def _count_lines(path: Path):
+    n = 0
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            n += chunk.count(b"\n")
+    return n
+
+
+def _file_sig(path: Path):
+    try:
+        st = path.stat()
+        return [st.st_size, st.st_mtime_ns]
+    except FileNotFoundError:
+        return None
+
+
+def _parse_ndjson(text):
+    res = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            res.append(json.loads(line))
+        except Exception:
+            continue
+    return res
+
+
+def _apply_tail(rows, tail):
+    """Añade las filas de la cola a rows aplicando las ops upd/del por id."""
+    pos = None  # id -> posición, solo se construye si aparece alguna op
+    deleted = False
+    for r in tail:
+        op = r.get("_op") if isinstance(r, dict) else None
+        if op is None:
+            rows.append(r)
+            if pos is not None and isinstance(r, dict) and r.get("id") is not None:
+                pos[r["id"]] = len(rows) - 1
+            continue
+        if pos is None:
+            pos = {row["id"]: i for i, row in enumerate(rows)
+                   if isinstance(row, dict) and row.get("id") is not None}
+        i = pos.get(r.get("id"))
+        if i is None:
+            continue
+        if op == "upd" and isinstance(r.get("row"), dict):
+            rows[i] = r["row"]
+        elif op == "del":
+            rows[i] = None
+            pos.pop(r.get("id"), None)
+            deleted = True
+    if deleted:
+        rows[:] = [r for r in rows if r is not None]
+    return rows
+
+
+def _atomic_write_json(path: Path, rows):
+    tmp_fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+    try:
+        with os.fdopen(tmp_fd, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except Exception:
+                pass
+
+
+class SegmentLog:
+    """
+    Log de segmentos sobre un archivo JSON base.
+    Los lectores copian el texto bajo el lock y parsean fuera de él,
+    así un import grande no bloquea a los demás lectores.
+
+    Con varios procesos sobre los mismos archivos (gunicorn con más de un worker):
+    el estado (segmentos y sus filas, meta del manifest) se vuelve a tomar del disco
+    en cada operación, y lecturas, escrituras y compactación se serializan con un
+    FileLock (<nombre>.segments/.lock, o el que se pase en lock=).
+    """
+
+    def __init__(self, base_path, segment_max_rows=SEGMENT_MAX_ROWS,
+                 compact_min_rows=COMPACT_MIN_ROWS, compact_max_segments=COMPACT_MAX_SEGMENTS,
+                 background=True, lock=None):
+        self.base_path = Path(base_path)
+        self.dir = self.base_path.with_name(self.base_path.stem + ".segments")
+        self.manifest_path = self.dir / "manifest.json"
+        self.segment_max_rows = segment_max_rows
+        self.compact_min_rows = compact_min_rows
+        self.compact_max_segments = compact_max_segments
+        self.background = background
+        self.lock = lock or FileLock(self.dir / ".lock")
+        self._state = None
+        self._counts = {}          # segmento -> (bytes, filas): solo se recuentan los que crecieron
+        self._compacting = False
+
+    # ---------- estado ----------
+    def _ensure(self):
+        """Estado según los archivos en disco (otro proceso pudo escribir). Con el lock tomado."""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        if self._state is None:
+            self._state = {"manifest_sig": None, "meta": {}, "generation": 0,
+                           "saved_rows": None, "saved_sig": None}
+        state = self._state
+        if not self.base_path.exists():
+            _atomic_write_json(self.base_path, [])
+        sig = file_signature(self.manifest_path)
+        if sig is None or sig != state["manifest_sig"]:
+            try:
+                manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+            except Exception:
+                manifest = {}
+            state.update(manifest_sig=sig, meta=manifest.get("meta") or {},
+                         generation=manifest.get("generation", 0),
+                         saved_rows=manifest.get("base_rows"), saved_sig=manifest.get("base_sig"))
+        # si la base fue modificada por fuera, el conteo guardado ya no sirve
+        state["base_rows"] = state["saved_rows"] if state["saved_sig"] == _file_sig(self.base_path) else None
+        segments, counts = [], {}
+        for path in sorted(self.dir.glob("*.ndjson")):
+            try:
+                size = path.stat().st_size
+            except FileNotFoundError:
+                continue
+            known = self._counts.get(path.name)
+            rows = known[1] if known is not None and known[0] == size else _count_lines(path)
+            counts[path.name] = (size, rows)
+            segments.append([path.name, rows])
+        self._counts = counts
+        state["segments"] = segments
+        return state
+
+    def _write_manifest(self):
+        state = self._state
+        payload = {"base_rows": state["base_rows"], "base_sig": _file_sig(self.base_path),
+                   "meta": state["meta"], "generation": state["generation"]}
+        tmp = self.manifest_path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.replace(tmp, self.manifest_path)
+        state.update(manifest_sig=file_signature(self.manifest_path), saved_rows=payload["base_rows"],
+                     saved_sig=payload["base_sig"])
+
+    def _new_segment(self):
+        segments = self._state["segments"]
+        number = int(segments[-1][0].split(".")[0]) + 1 if segments else 1
+        name = f"{number:08d}.ndjson"
+        (self.dir / name).touch()
+        segments.append([name, 0])
+        self._counts[name] = (0, 0)
+        return segments[-1]
+
+    def get_meta(self, key, default=None):
+        """Valores pequeños persistidos en el manifest (sobreviven a rewrite/compactación)."""
+        with self.lock:
+            return self._ensure()["meta"].get(key, default)
+
+    def set_meta(self, key, value):
+        with self.lock:
+            self._ensure()["meta"][key] = value
+            self._write_manifest()
+
+    def tail_rows(self):
+        with self.lock:
+            return sum(n for _, n in self._ensure()["segments"])
+
+    def signature(self):
+        """Firma barata (stat de la base + nombre y tamaño de los segmentos en disco) que cambia con cada escritura."""
+        with self.lock:
+            self._ensure()
+            return (file_signature(self.base_path),
+                    tuple((name, self._counts[name][0]) for name in self._counts))
+
+    # ---------- lectura ----------
+    def _snapshot(self):
+        """Copia el texto crudo bajo el lock (I/O rápida); el parseo se hace fuera."""
+        with self.lock:
+            state = self._ensure()
+            base_sig = _file_sig(self.base_path)
+            base_text = self.base_path.read_text(encoding="utf-8")
+            seg_texts = []
+            for name, rows in state["segments"]:
+                if rows:
+                    seg_texts.append((self.dir / name).read_text(encoding="utf-8"))
+            return base_text, seg_texts, base_sig
+
+    def _parse_snapshot(self, base_text, seg_texts):
+        rows = parse_json_list(base_text)
+        base_rows = len(rows)
+        tail = []
+        for text in seg_texts:
+            tail.extend(_parse_ndjson(text))
+        return _apply_tail(rows, tail), base_rows
+
+    def read(self):
+        base_text, seg_texts, base_sig = self._snapshot()
+        rows, base_rows = self._parse_snapshot(base_text, seg_texts)
+        with self.lock:
+            state = self._ensure()
+            if state["base_rows"] is None and _file_sig(self.base_path) == base_sig:
+                state["base_rows"] = base_rows
+                self._write_manifest()
+        return rows
+
+    def count(self):
+        """Filas de base + líneas de cola (no descuenta ops upd/del; ver RecordStore.count)."""
+        with self.lock:
+            state = self._ensure()
+            base_rows = state["base_rows"]
+            tail = sum(n for _, n in state["segments"])
+        if base_rows is None:
+            return len(self.read())
+        return base_rows + tail
+
+    # ---------- escritura ----------
+    def append(self, rows):
+        """Añade filas al último segmento (uno nuevo si está lleno): O(filas nuevas)."""
+        rows = list(rows)
+        if not rows:
+            return 0
+        with self.lock:
+            state = self._ensure()
+            pending = rows
+            while pending:
+                seg = state["segments"][-1] if state["segments"] else None
+                if seg is None or seg[1] >= self.segment_max_rows:
+                    seg = self._new_segment()
+                room = self.segment_max_rows - seg[1]
+                chunk, pending = pending[:room], pending[room:]
+                payload = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in chunk)
+                path = self.dir / seg[0]
+                with path.open("a", encoding="utf-8") as f:
+                    f.write(payload)
+                seg[1] += len(chunk)
+                self._counts[seg[0]] = (path.stat().st_size, seg[1])
+            self._maybe_compact()
+        return len(rows)
+
+    def rewrite(self, rows):
+        """Reemplaza todo el contenido (base nueva, sin cola)."""
+        with self.lock:
+            state = self._ensure()
+            _atomic_write_json(self.base_path, rows)
+            for name, _ in state["segments"]:
+                try:
+                    (self.dir / name).unlink()
+                except FileNotFoundError:
+                    pass
+            state["segments"] = []
+            self._counts = {}
+            state["base_rows"] = len(rows)
+            # una compactación en curso (en cualquier proceso) se descarta
+            state["generation"] += 1
+            self._write_manifest()
+
+    # ---------- compactación ----------
+    def _maybe_compact(self):
+        state = self._state
+        tail = sum(n for _, n in state["segments"])
+        if self._compacting:
+            return
+        if tail < self.compact_min_rows and len(state["segments"]) <= self.compact_max_segments:
+            return
+        if self.background:
+            threading.Thread(target=self.compact, name="segment-compact", daemon=True).start()
+        else:
+            self.compact()
+
+    def compact(self):
+        """Funde base + segmentos sellados en una base nueva sin bloquear las inserciones."""
+        with self.lock:
+            if self._compacting:
+                return False
+            state = self._ensure()
+            if not state["segments"]:
+                return False
+            self._compacting = True
+            generation = state["generation"]
+            sealed_names = {name for name, _ in state["segments"]}
+            # las próximas inserciones (de cualquier proceso) van a un segmento nuevo
+            self._new_segment()
+            snapshot = self._snapshot()
+        tmp_path = None
+        try:
+            rows, _ = self._parse_snapshot(*snapshot[:2])
+            tmp_fd, tmp_path = tempfile.mkstemp(dir=str(self.base_path.parent), suffix=".tmp")
+            with os.fdopen(tmp_fd, "w", encoding="utf-8") as f:
+                json.dump(rows, f, ensure_ascii=False, indent=2)
+            with self.lock:
+                state = self._ensure()
+                if generation != state["generation"]:
+                    # hubo un rewrite u otra compactación mientras compactábamos: descartar
+                    return False
+                os.replace(tmp_path, self.base_path)
+                tmp_path = None
+                for name in sealed_names:
+                    try:
+                        (self.dir / name).unlink()
+                    except FileNotFoundError:
+                        pass
+                self._counts = {k: v for k, v in self._counts.items() if k not in sealed_names}
+                state["segments"] = [s for s in state["segments"] if s[0] not in sealed_names]
+                state["base_rows"] = len(rows)
+                state["generation"] += 1
+                self._write_manifest()
+            return True
+        except Exception:
+            logger.exception("Error compactando %s", self.base_path)
+            return False
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except Exception:
+                    pass
+            with self.lock:
+                self._compacting = False
@@ -0,0 +1,141 @@
+"""
+shard_pool.py
+Cálculo por shards en un pool de procesos con las columnas de entrada en memoria
+compartida.
+
+- SharedArrays(arrays): copia {nombre: ndarray} a bloques de
+  multiprocessing.shared_memory una sola vez; .spec es lo único que viaja a cada
+  tarea (nombre del bloque, dtype y forma), no los datos. Al salir del with se
+  liberan los bloques.
+- attached(spec): en el proceso hijo, las mismas columnas como ndarrays de solo
+  lectura sobre los bloques (sin copiar).
+- run(fn, tasks, workers): fn(task) en el pool persistente de `workers` procesos
+  (contexto spawn: seguro con los hilos del servidor y el mismo en Linux y Windows).
+  Cada proceso importa el módulo de fn y el __main__ del servidor: fn debe vivir en
+  un módulo sin efectos al importarse (p. ej. conexiones/forecast_columns.py) y el
+  arranque de la app está protegido en app.py.
+- merge_sorted(runs): k-way merge de claves int64 ya ordenadas por shard.
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+class SharedArrays:
+    def __init__(self, arrays):
+        self._blocks = []
+        self.spec = {}
+        try:
+            for name, values in arrays.items():
+                values = np.ascontiguousarray(values)
+                block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+                self._blocks.append(block)
+                np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[...] = values
+                self.spec[name] = (block.name, values.dtype.str, values.shape)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@contextmanager
+def attached(spec):
+    """{nombre: ndarray} sobre los bloques de SharedArrays.spec, válidos dentro del with."""
+    blocks = []
+    try:
+        arrays = {}
+        for name, (block_name, dtype, shape) in spec.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            blocks.append(block)
+            values = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            values.flags.writeable = False
+            arrays[name] = values
+        yield arrays
+    finally:
+        arrays = None
+        for block in blocks:
+            block.close()
+
+
+def _executor(workers):
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_workers = workers
+        return _pool
+
+
+def _discard(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def run(fn, tasks, workers):
+    """[fn(task) for task in tasks] en paralelo, en el orden de tasks."""
+    pool = _executor(workers)
+    try:
+        return list(pool.map(fn, tasks))
+    except BrokenProcessPool:
+        # un hijo murió (p. ej. sin memoria): el próximo uso arranca un pool nuevo
+        _discard(pool)
+        raise
+
+
+def _merge_two(a_keys, a_pos, b_keys, b_pos):
+    n = len(a_keys) + len(b_keys)
+    # cada clave de b va después de las de a que son <= y de las de b anteriores
+    at_b = np.searchsorted(a_keys, b_keys, side='right') + np.arange(len(b_keys))
+    from_b = np.zeros(n, dtype=bool)
+    from_b[at_b] = True
+    keys = np.empty(n, dtype=np.int64)
+    pos = np.empty(n, dtype=np.int64)
+    keys[from_b], pos[from_b] = b_keys, b_pos
+    keys[~from_b], pos[~from_b] = a_keys, a_pos
+    return keys, pos
+
+
+def merge_sorted(runs):
+    """
+    k-way merge de runs (arrays int64 ordenados): posiciones en la concatenación de
+    runs que dejan las claves ordenadas. Se mezclan de a pares (log k pasadas de
+    O(n) en numpy); con claves repetidas gana el run anterior, como un sort estable.
+    """
+    items, offset = [], 0
+    for keys in runs:
+        items.append((np.asarray(keys, dtype=np.int64), np.arange(offset, offset + len(keys), dtype=np.int64)))
+        offset += len(keys)
+    if not items:
+        return np.empty(0, dtype=np.int64)
+    while len(items) > 1:
+        merged = [_merge_two(*items[i], *items[i + 1]) for i in range(0, len(items) - 1, 2)]
+        if len(items) % 2:
+            merged.append(items[-1])
+        items = merged
+    return items[0][1]
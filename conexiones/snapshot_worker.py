@@ -0,0 +1,141 @@
+"""
+snapshot_worker.py
+Resultado precalculado en segundo plano con cambio en caliente.
+
+SnapshotWorker(name, version_fn, build_fn) mantiene un snapshot de solo lectura
+(build_fn()) de la versión actual de los datos (version_fn(), p. ej. las firmas
+de los stores de data_ops):
+- un hilo daemon consulta version_fn cada POLL_SECONDS; si cambió, reconstruye
+  fuera del request y reemplaza el snapshot de una sola asignación;
+- get() devuelve el snapshot vigente; si está desactualizado despierta al hilo
+  y devuelve el anterior mientras se reconstruye. Solo el primer uso (sin
+  snapshot previo) construye dentro del request;
+- status() informa edad, duración de la última construcción y si hay una en curso.
+Si una construcción falla se registra el error, se sigue sirviendo el snapshot
+anterior y el hilo no reintenta esa misma versión.
+"""
+
+import itertools
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = 5
+
+
+class Snapshot:
+    def __init__(self, version, value, built_at, build_seconds):
+        self.version = version
+        self.value = value
+        self.built_at = built_at
+        self.build_seconds = build_seconds
+
+
+class SnapshotWorker:
+    def __init__(self, name, version_fn, build_fn, poll_seconds=POLL_SECONDS):
+        self.name = name
+        self.version_fn = version_fn
+        self.build_fn = build_fn
+        self.poll_seconds = poll_seconds
+        self._current = None
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()      # una construcción a la vez
+        self._wakeup = threading.Condition(self._lock)
+        self._worker = None
+        self._seq = itertools.count(1)
+        self._building_since = None
+        self._builds = 0
+        self._last_error = None
+        self._last_error_at = None
+        self._failed_version = None
+
+    def current(self):
+        """Último snapshot construido (None si todavía no hay), sin construir ni esperar."""
+        return self._current
+
+    def get(self):
+        """Snapshot vigente, o el anterior si hay una reconstrucción pendiente."""
+        self._ensure_worker()
+        current = self._current
+        if current is None:
+            return self.refresh()
+        if current.version != self.version_fn():
+            with self._lock:
+                self._wakeup.notify()
+        return current
+
+    def refresh(self):
+        """Reconstruye si la versión cambió y devuelve el snapshot vigente."""
+        version = self.version_fn()
+        current = self._current
+        if current is not None and current.version == version:
+            return current
+        with self._build_lock:
+            current = self._current
+            if current is not None and current.version == version:
+                return current
+            self._building_since = time.time()
+            t0 = time.perf_counter()
+            try:
+                value = self.build_fn()
+            except Exception as e:
+                self._last_error = str(e)
+                self._last_error_at = time.time()
+                self._failed_version = version
+                raise
+            finally:
+                self._building_since = None
+            # la versión se toma antes de construir: si los datos cambian durante
+            # la construcción, la próxima consulta vuelve a construir
+            snapshot = Snapshot(version, value, time.time(), time.perf_counter() - t0)
+            self._current = snapshot
+            self._builds += 1
+            self._last_error = None
+            self._failed_version = None
+            return snapshot
+
+    def status(self):
+        self._ensure_worker()
+        now = time.time()
+        current = self._current
+        building_since = self._building_since
+        out = {
+            "name": self.name,
+            "ready": current is not None,
+            "stale": current is None or current.version != self.version_fn(),
+            "building": building_since is not None,
+            "building_seconds": round(now - building_since, 3) if building_since else None,
+            "builds": self._builds,
+            "poll_seconds": self.poll_seconds,
+            "age_seconds": round(now - current.built_at, 3) if current else None,
+            "build_seconds": round(current.build_seconds, 3) if current else None,
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(current.built_at)) if current else None,
+        }
+        if self._last_error is not None:
+            out["last_error"] = self._last_error
+            out["last_error_at"] = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self._last_error_at))
+        return out
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(
+                target=self._run, name=f"{self.name}-snapshot-{next(self._seq)}", daemon=True
+            )
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            try:
+                # una versión que ya falló no se reintenta hasta que los datos cambien
+                if self.version_fn() != self._failed_version:
+                    self.refresh()
+            except Exception:
+                logger.exception("Error construyendo snapshot %s", self.name)
+            with self._lock:
+                self._wakeup.wait(timeout=self.poll_seconds)
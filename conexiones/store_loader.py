@@ -0,0 +1,147 @@
+"""
+store_loader.py
+Caché de proceso para los JSON de data_ops.
+Guarda el contenido ya parseado (y normalizado) por clave, junto con la firma
+del archivo (mtime/size/inode). Mientras la firma no cambie se devuelve el mismo
+objeto sin volver a leer ni parsear el archivo.
+
+Los objetos devueltos son compartidos: quien vaya a modificarlos debe copiarlos.
+"""
+
+import json
+import os
+import time
+import threading
+from pathlib import Path
+
+_lock = threading.Lock()
+_cache = {}   # key -> (signature, value)
+_stats = {}   # key -> {"hits", "misses", "last_load_ms"}
+
+
+def file_signature(path):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    except FileNotFoundError:
+        return None
+
+
+def parse_json_list(text):
+    """Lista JSON, objeto único o newline-delimited -> lista."""
+    text = (text or "").strip()
+    if not text:
+        return []
+    try:
+        data = json.loads(text)
+        if isinstance(data, dict):
+            return [data]
+        if isinstance(data, list):
+            return data
+        return []
+    except json.JSONDecodeError:
+        res = []
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                res.append(json.loads(line))
+            except Exception:
+                continue
+        return res
+
+
+def _key(key):
+    return str(key) if isinstance(key, Path) else key
+
+
+def _stat_entry(key):
+    st = _stats.get(key)
+    if st is None:
+        st = _stats[key] = {"hits": 0, "misses": 0, "last_load_ms": None}
+    return st
+
+
+def load(key, signature, loader):
+    """
+    Devuelve el valor cacheado para key si signature coincide; si no, llama loader().
+    La firma se toma antes de cargar: si el archivo cambia durante la carga,
+    la siguiente llamada verá otra firma y recargará.
+    """
+    key = _key(key)
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None and signature is not None and entry[0] == signature:
+            _stat_entry(key)["hits"] += 1
+            return entry[1]
+    t0 = time.perf_counter()
+    value = loader()
+    elapsed = (time.perf_counter() - t0) * 1000
+    with _lock:
+        st = _stat_entry(key)
+        st["misses"] += 1
+        st["last_load_ms"] = round(elapsed, 2)
+        if signature is not None:
+            _cache[key] = (signature, value)
+    return value
+
+
+def load_json(path, normalize=None, lock=None, key=None):
+    """
+    Lee un JSON de data_ops (lista / objeto / ndjson) a través de la caché.
+    normalize(list) -> list se aplica una sola vez por versión del archivo.
+    """
+    path = Path(path)
+    if key is None:
+        key = str(path) if normalize is None else f"{path}::{getattr(normalize, '__name__', 'norm')}"
+
+    def _loader():
+        if not path.exists():
+            return []
+        if lock is not None:
+            with lock:
+                text = path.read_text(encoding="utf-8")
+        else:
+            text = path.read_text(encoding="utf-8")
+        data = parse_json_list(text)
+        return normalize(data) if normalize else data
+
+    return load(key, file_signature(path), _loader)
+
+
+def prime(key, signature, value):
+    """Registra un valor recién escrito para no reparsearlo en la siguiente lectura."""
+    key = _key(key)
+    if signature is None:
+        return
+    with _lock:
+        _cache[key] = (signature, value)
+
+
+def update(key, old_signature, new_signature, fn):
+    """
+    Si la entrada cacheada sigue en old_signature, aplica fn(value) -> value
+    y la deja registrada con new_signature (actualización incremental tras un append).
+    """
+    key = _key(key)
+    with _lock:
+        entry = _cache.get(key)
+        if entry is None or entry[0] != old_signature or new_signature is None:
+            _cache.pop(key, None)
+            return False
+        _cache[key] = (new_signature, fn(entry[1]))
+        return True
+
+
+def invalidate(key=None):
+    with _lock:
+        if key is None:
+            _cache.clear()
+        else:
+            _cache.pop(_key(key), None)
+
+
+def stats():
+    with _lock:
+        return {k: dict(v) for k, v in _stats.items()}
@@ -0,0 +1,72 @@
+"""
+trigram_index.py
+Índice invertido de trigramas para búsquedas por subcadena sin distinguir
+mayúsculas (mismo resultado que `patron in texto.lower()`).
+
+- TrigramIndex(texts): un documento por texto (posición = id); cada trigrama
+  del texto en minúsculas apunta a la lista ordenada de documentos que lo tienen.
+- search(patron): intersecta las listas de los trigramas del patrón (empezando
+  por la más corta) y verifica la subcadena solo en esos candidatos. Patrones de
+  menos de tres caracteres no tienen trigramas: se resuelven recorriendo los textos.
+- search_any(patrones): unión de search() de cada patrón.
+
+Se construye cuando cambian los textos (ver forecast_engine.ProductMatcher y
+ops_productos); es de solo lectura.
+"""
+
+import numpy as np
+
+_EMPTY = np.empty(0, dtype=np.int32)
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    def __init__(self, texts):
+        self._texts = [str(t).lower() for t in texts]
+        postings = {}
+        for doc, text in enumerate(self._texts):
+            for gram in _trigrams(text):
+                postings.setdefault(gram, []).append(doc)
+        self._postings = {gram: np.asarray(docs, dtype=np.int32) for gram, docs in postings.items()}
+
+    def __len__(self):
+        return len(self._texts)
+
+    def search(self, pattern):
+        """Ids (ndarray ordenado) de los textos que contienen pattern."""
+        pattern = str(pattern).lower()
+        texts = self._texts
+        if len(pattern) < 3:
+            return np.asarray([d for d, text in enumerate(texts) if pattern in text], dtype=np.int32)
+        lists = [self._postings.get(gram) for gram in _trigrams(pattern)]
+        if any(docs is None for docs in lists):
+            return _EMPTY
+        lists.sort(key=len)
+        docs = lists[0]
+        for other in lists[1:]:
+            docs = np.intersect1d(docs, other, assume_unique=True)
+            if not len(docs):
+                return _EMPTY
+        if len(pattern) == 3:
+            return docs
+        return np.asarray([d for d in docs.tolist() if pattern in texts[d]], dtype=np.int32)
+
+    def search_any(self, patterns):
+        """Ids de los textos que contienen alguno de los patrones."""
+        found = [self.search(p) for p in patterns]
+        if not found:
+            return _EMPTY
+        return np.unique(np.concatenate(found)).astype(np.int32)
+
+    def search_all(self, patterns):
+        """Ids de los textos que contienen todos los patrones."""
+        docs = None
+        for p in patterns:
+            hits = self.search(p)
+            docs = hits if docs is None else np.intersect1d(docs, hits, assume_unique=True)
+            if not len(docs):
+                break
+        return np.arange(len(self._texts), dtype=np.int32) if docs is None else docs
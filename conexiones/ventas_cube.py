@@ -0,0 +1,241 @@
+"""
+ventas_cube.py
+Agregado mensual de ventas materializado (Centro × Material × Año × Mes),
+mantenido incrementalmente en cada escritura de ventas y persistido
+junto a las ventas (data_ops/ventas_claro.cube.json).
+
+Contenido:
+- monthly: (centro, material, año, mes) -> [suma Cantidad, líneas]
+- qty:     (centro, material) -> {cantidad: líneas}   (histograma para la mediana exacta)
+- months:  (año, mes) -> líneas
+
+El mes se obtiene con dates.month_of (mismas reglas que parse_date, igual que las
+particiones de ventas); fechas que no parsean no cuentan en monthly/months pero sí
+en qty (la mediana de forecast incluye todas las líneas). Si cambian esas reglas se
+sube CUBE_FORMAT y el cubo persistido se reconstruye.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import logging
+from pathlib import Path
+
+import pandas as pd
+
+from conexiones import keys
+from conexiones.dates import month_of
+
+logger = logging.getLogger(__name__)
+
+PANDAS_MIN_ROWS = 2000   # lotes más grandes se agregan con groupby en lugar de un bucle
+CUBE_FORMAT = 2          # 2: month_of con seriales de Excel
+
+
+def _num(v):
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return 0
+    if f != f or f in (float("inf"), float("-inf")):
+        return 0
+    return int(f) if f.is_integer() else f
+
+
+class VentasCube:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.signature = None
+        self.monthly = {}
+        self.qty = {}
+        self.months = {}
+        self._persist_lock = threading.Lock()
+        self._dirty = False
+        self._worker = None
+
+    # ---------- agregación ----------
+    def _aggregate(self, rows):
+        """Agregados parciales de un lote de ventas: (monthly, qty, months) con el mismo formato."""
+        monthly, qty, months = {}, {}, {}
+        if not rows:
+            return monthly, qty, months
+        yms = month_of([r.get("Fecha Venta") for r in rows])
+        if len(rows) < PANDAS_MIN_ROWS:
+            for r, ym in zip(rows, yms):
+                cc = r.get("Centro Costos") or ""
+                mat = r.get("Material") or ""
+                q = _num(r.get("Cantidad"))
+                if ym is not None:
+                    cell = monthly.setdefault((cc, mat) + ym, [0, 0])
+                    cell[0] += q
+                    cell[1] += 1
+                    months[ym] = months.get(ym, 0) + 1
+                hist = qty.setdefault((cc, mat), {})
+                hist[q] = hist.get(q, 0) + 1
+            return monthly, qty, months
+
+        df = pd.DataFrame({
+            "cc": [r.get("Centro Costos") or "" for r in rows],
+            "mat": [r.get("Material") or "" for r in rows],
+            "q": [float(_num(r.get("Cantidad"))) for r in rows],
+            "y": [ym[0] if ym else -1 for ym in yms],
+            "m": [ym[1] if ym else -1 for ym in yms],
+        })
+        for (cc, mat, q), n in df.groupby(["cc", "mat", "q"], sort=False).size().items():
+            qty.setdefault((cc, mat), {})[_num(q)] = int(n)
+        dated = df[df["y"] >= 0]
+        if not dated.empty:
+            g = dated.groupby(["cc", "mat", "y", "m"], sort=False)["q"].agg(["sum", "size"])
+            for (cc, mat, y, m), s, n in zip(g.index, g["sum"].tolist(), g["size"].tolist()):
+                monthly[(cc, mat, int(y), int(m))] = [_num(s), int(n)]
+            for (y, m), n in dated.groupby(["y", "m"], sort=False).size().items():
+                months[(int(y), int(m))] = int(n)
+        return monthly, qty, months
+
+    def _merge(self, parts, sign):
+        monthly, qty, months = parts
+        for key, (s, n) in monthly.items():
+            cell = self.monthly.get(key)
+            if cell is None:
+                cell = self.monthly[key] = [0, 0]
+            cell[0] = _num(cell[0] + sign * s)
+            cell[1] += sign * n
+            if cell[1] <= 0:
+                del self.monthly[key]
+        for key, hist in qty.items():
+            cur = self.qty.setdefault(key, {})
+            for q, n in hist.items():
+                c = cur.get(q, 0) + sign * n
+                if c > 0:
+                    cur[q] = c
+                else:
+                    cur.pop(q, None)
+            if not cur:
+                del self.qty[key]
+        for ym, n in months.items():
+            c = self.months.get(ym, 0) + sign * n
+            if c > 0:
+                self.months[ym] = c
+            else:
+                self.months.pop(ym, None)
+
+    def add(self, rows):
+        self._merge(self._aggregate(list(rows)), 1)
+
+    def remove(self, rows):
+        self._merge(self._aggregate(list(rows)), -1)
+
+    def rebuild(self, rows):
+        self.monthly, self.qty, self.months = {}, {}, {}
+        self._merge(self._aggregate(list(rows)), 1)
+
+    # ---------- vistas para lectores ----------
+    def view(self):
+        """
+        Copia inmutable para forecast / cruzar / meses (las estructuras internas se
+        modifican en sitio en cada escritura). Costo O(claves distintas).
+        Las claves salen canónicas (keys.centro / keys.material): un mismo par guardado
+        con formatos distintos ('7001234' y '7001234.0') se suma y su mediana sale de
+        los histogramas unidos.
+        """
+        monthly = {}
+        for (cc, mat, y, m), (s, _) in self.monthly.items():
+            key = (keys.centro(cc), keys.material(mat), y, m)
+            monthly[key] = _num(monthly[key] + s) if key in monthly else s
+        hists = {}
+        for (cc, mat), hist in self.qty.items():
+            key = (keys.centro(cc), keys.material(mat))
+            if key not in hists:
+                hists[key] = hist
+                continue
+            merged = hists[key] = dict(hists[key])
+            for q, n in hist.items():
+                merged[q] = merged.get(q, 0) + n
+        medians = {}
+        for key, hist in hists.items():
+            values = sorted(hist.items())
+            total = sum(n for _, n in values)
+            lo_idx, hi_idx = (total - 1) // 2, total // 2
+            lo = hi = None
+            seen = 0
+            for q, n in values:
+                if lo is None and seen + n > lo_idx:
+                    lo = q
+                if seen + n > hi_idx:
+                    hi = q
+                    break
+                seen += n
+            medians[key] = (lo + hi) / 2
+        return {
+            "monthly": monthly,
+            "median": medians,
+            "pairs": list(hists),
+            "months": sorted(self.months),
+        }
+
+    # ---------- persistencia ----------
+    def load(self, signature):
+        """Carga el cubo persistido si corresponde a signature. Devuelve True si sirvió."""
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception:
+            return False
+        if data.get("format") != CUBE_FORMAT or data.get("signature") != repr(signature):
+            return False
+        self.monthly = {(cc, mat, y, m): [s, n] for cc, mat, y, m, s, n in data.get("monthly", [])}
+        self.qty = {}
+        for cc, mat, q, n in data.get("qty", []):
+            self.qty.setdefault((cc, mat), {})[q] = n
+        self.months = {(y, m): n for y, m, n in data.get("months", [])}
+        self.signature = signature
+        return True
+
+    def _payload(self):
+        return {
+            "format": CUBE_FORMAT,
+            "signature": repr(self.signature),
+            "monthly": [[*k, v[0], v[1]] for k, v in self.monthly.items()],
+            "qty": [[cc, mat, q, n] for (cc, mat), hist in self.qty.items() for q, n in hist.items()],
+            "months": [[y, m, n] for (y, m), n in self.months.items()],
+        }
+
+    def save(self, payload):
+        tmp_fd, tmp_path = tempfile.mkstemp(dir=str(self.path.parent), suffix=".tmp")
+        try:
+            with os.fdopen(tmp_fd, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        finally:
+            if os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except Exception:
+                    pass
+
+    def persist_async(self, lock):
+        """
+        Guarda el cubo en segundo plano; varias escrituras seguidas se agrupan.
+        lock es el lock del dueño del cubo (se toma solo para serializar el payload).
+        """
+        with self._persist_lock:
+            self._dirty = True
+            if self._worker is not None and self._worker.is_alive():
+                return
+
+            def _run():
+                while True:
+                    with self._persist_lock:
+                        if not self._dirty:
+                            self._worker = None
+                            return
+                        self._dirty = False
+                    try:
+                        with lock:
+                            payload = self._payload()
+                        self.save(payload)
+                    except Exception:
+                        logger.exception("Error guardando el cubo de ventas %s", self.path)
+
+            self._worker = threading.Thread(target=_run, name="ventas-cube-persist", daemon=True)
+            self._worker.start()
@@ -1,39 +1,142 @@
 // static/js/cruzar.js
 document.addEventListener('DOMContentLoaded', function () {
   const statusEl = document.getElementById('status');
-  const tbody = document.querySelector('#cruzar-table tbody');
+  const table = document.getElementById('cruzar-table');
+  const tbody = table.querySelector('tbody');
+  const tfoot = table.querySelector('tfoot');
   const btnRefresh = document.getElementById('btn-refresh');
   const btnExport = document.getElementById('btn-export');
+  const form = document.getElementById('filters-form');
+  const btnClear = document.getElementById('btn-clear');
+  const selMarca = document.getElementById('filter-marca');
+  const selPunto = document.getElementById('filter-punto');
+  const inpMaterial = document.getElementById('filter-material');
+  const rangeInputs = {
+    inventario_min: document.getElementById('filter-inventario-min'),
+    inventario_max: document.getElementById('filter-inventario-max'),
+    transitos_min: document.getElementById('filter-transitos-min'),
+    transitos_max: document.getElementById('filter-transitos-max'),
+  };
+  const btnPrev = document.getElementById('prev-page');
+  const btnNext = document.getElementById('next-page');
+  const pageDisplay = document.getElementById('page-display');
+  const pageSizeSelect = document.getElementById('page-size-select');
+
+  const cols = [
+    'Material','Producto','Marca','Centro Costos','Punto de Venta',
+    'Sugerido Claro','Inventario','Transitos','Ventas Actuales',
+    'Envío Inventario 3 meses','Sugerido Coltrade','Promedio 3 Meses','Sugerido Final'
+  ];
+  const numericCols = cols.slice(5);
+  const colorCols = ['Inventario','Transitos','Ventas Actuales','Envío Inventario 3 meses'];
+
+  // la tabla completa vive en el servidor: aquí solo la página visible y sus totales
+  let page = 1;
+  let totalPages = 1;
+  let sort = '';   // "<columna>" ascendente, "-<columna>" descendente
+
+  function selectedValues(select) {
+    return Array.from(select.selectedOptions).map(o => o.value).filter(v => v !== '');
+  }
+
+  function queryParams() {
+    const params = new URLSearchParams();
+    const marcas = selectedValues(selMarca);
+    const puntos = selectedValues(selPunto);
+    const material = inpMaterial.value.trim();
+    if (marcas.length) params.set('marca', marcas.join(','));
+    if (puntos.length) params.set('punto', puntos.join(','));
+    if (material) params.set('material', material);
+    for (const [name, input] of Object.entries(rangeInputs)) {
+      if (input.value.trim() !== '') params.set(name, input.value.trim());
+    }
+    if (sort) params.set('sort', sort);
+    return params;
+  }
+
+  function fillSelect(select, values) {
+    const keep = new Set(selectedValues(select));
+    select.innerHTML = '';
+    for (const v of values) {
+      const opt = document.createElement('option');
+      opt.value = v;
+      opt.textContent = v;
+      opt.selected = keep.has(v);
+      select.appendChild(opt);
+    }
+  }
+
+  async function loadOptions() {
+    try {
+      const res = await fetch('/cruzar/api/options');
+      const json = await res.json();
+      fillSelect(selMarca, json.marcas || []);
+      fillSelect(selPunto, json.puntos || []);
+    } catch (err) {
+      console.error(err);
+    }
+  }
+
+  function formatTotal(v) {
+    return Number.isInteger(v) ? String(v) : v.toFixed(2);
+  }
+
+  function renderTotals(totals) {
+    tfoot.innerHTML = '';
+    if (!totals) return;
+    const tr = document.createElement('tr');
+    for (const c of cols) {
+      const td = document.createElement('td');
+      if (c === 'Material') td.textContent = 'Totales';
+      else if (numericCols.includes(c) && totals[c] !== undefined) td.textContent = formatTotal(totals[c]);
+      tr.appendChild(td);
+    }
+    tfoot.appendChild(tr);
+  }
+
+  function renderSortIndicators() {
+    const column = sort.replace(/^-/, '');
+    table.querySelectorAll('th[data-col]').forEach(th => {
+      th.classList.remove('sort-asc', 'sort-desc');
+      if (th.dataset.col === column) th.classList.add(sort.startsWith('-') ? 'sort-desc' : 'sort-asc');
+    });
+  }
 
   async function loadData() {
     statusEl.textContent = 'Cargando datos...';
     tbody.innerHTML = '';
+    const params = queryParams();
+    // siempre paginado: sin page/page_size el servidor devuelve todas las filas
+    params.set('page', page);
+    params.set('page_size', pageSizeSelect.value);
     try {
-      const res = await fetch('/cruzar/api/data');
+      const res = await fetch('/cruzar/api/data?' + params.toString());
       const json = await res.json();
       if (json.status !== 'ok') throw new Error(json.message || 'Error al obtener datos');
       const rows = json.data || [];
+      page = json.page || 1;
+      totalPages = Math.max(1, json.total_pages || 1);
+      pageDisplay.textContent = `Página ${page} / ${totalPages}`;
+      btnPrev.disabled = page <= 1;
+      btnNext.disabled = page >= totalPages;
+      renderSortIndicators();
+      renderTotals(json.total ? json.totals : null);
       if (!rows.length) {
         statusEl.textContent = 'No se encontraron registros.';
         return;
       }
-      statusEl.textContent = `Registros: ${rows.length}`;
+      statusEl.textContent = `Registros: ${json.total}`;
+      const frag = document.createDocumentFragment();
       for (const r of rows) {
         const tr = document.createElement('tr');
 
-        const cols = [
-          'Material','Producto','Marca','Centro Costos','Punto de Venta',
-          'Sugerido Claro','Inventario','Transitos','Ventas Actuales',
-          'Envío Inventario 3 meses','Sugerido Coltrade','Promedio 3 Meses','Sugerido Final'
-        ];
-
         for (const c of cols) {
           const td = document.createElement('td');
           const val = (r[c] === null || r[c] === undefined) ? '' : String(r[c]);
           td.textContent = val;
 
           // estilo condicional: columnas Inventario, Transitos, Ventas Actuales, Envío Inventario 3 meses
-          if (['Inventario','Transitos','Ventas Actuales','Envío Inventario 3 meses'].includes(c)) {
+          if (colorCols.includes(c)) {
             const n = parseFloat(val.toString().replace(',', '.'));
             if (!isNaN(n)) {
               if (n >= 0) td.classList.add('cell-positive');
@@ -43,20 +146,59 @@ document.addEventListener('DOMContentLoaded', function () {
 
           tr.appendChild(td);
         }
-        tbody.appendChild(tr);
+        frag.appendChild(tr);
       }
+      tbody.appendChild(frag);
     } catch (err) {
       console.error(err);
       statusEl.textContent = 'Error cargando datos: ' + err.message;
     }
   }
 
-  btnRefresh.addEventListener('click', loadData);
+  form.addEventListener('submit', function (e) {
+    e.preventDefault();
+    page = 1;
+    loadData();
+  });
+
+  btnClear.addEventListener('click', function () {
+    form.reset();
+    Array.from(selMarca.options).forEach(o => { o.selected = false; });
+    Array.from(selPunto.options).forEach(o => { o.selected = false; });
+    page = 1;
+    loadData();
+  });
+
+  table.querySelectorAll('th[data-col]').forEach(th => {
+    th.addEventListener('click', function () {
+      const column = th.dataset.col;
+      sort = sort === column ? '-' + column : column;
+      page = 1;
+      loadData();
+    });
+  });
+
+  btnPrev.addEventListener('click', function () {
+    if (page > 1) { page -= 1; loadData(); }
+  });
+  btnNext.addEventListener('click', function () {
+    if (page < totalPages) { page += 1; loadData(); }
+  });
+  pageSizeSelect.addEventListener('change', function () {
+    page = 1;
+    loadData();
+  });
+
+  btnRefresh.addEventListener('click', function () {
+    loadOptions();
+    loadData();
+  });
 
   btnExport.addEventListener('click', function () {
     window.location.href = '/cruzar/api/export';
   });
 
   // carga inicial
+  loadOptions();
   loadData();
-});
\ No newline at end of file
+});
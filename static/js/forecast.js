@@ -1,6 +1,7 @@
 document.addEventListener('DOMContentLoaded', function () {
   const endpointData = '/forecast/data';
   const endpointOptions = '/forecast/options';
+  const endpointExport = '/forecast/export';
   const tbody = document.getElementById('forecast-body');
 
   const selectCentro = document.getElementById('filter-centro');
@@ -9,11 +10,13 @@ document.addEventListener('DOMContentLoaded', function () {
   const selectMaterial = document.getElementById('filter-material');
   const selectProducto = document.getElementById('filter-producto');
   const selectMarca = document.getElementById('filter-marca');
+  const selectMeta = document.getElementById('filter-meta');
 
   const btnApply = document.getElementById('apply-filters');
   const btnClear = document.getElementById('clear-filters');
   const btnRefresh = document.getElementById('refresh-data');
   const btnExport = document.getElementById('export-page');
+  const btnExportAll = document.getElementById('export-all');
   const btnToggleFilters = document.getElementById('toggle-filters');
   const btnScrollTop = document.getElementById('scroll-top');
   const btnConfigureColumns = document.getElementById('configure-columns');
@@ -39,6 +42,9 @@ document.addEventListener('DOMContentLoaded', function () {
   let currentPage = 1;
   let currentPageSize = parseInt(pageSizeSelect.value || '50');
   let totalPages = 1;
+  // cursor (keyset) de la página siguiente: "Siguiente" no se corre si los datos cambian entre clics
+  let nextCursor = null;
+  let pendingCursor = null;
   let lastPayloadRecords = []; // records from last server response (page)
   // sugeridos map keyed by `${Centro Costos}|${Material}`
   let sugeridos = {};
@@ -55,7 +61,8 @@ document.addEventListener('DOMContentLoaded', function () {
     canal: [],
     material: [],
     producto: [],
-    marca: []
+    marca: [],
+    meta: []
   };
 
   let debounceTimer = null;
@@ -80,6 +87,11 @@ document.addEventListener('DOMContentLoaded', function () {
     'indicador-ventas-mes-pasado': true,
     'envio-inventario-3-meses': true,
     'envio-ventas-actuales': true,
+    'meta-mes': true,
+    'cumplimiento-meta': true,
+    'proyeccion-cierre': false,
+    'cumplimiento-proyectado': false,
+    'estado-meta': true,
     'sugerido': true
   };
 
@@ -102,6 +114,11 @@ document.addEventListener('DOMContentLoaded', function () {
     'indicador-ventas-mes-pasado': true,
     'envio-inventario-3-meses': true,
     'envio-ventas-actuales': true,
+    'meta-mes': true,
+    'cumplimiento-meta': true,
+    'proyeccion-cierre': false,
+    'cumplimiento-proyectado': false,
+    'estado-meta': true,
     'sugerido': true
   };
 
@@ -120,6 +137,14 @@ document.addEventListener('DOMContentLoaded', function () {
     return num.toFixed(4);
   }
 
+  // cumplimiento de meta (ventas / meta) como porcentaje
+  function formatPercent(v) {
+    if (v === null || v === undefined) return '-';
+    const num = Number(v);
+    if (isNaN(num)) return '-';
+    return `${(num * 100).toFixed(1)}%`;
+  }
+
   function escapeHtml(text) {
     if (!text && text !== 0) return '';
     return String(text)
@@ -166,6 +191,7 @@ document.addEventListener('DOMContentLoaded', function () {
     const materials = getSelectValues(selectMaterial);
     const productos = getSelectValues(selectProducto);
     const marcas = getSelectValues(selectMarca);
+    const metas = getSelectValues(selectMeta);
 
     if (centros.length) params.set('centro', centros.join(','));
     if (puntos.length) params.set('punto', puntos.join(','));
@@ -173,7 +199,12 @@ document.addEventListener('DOMContentLoaded', function () {
     if (materials.length) params.set('material', materials.join(','));
     if (productos.length) params.set('producto', productos.join(','));
     if (marcas.length) params.set('marca', marcas.join(','));
-    params.set('page', String(currentPage));
+    if (metas.length) params.set('meta', metas.join(','));
+    if (pendingCursor) {
+      params.set('cursor', pendingCursor);
+    } else {
+      params.set('page', String(currentPage));
+    }
     params.set('page_size', String(currentPageSize));
     return params.toString();
   }
@@ -376,8 +407,9 @@ document.addEventListener('DOMContentLoaded', function () {
     const table = document.getElementById('forecast-table');
     const sortableHeaders = table.querySelectorAll('thead th.sortable');
     
-    sortableHeaders.forEach((header, index) => {
+    sortableHeaders.forEach(header => {
       header.addEventListener('click', function() {
+        const index = header.cellIndex; // posición de la columna en la fila
         let direction = 'desc'; // Default to descending (highest first)
         
         // If already sorted by this column, toggle direction
@@ -425,7 +457,8 @@ document.addEventListener('DOMContentLoaded', function () {
       'Centro Costos', 'Material', 'Producto', 'Marca', 'Punto de Venta', 'Canal o Regional',
       'Ventas Actuales', 'Ventas Mes pasado', 'Promedio 3 Meses', 'Maximo', 'Mediana',
       'Inventario', 'Transitos', 'Indicador 3 Meses', 'Indicador Ventas Mes Pasado',
-      'Envío Inventario 3 meses', 'Envío Ventas Actuales', 'Sugerido'
+      'Envío Inventario 3 meses', 'Envío Ventas Actuales', 'Meta Mes', 'Cumplimiento Meta',
+      'Proyección Cierre', 'Cumplimiento Proyectado', 'Estado Meta', 'Sugerido'
     ];
     return headers[columnIndex] || `Columna ${columnIndex + 1}`;
   }
@@ -434,7 +467,7 @@ document.addEventListener('DOMContentLoaded', function () {
     lastPayloadRecords = records || [];
     tbody.innerHTML = '';
     if (!records || records.length === 0) {
-      tbody.innerHTML = '<tr><td colspan="18" class="loading"><div><i class="fas fa-inbox"></i></div><div>No hay datos disponibles</div></td></tr>';
+      tbody.innerHTML = '<tr><td colspan="23" class="loading"><div><i class="fas fa-inbox"></i></div><div>No hay datos disponibles</div></td></tr>';
       return;
     }
     records.forEach(row => {
@@ -463,6 +496,11 @@ document.addEventListener('DOMContentLoaded', function () {
         <td>${formatIndicator(row['Indicador_Mes_Pasado'])}</td>
         <td>${formatNumber(row['Envio_3_Meses'])}</td>
         <td>${formatNumber(row['Envio_Pasadas'])}</td>
+        <td>${formatNumber(row['Meta_Mes'])}</td>
+        <td>${formatPercent(row['Cumplimiento_Meta'])}</td>
+        <td>${formatNumber(row['Proyeccion_Cierre'])}</td>
+        <td>${formatPercent(row['Cumplimiento_Proyectado'])}</td>
+        <td>${escapeHtml(row['Estado_Meta'] ?? '')}</td>
         <td><input type="number" class="sugerido-input" data-key="${key}" value="${sugeridoValue}" min="0" step="0.01"></td>
       `;
       tbody.appendChild(tr);
@@ -521,8 +559,9 @@ document.addEventListener('DOMContentLoaded', function () {
   }
 
   function fetchDataAndRender() {
-    tbody.innerHTML = '<tr><td colspan="18" class="loading"><div class="loading-spinner"><i class="fas fa-spinner fa-spin"></i></div><div>Cargando datos...</div></td></tr>';
+    tbody.innerHTML = '<tr><td colspan="23" class="loading"><div class="loading-spinner"><i class="fas fa-spinner fa-spin"></i></div><div>Cargando datos...</div></td></tr>';
     const q = buildQueryParams();
+    pendingCursor = null;
     const url = q ? `${endpointData}?${q}` : endpointData;
     fetch(url)
       .then(res => {
@@ -531,11 +570,12 @@ document.addEventListener('DOMContentLoaded', function () {
       })
       .then(payload => {
         const records = payload.records || [];
+        nextCursor = payload.next_cursor || null;
         renderTableFromRecords(records);
         updatePaginationDisplay(payload.total || 0, payload.page || 1, payload.page_size || currentPageSize, payload.total_pages || 1);
       })
       .catch(err => {
-        tbody.innerHTML = `<tr><td colspan="18" class="loading"><div><i class="fas fa-exclamation-triangle"></i></div><div>Error cargando datos: ${err.message}</div></td></tr>`;
+        tbody.innerHTML = `<tr><td colspan="23" class="loading"><div><i class="fas fa-exclamation-triangle"></i></div><div>Error cargando datos: ${err.message}</div></td></tr>`;
         console.error(err);
       });
   }
@@ -580,7 +620,8 @@ document.addEventListener('DOMContentLoaded', function () {
       'Centro Costos','Material','Producto','Marca','Punto de Venta','Canal o Regional',
       'Ventas Actuales','Ventas Mes pasado','Promedio 3 Meses','Maximo','Mediana',
       'Inventario','Transitos','Indicador 3 Meses','Indicador Ventas Mes Pasado',
-      'Envío Inventario 3 meses','Envío Ventas Actuales','Sugerido'
+      'Envío Inventario 3 meses','Envío Ventas Actuales','Meta Mes','Cumplimiento Meta',
+      'Proyección Cierre','Cumplimiento Proyectado','Estado Meta','Sugerido'
     ];
 
     const dataForXLSX = rowsToExport.map(r => {
@@ -610,6 +651,11 @@ document.addEventListener('DOMContentLoaded', function () {
         'Indicador Ventas Mes Pasado': r['Indicador_Mes_Pasado'] ?? '',
         'Envío Inventario 3 meses': r['Envio_3_Meses'] ?? '',
         'Envío Ventas Actuales': r['Envio_Pasadas'] ?? '',
+        'Meta Mes': r['Meta_Mes'] ?? '',
+        'Cumplimiento Meta': r['Cumplimiento_Meta'] ?? '',
+        'Proyección Cierre': r['Proyeccion_Cierre'] ?? '',
+        'Cumplimiento Proyectado': r['Cumplimiento_Proyectado'] ?? '',
+        'Estado Meta': r['Estado_Meta'] ?? '',
         'Sugerido': sugVal ?? ''
       };
     });
@@ -650,7 +696,8 @@ document.addEventListener('DOMContentLoaded', function () {
         canal: getSelectValues(selectCanal),
         material: getSelectValues(selectMaterial),
         producto: getSelectValues(selectProducto),
-        marca: getSelectValues(selectMarca)
+        marca: getSelectValues(selectMarca),
+        meta: getSelectValues(selectMeta)
       };
       currentPage = 1;
       loadOptionsAndData();
@@ -671,6 +718,7 @@ document.addEventListener('DOMContentLoaded', function () {
     setSelectValues(selectMaterial, previousFilters.material || []);
     setSelectValues(selectProducto, previousFilters.producto || []);
     setSelectValues(selectMarca, previousFilters.marca || []);
+    setSelectValues(selectMeta, previousFilters.meta || []);
   }
 
   // Función para mostrar notificaciones
@@ -814,6 +862,7 @@ document.addEventListener('DOMContentLoaded', function () {
       selectMaterial.querySelectorAll('option').forEach(o => o.selected = false);
       selectProducto.querySelectorAll('option').forEach(o => o.selected = false);
       selectMarca.querySelectorAll('option').forEach(o => o.selected = false);
+      selectMeta.querySelectorAll('option').forEach(o => o.selected = false);
       currentPage = 1;
       loadOptionsAndData();
     });
@@ -838,6 +887,7 @@ document.addEventListener('DOMContentLoaded', function () {
     confirmIfUnsavedAndProceed(function () {
       if (currentPage < totalPages) {
         currentPage += 1;
+        pendingCursor = nextCursor;
         fetchDataAndRender();
       }
     });
@@ -855,6 +905,16 @@ document.addEventListener('DOMContentLoaded', function () {
     exportCurrentPageToExcel();
   });
 
+  // Exportación completa en el servidor (mismos filtros, sin paginar)
+  btnExportAll.addEventListener('click', function () {
+    const params = new URLSearchParams(buildQueryParams());
+    params.delete('page');
+    params.delete('page_size');
+    params.delete('cursor');
+    params.set('format', 'csv');
+    window.location.href = `${endpointExport}?${params.toString()}`;
+  });
+
   btnToggleFilters.addEventListener('click', toggleFiltersVisibility);
   btnScrollTop.addEventListener('click', scrollToTop);
 
@@ -891,7 +951,7 @@ document.addEventListener('DOMContentLoaded', function () {
   });
 
   // Setup listeners for automatic filter application + dependency reloading
-  [selectCentro, selectPunto, selectCanal, selectMaterial, selectProducto, selectMarca].forEach(sel => {
+  [selectCentro, selectPunto, selectCanal, selectMaterial, selectProducto, selectMarca, selectMeta].forEach(sel => {
     sel.addEventListener('change', function (e) {
       scheduleFilterApply();
     });
@@ -934,6 +994,7 @@ document.addEventListener('DOMContentLoaded', function () {
         populateSelect(selectMaterial, opts.materials || []);
         populateSelect(selectProducto, opts.productos || []);
         populateSelect(selectMarca, opts.marcas || []);
+        populateSelect(selectMeta, opts.estados_meta || []);
       })
       .catch(err => {
         console.error('Error cargando opciones:', err);
@@ -950,7 +1011,8 @@ document.addEventListener('DOMContentLoaded', function () {
     canal: [],
     material: [],
     producto: [],
-    marca: []
+    marca: [],
+    meta: []
   };
 
   // Initialize the application
@@ -41,9 +41,24 @@ function renderTable(items) {
   $$(".delete").forEach(b => b.addEventListener("click", onDelete));
 }
 
+async function searchProducts(q) {
+  const res = await fetch(`${API_BASE}/products/search?q=${encodeURIComponent(q)}`);
+  if (!res.ok) { showMessage("Error al buscar", "error"); return { items: [], total: 0 }; }
+  return await res.json();
+}
+
 async function refresh() {
-  const data = await fetchProducts();
-  renderTable(data);
+  const q = $("#search-input").value.trim();
+  if (!q) {
+    renderTable(await fetchProducts());
+    $("#search-info").textContent = "";
+    return;
+  }
+  const data = await searchProducts(q);
+  renderTable(data.items);
+  $("#search-info").textContent = data.total > data.items.length
+    ? `Mostrando ${data.items.length} de ${data.total}`
+    : `${data.total} resultado(s)`;
 }
 
 async function onEdit(e) {
@@ -76,6 +91,12 @@ document.addEventListener("DOMContentLoaded", () => {
 
   $("#btn-refresh").addEventListener("click", refresh);
 
+  let searchTimer = null;
+  $("#search-input").addEventListener("input", () => {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(refresh, 250);
+  });
+
   $("#product-form").addEventListener("submit", async (ev) => {
     ev.preventDefault();
     const material = $("#input-material").value.trim();
@@ -27,16 +27,16 @@ async function fetchItems() {
 function renderTable(items) {
   const tbody = $("#items-table tbody");
   tbody.innerHTML = "";
-  items.forEach((it, idx) => {
+  items.forEach((it) => {
     const tr = document.createElement("tr");
     tr.innerHTML = `
-      <td>${idx}</td>
+      <td>${it.id}</td>
       <td>${it["Centro Costos"] || ""}</td>
       <td>${it["Material"] || ""}</td>
       <td>${it["Transitos"] != null ? it["Transitos"] : ""}</td>
       <td>
-        <button class="edit" data-index="${idx}">Editar</button>
-        <button class="delete" data-index="${idx}">Borrar</button>
+        <button class="edit" data-id="${it.id}">Editar</button>
+        <button class="delete" data-id="${it.id}">Borrar</button>
       </td>
     `;
     tbody.appendChild(tr);
@@ -51,10 +51,10 @@ async function refresh() {
 }
 
 async function onEdit(e) {
-  const idx = Number(e.currentTarget.dataset.index);
+  const id = Number(e.currentTarget.dataset.id);
   const res = await fetch(`${API_BASE}/items`);
   const items = await res.json();
-  const item = items[idx];
+  const item = items.find(it => it.id === id);
   if (!item) {
     showMessage("Elemento no encontrado", "error");
     return;
@@ -62,13 +62,13 @@ async function onEdit(e) {
   $("#input-centro").value = item["Centro Costos"] || "";
   $("#input-material").value = item["Material"] || "";
   $("#input-transitos").value = item["Transitos"] != null ? item["Transitos"] : 0;
-  $("#editing-index").value = idx;
+  $("#editing-index").value = id;
 }
 
 async function onDelete(e) {
-  const idx = Number(e.currentTarget.dataset.index);
-  if (!confirm(`¿Borrar registro #${idx}?`)) return;
-  const resp = await fetch(`${API_BASE}/items/${encodeURIComponent(idx)}`, { method: "DELETE" });
+  const id = Number(e.currentTarget.dataset.id);
+  if (!confirm(`¿Borrar registro #${id}?`)) return;
+  const resp = await fetch(`${API_BASE}/items/${encodeURIComponent(id)}`, { method: "DELETE" });
   if (resp.ok) {
     showMessage("Borrado exitoso", "success");
     refresh();
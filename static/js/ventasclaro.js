@@ -13,31 +13,50 @@ function showMessage(text, type="info", timeout=5000) {
   }
 }
 
-let allData = [];      // datos crudos desde backend
-let filteredData = []; // datos mostrados según filtro
-let currentFilters = { start: null, end: null }; // fechas ISO: YYYY-MM-DD
+let pageRecords = [];   // registros de la página actual (desde backend, con id estable)
+let currentFilters = { start: null, end: null, month: null, centro: null, material: null };
+let currentSort = "";   // "", "fecha", "-fecha", ...
+let currentPage = 1;
+let currentPageSize = 50;
+let totalPages = 1;
 let isImporting = false; // Bandera para controlar estado de importación
 
+function buildQuery(filters, extra = {}) {
+  const params = new URLSearchParams();
+  if (filters.start) params.set("start_date", filters.start);
+  if (filters.end) params.set("end_date", filters.end);
+  if (filters.month) params.set("month", filters.month);
+  if (filters.centro) params.set("centro", filters.centro);
+  if (filters.material) params.set("material", filters.material);
+  Object.entries(extra).forEach(([k, v]) => { if (v !== "" && v != null) params.set(k, String(v)); });
+  return params.toString();
+}
+
 async function fetchVentas() {
-  const res = await fetch(`${API_BASE}/ventas`);
-  if (!res.ok) { showMessage("Error al obtener datos", "error"); return []; }
+  const qs = buildQuery(currentFilters, { page: currentPage, page_size: currentPageSize, sort: currentSort });
+  const res = await fetch(`${API_BASE}/ventas?${qs}`);
+  if (!res.ok) {
+    const j = await res.json().catch(()=>({}));
+    showMessage(j.error || "Error al obtener datos", "error");
+    return null;
+  }
   return await res.json();
 }
 
 function renderTable(items) {
   const tbody = $("#ventas-table tbody");
   tbody.innerHTML = "";
-  items.forEach((it, idx) => {
+  items.forEach((it) => {
     const tr = document.createElement("tr");
     tr.innerHTML = `
-      <td>${idx}</td>
+      <td>${it.id}</td>
       <td>${it["Centro Costos"] || ""}</td>
       <td>${it["Material"] || ""}</td>
       <td>${it["Fecha Venta"] || ""}</td>
       <td>${it["Cantidad"] != null ? it["Cantidad"] : ""}</td>
       <td>
-        <button class="edit" data-idx="${idx}">Editar</button>
-        <button class="delete" data-idx="${idx}">Borrar</button>
+        <button class="edit" data-id="${it.id}">Editar</button>
+        <button class="delete" data-id="${it.id}">Borrar</button>
       </td>
     `;
     tbody.appendChild(tr);
@@ -47,65 +66,60 @@ function renderTable(items) {
   $$(".delete").forEach(b => b.addEventListener("click", onDelete));
 }
 
-function applyDateFilterToData(data, start, end) {
-  if (!start && !end) return [...data];
-  const s = start ? new Date(start + 'T00:00:00') : null;
-  const e = end ? new Date(end + 'T23:59:59') : null;
-  return data.filter(d => {
-    const f = d["Fecha Venta"];
-    if (!f) return false; // entradas sin fecha no se muestran en el filtro
-    // try parse ISO yyyy-mm-dd
-    const dt = new Date(f + 'T00:00:00');
-    if (isNaN(dt.getTime())) return false;
-    if (s && dt < s) return false;
-    if (e && dt > e) return false;
-    return true;
+function updatePaginationDisplay(payload) {
+  currentPage = payload.page || 1;
+  totalPages = payload.total_pages || 1;
+  $("#page-display").textContent = `Página ${currentPage} / ${totalPages}`;
+  $("#prev-page").disabled = currentPage <= 1;
+  $("#next-page").disabled = currentPage >= totalPages;
+  const total = payload.total || 0;
+  const all = payload.total_all || 0;
+  const cantidad = Number(payload.cantidad_total || 0).toLocaleString("es-CO");
+  $("#totals-display").textContent = total === all
+    ? `Registros: ${total} — Cantidad: ${cantidad}`
+    : `Registros: ${total} de ${all} — Cantidad: ${cantidad}`;
+}
+
+function updateSortIndicators() {
+  const field = currentSort.replace(/^-/, "");
+  $$("#ventas-table th.sortable").forEach(th => {
+    th.classList.remove("sort-asc", "sort-desc");
+    if (field && th.dataset.sort === field) {
+      th.classList.add(currentSort.startsWith("-") ? "sort-desc" : "sort-asc");
+    }
   });
 }
 
 async function refresh() {
-  allData = await fetchVentas();
-  // aplicar filtro actual
-  filteredData = applyDateFilterToData(allData, currentFilters.start, currentFilters.end);
-  renderTable(filteredData);
+  const payload = await fetchVentas();
+  if (!payload) return;
+  pageRecords = payload.records || [];
+  renderTable(pageRecords);
+  updatePaginationDisplay(payload);
+  updateSortIndicators();
+}
+
+function findRecord(id) {
+  return pageRecords.find(r => r.id === id);
 }
 
 /* --- Edición / borrado --- */
 async function onEdit(e) {
-  const idx = Number(e.currentTarget.dataset.idx);
-  const item = filteredData[idx];
+  const id = Number(e.currentTarget.dataset.id);
+  const item = findRecord(id);
   if (!item) { showMessage("Elemento no encontrado", "error"); return; }
   $("#input-centro").value = item["Centro Costos"] || "";
   $("#input-material").value = item["Material"] || "";
   $("#input-fecha").value = item["Fecha Venta"] || "";
   $("#input-cantidad").value = item["Cantidad"] != null ? item["Cantidad"] : 0;
-  // store original index relative to the complete dataset: find global index
-  const globalIdx = allData.findIndex(d => {
-    return d["Centro Costos"] === item["Centro Costos"]
-      && d["Material"] === item["Material"]
-      && (d["Fecha Venta"] || "") === (item["Fecha Venta"] || "")
-      && String(d["Cantidad"]) === String(item["Cantidad"]);
-  });
-  $("#editing-original-idx").value = globalIdx >= 0 ? String(globalIdx) : "";
+  $("#editing-original-idx").value = String(id);
 }
 
 async function onDelete(e) {
-  const idx = Number(e.currentTarget.dataset.idx);
-  const item = filteredData[idx];
-  if (!item) { showMessage("Elemento no encontrado", "error"); return; }
-  // find global index
-  const globalIdx = allData.findIndex(d => {
-    return d["Centro Costos"] === item["Centro Costos"]
-      && d["Material"] === item["Material"]
-      && (d["Fecha Venta"] || "") === (item["Fecha Venta"] || "")
-      && String(d["Cantidad"]) === String(item["Cantidad"]);
-  });
-  if (globalIdx < 0) {
-    showMessage("No se pudo determinar el índice global para borrado", "error");
-    return;
-  }
-  if (!confirm(`¿Borrar venta en la fila #${globalIdx}?`)) return;
-  const resp = await fetch(`${API_BASE}/ventas/${encodeURIComponent(globalIdx)}`, { method: "DELETE" });
+  const id = Number(e.currentTarget.dataset.id);
+  if (!findRecord(id)) { showMessage("Elemento no encontrado", "error"); return; }
+  if (!confirm(`¿Borrar venta #${id}?`)) return;
+  const resp = await fetch(`${API_BASE}/ventas/${encodeURIComponent(id)}`, { method: "DELETE" });
   if (resp.ok) {
     showMessage("Borrado exitoso", "success");
     await refresh();
@@ -207,30 +221,42 @@ function openMonthsModal() {
 
 /* --- filtros: aplicar / limpiar / borrar filtrados --- */
 function readFilterInputs() {
-  const s = $("#filter-start").value || null;
-  const e = $("#filter-end").value || null;
-  return { start: s, end: e };
+  const val = sel => ($(sel) && $(sel).value.trim()) || null;
+  return {
+    start: val("#filter-start"),
+    end: val("#filter-end"),
+    month: val("#filter-month"),
+    centro: val("#filter-centro"),
+    material: val("#filter-material")
+  };
 }
 
 async function onApplyFilter() {
-  const f = readFilterInputs();
-  currentFilters.start = f.start;
-  currentFilters.end = f.end;
-  filteredData = applyDateFilterToData(allData, currentFilters.start, currentFilters.end);
-  renderTable(filteredData);
+  currentFilters = readFilterInputs();
+  currentPage = 1;
+  await refresh();
   showMessage("Filtro aplicado", "success", 2000);
 }
 
 async function onClearFilter() {
-  currentFilters.start = null;
-  currentFilters.end = null;
-  $("#filter-start").value = "";
-  $("#filter-end").value = "";
-  filteredData = [...allData];
-  renderTable(filteredData);
+  currentFilters = { start: null, end: null, month: null, centro: null, material: null };
+  ["#filter-start", "#filter-end", "#filter-month", "#filter-centro", "#filter-material"].forEach(sel => {
+    if ($(sel)) $(sel).value = "";
+  });
+  currentPage = 1;
+  await refresh();
   showMessage("Filtros borrados", "info", 2000);
 }
 
+async function countByDateRange(start, end) {
+  // solo rango de fechas: es lo que borra /delete_filtered
+  const qs = buildQuery({ start, end }, { page: 1, page_size: 1 });
+  const res = await fetch(`${API_BASE}/ventas?${qs}`);
+  if (!res.ok) return 0;
+  const j = await res.json().catch(()=>({}));
+  return j.total || 0;
+}
+
 async function onDeleteFiltered() {
   // require at least one filter value to avoid accidental delete-all
   if (!currentFilters.start && !currentFilters.end) {
@@ -238,7 +264,7 @@ async function onDeleteFiltered() {
     return;
   }
   
-  const filteredCount = applyDateFilterToData(allData, currentFilters.start, currentFilters.end).length;
+  const filteredCount = await countByDateRange(currentFilters.start, currentFilters.end);
   if (filteredCount === 0) {
     showMessage("No hay registros que coincidan con el filtro actual.", "warning", 4000);
     return;
@@ -269,7 +295,31 @@ async function onDeleteFiltered() {
   }
 }
 
-/* --- Importación con protección --- */
+/* --- Importación en segundo plano (trabajo + consulta de avance) --- */
+const IMPORT_POLL_MS = 1000;
+
+function formatImportProgress(j) {
+  if (j.status === "queued") {
+    return `Importación en cola${j.queue_position ? ` (posición ${j.queue_position})` : ""}...`;
+  }
+  const done = Number(j.rows_processed || 0).toLocaleString();
+  const total = j.rows_total ? ` de ~${Number(j.rows_total).toLocaleString()}` : "";
+  const speed = j.rows_per_second ? ` · ${Math.round(j.rows_per_second).toLocaleString()} filas/s` : "";
+  const eta = (j.eta_seconds != null && j.status === "running") ? ` · faltan ~${Math.ceil(j.eta_seconds)} s` : "";
+  return `Importando: ${done}${total} filas${speed}${eta}`;
+}
+
+async function pollImport(statusUrl) {
+  while (true) {
+    const res = await fetch(statusUrl);
+    const j = await res.json().catch(()=>({}));
+    if (!res.ok) throw new Error(j.error || "No se pudo consultar la importación");
+    if (j.status === "done" || j.status === "error") return j;
+    showMessage(formatImportProgress(j), "info", 0);
+    await new Promise(r => setTimeout(r, IMPORT_POLL_MS));
+  }
+}
+
 async function handleImport() {
   if (isImporting) {
     showMessage("Ya hay una importación en proceso. Espere a que termine.", "error", 3000);
@@ -282,7 +332,7 @@ async function handleImport() {
     return; 
   }
 
-  // Deshabilitar el botón de importación
+  // Deshabilitar el botón mientras este navegador sigue su importación
   isImporting = true;
   const btnImport = $("#btn-import");
   const originalText = btnImport.textContent;
@@ -294,27 +344,29 @@ async function handleImport() {
     fd.append("file", f);
     const res = await fetch(`${API_BASE}/import`, { method: "POST", body: fd });
     const j = await res.json().catch(()=>({}));
-    
-    if (res.ok) {
-      showMessage(`Importado: ${j.added} nuevos. Total: ${j.total_after}`, "success", 5000);
-      $("#file-import").value = "";
-      await refresh();
-      await loadMonthsAndPreview();
-    } else if (res.status === 429) {
-      // Error 429: En proceso de importación
-      showMessage(j.error || "En proceso de importación, espere antes de intentar nuevamente", "error", 5000);
-    } else {
+    if (!res.ok) {
       showMessage(j.error || "Error al importar: " + (j.detail || ""), "error");
+      return;
     }
+    $("#file-import").value = "";
+    showMessage(formatImportProgress(j), "info", 0);
+
+    const final = await pollImport(j.status_url || `${API_BASE}/import/${j.job_id}`);
+    if (final.status === "done") {
+      const r = final.result || {};
+      showMessage(`Importado: ${r.added} nuevos. Total: ${r.total_after}`, "success", 5000);
+    } else {
+      showMessage(final.error + (final.detail ? ": " + final.detail : ""), "error");
+    }
+    // también tras un error: los bloques ya guardados quedan en el store
+    await refresh();
+    await loadMonthsAndPreview();
   } catch (e) {
     showMessage("Error de conexión al importar", "error");
   } finally {
-    // Rehabilitar el botón después de 30 segundos (o inmediatamente si no fue un error 429)
-    setTimeout(() => {
-      isImporting = false;
-      btnImport.textContent = originalText;
-      btnImport.disabled = false;
-    }, 30000); // 30 segundos
+    isImporting = false;
+    btnImport.textContent = originalText;
+    btnImport.disabled = false;
   }
 }
 
@@ -382,8 +434,8 @@ document.addEventListener("DOMContentLoaded", () => {
       };
 
       if (original !== "") {
-        const idx = Number(original);
-        const res = await fetch(`${API_BASE}/ventas/${encodeURIComponent(idx)}`, {
+        const id = Number(original);
+        const res = await fetch(`${API_BASE}/ventas/${encodeURIComponent(id)}`, {
           method: "PUT",
           headers: {"Content-Type":"application/json"},
           body: JSON.stringify(payload)
@@ -457,4 +509,28 @@ document.addEventListener("DOMContentLoaded", () => {
   if (btnClear) btnClear.addEventListener("click", onClearFilter);
   const btnDeleteFiltered = $("#btn-delete-filtered");
   if (btnDeleteFiltered) btnDeleteFiltered.addEventListener("click", onDeleteFiltered);
+
+  // paginación
+  const prevBtn = $("#prev-page");
+  if (prevBtn) prevBtn.addEventListener("click", () => {
+    if (currentPage > 1) { currentPage -= 1; refresh(); }
+  });
+  const nextBtn = $("#next-page");
+  if (nextBtn) nextBtn.addEventListener("click", () => {
+    if (currentPage < totalPages) { currentPage += 1; refresh(); }
+  });
+  const pageSizeSelect = $("#page-size-select");
+  if (pageSizeSelect) pageSizeSelect.addEventListener("change", () => {
+    currentPageSize = parseInt(pageSizeSelect.value || "50", 10);
+    currentPage = 1;
+    refresh();
+  });
+
+  // orden: click en encabezado alterna asc / desc
+  $$("#ventas-table th.sortable").forEach(th => th.addEventListener("click", () => {
+    const field = th.dataset.sort;
+    currentSort = currentSort === field ? `-${field}` : field;
+    currentPage = 1;
+    refresh();
+  }));
 });
\ No newline at end of file
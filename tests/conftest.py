@@ -0,0 +1,15 @@
+"""
+Configuración común de las pruebas (python -m pytest -q desde la raíz del proyecto).
+Los blueprints se importan sin .env: las variables de Odoo se completan con valores
+de prueba (no se conecta a Odoo) y ninguna prueba escribe en conexiones/data_ops.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+for _k in ("ODOO_URL", "ODOO_DB", "ODOO_USERNAME", "ODOO_API_KEY"):
+    os.environ.setdefault(_k, "test")
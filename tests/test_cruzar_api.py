@@ -0,0 +1,171 @@
+"""/cruzar/api/data: paginado, totales filtrados y vista incremental frente a una vista nueva."""
+
+import random
+
+import pytest
+from flask import Flask
+
+from blueprint import cruzar
+from conexiones.keyed_view import KeyedView, ViewSource
+from conexiones.result_cache import ResultCache
+
+MARCAS = ["Samsung", "SAMSUNG", "Xiaomi", "Apple", ""]
+PUNTOS = ["Centro", "Norte", "Sur"]
+
+
+class Sources:
+    """Fuentes en memoria con firma = contador de cambios."""
+
+    def __init__(self, seed=0, n=300):
+        rnd = random.Random(seed)
+        self.sigs = {}
+        self.claro = {}
+        for i in range(n):
+            key = (f"M{i % 60:03d}", f"C{i // 60}")
+            self.claro[key] = {"Sugerido Claro": rnd.randint(0, 9)}
+        self.coltrade = {k: {"Sugerido Coltrade": float(rnd.randint(0, 5)), "Promedio 3 Meses": rnd.random()}
+                         for k in list(self.claro)[::3]}
+        self.productos = {f"M{i:03d}": {"Producto": f"P{i}", "Marca": rnd.choice(MARCAS)} for i in range(60)}
+        self.puntos = {f"C{i}": {"Punto de Venta": PUNTOS[i % 3]} for i in range(5)}
+        self.inventario = {k: {"Inventario": float(rnd.randint(0, 20))} for k in list(self.claro)[::2]}
+        self.transitos = {k: {"Transitos": rnd.randint(0, 4)} for k in list(self.claro)[::5]}
+        self.ventas = {k: {"Ventas Actuales": rnd.randint(0, 3)} for k in list(self.claro)[::7]}
+
+    def touch(self, name):
+        self.sigs[name] = self.sigs.get(name, 0) + 1
+
+    def view(self):
+        def source(name, columns, **kw):
+            return ViewSource(name, lambda: self.sigs.get(name, 0),
+                              lambda: {k: dict(v) for k, v in getattr(self, name).items()}, columns, **kw)
+        return KeyedView(('Material', 'Centro Costos'), cruzar.ROW_DEFAULTS, [
+            source('claro', ['Sugerido Claro'], rows=True),
+            source('coltrade', ['Sugerido Coltrade', 'Promedio 3 Meses'], rows=True),
+            source('productos', ['Producto', 'Marca'], lookup=lambda key: key[0]),
+            source('puntos', ['Punto de Venta'], lookup=lambda key: key[1]),
+            source('inventario', ['Inventario']),
+            source('transitos', ['Transitos']),
+            source('ventas', ['Ventas Actuales']),
+        ], finalize=cruzar._CruzadoRecords())
+
+
+@pytest.fixture
+def sources(monkeypatch):
+    data = Sources()
+    monkeypatch.setattr(cruzar, '_cruzado', data.view())
+    monkeypatch.setattr(cruzar, '_selection_cache', ResultCache(max_entries=64, max_bytes=1 << 24))
+    monkeypatch.setattr(cruzar, '_index_state', {"version": None, "index": None})
+    return data
+
+
+@pytest.fixture
+def client(sources):
+    app = Flask(__name__)
+    app.register_blueprint(cruzar.cruzar_bp)
+    return app.test_client()
+
+
+def _all_rows(sources):
+    return Sources.view(sources).records()[1]
+
+
+def _expected(rows, marca=(), punto=(), inv_min=None, inv_max=None):
+    out = []
+    for r in rows:
+        if marca and str(r['Marca']).lower() not in marca:
+            continue
+        if punto and str(r['Punto de Venta']).lower() not in punto:
+            continue
+        if inv_min is not None and r['Inventario'] < inv_min:
+            continue
+        if inv_max is not None and r['Inventario'] > inv_max:
+            continue
+        out.append(r)
+    totals = {c: float(sum(r[c] for r in out)) for c in cruzar.NUMERIC_COLUMNS}
+    return out, totals
+
+
+def test_unpaged_returns_every_filtered_row(client, sources):
+    body = client.get('/cruzar/api/data').get_json()
+    rows = _all_rows(sources)
+    assert body['data'] == rows
+    assert body['total'] == len(rows)
+    assert 'page' not in body and 'total_pages' not in body
+    assert body['totals'] == pytest.approx(_expected(rows)[1])
+
+
+def test_pages_cover_the_selection(client, sources):
+    rows = _all_rows(sources)
+    seen, page = [], 1
+    while True:
+        body = client.get(f'/cruzar/api/data?page={page}&page_size=70').get_json()
+        assert body['page_size'] == 70 and body['total'] == len(rows)
+        assert body['total_pages'] == -(-len(rows) // 70)
+        seen += body['data']
+        if page >= body['total_pages']:
+            break
+        page += 1
+    assert seen == rows
+    # página fuera de rango -> última página
+    last = client.get('/cruzar/api/data?page=999&page_size=70').get_json()
+    assert last['page'] == last['total_pages'] and last['data'] == rows[-len(last['data']):]
+
+
+@pytest.mark.parametrize('query, expect', [
+    ('marca=samsung', dict(marca={'samsung'})),
+    ('marca=Apple,xiaomi&punto=norte', dict(marca={'apple', 'xiaomi'}, punto={'norte'})),
+    ('inventario_min=5&inventario_max=12', dict(inv_min=5, inv_max=12)),
+    ('punto=sur&inventario_min=1', dict(punto={'sur'}, inv_min=1)),
+    ('marca=no-existe', dict(marca={'no-existe'})),
+])
+def test_filter_totals_match_filtered_rows(client, sources, query, expect):
+    rows, totals = _expected(_all_rows(sources), **expect)
+    body = client.get(f'/cruzar/api/data?{query}').get_json()
+    assert body['data'] == rows
+    assert body['total'] == len(rows)
+    assert body['totals'] == pytest.approx(totals)
+    paged = client.get(f'/cruzar/api/data?{query}&page=1&page_size=10').get_json()
+    assert paged['data'] == rows[:10]
+    assert paged['totals'] == body['totals']
+
+
+def test_sort(client, sources):
+    rows = _all_rows(sources)
+    body = client.get('/cruzar/api/data?sort=-Inventario').get_json()
+    assert body['data'] == sorted(rows, key=lambda r: -r['Inventario'])
+    body = client.get('/cruzar/api/data?sort=Marca').get_json()
+    assert body['data'] == sorted(rows, key=lambda r: str(r['Marca']).lower())
+
+
+@pytest.mark.parametrize('query', ['inventario_min=abc', 'transitos_max=nan', 'sort=NoExiste'])
+def test_bad_query_is_400(client, query):
+    response = client.get(f'/cruzar/api/data?{query}')
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
+
+
+def test_incremental_view_matches_fresh_build(client, sources):
+    client.get('/cruzar/api/data')
+    # cambia una fuente de valores, una de lookup y una de filas
+    sources.inventario[("M001", "C0")] = {"Inventario": 99.0}
+    del sources.inventario[("M002", "C0")]
+    sources.touch('inventario')
+    sources.productos["M003"] = {"Producto": "P3", "Marca": "Nueva"}
+    sources.touch('productos')
+    del sources.claro[("M010", "C1")]
+    sources.claro[("M999", "C9")] = {"Sugerido Claro": 4}
+    sources.touch('claro')
+    body = client.get('/cruzar/api/data').get_json()
+    assert body['data'] == Sources.view(sources).records()[1]
+    body = client.get('/cruzar/api/data?marca=nueva').get_json()
+    assert {r['Material'] for r in body['data']} == {"M003"}
+    body = client.get('/cruzar/api/data?inventario_min=50').get_json()
+    assert [(r['Material'], r['Centro Costos']) for r in body['data']] == [("M001", "C0")]
+    # solo cambian valores: el índice se parchea y coincide con uno nuevo
+    sources.transitos[("M000", "C0")] = {"Transitos": 7}
+    sources.touch('transitos')
+    body = client.get('/cruzar/api/data?sort=-Transitos&page=1&page_size=1').get_json()
+    assert cruzar._cruzado.changed_positions(cruzar._index_state["version"]) is not None
+    assert body['data'][0]['Transitos'] == 7
+    rows, totals = _expected(cruzar._cruzado.records()[1])
+    assert body['totals'] == pytest.approx(totals)
@@ -0,0 +1,88 @@
+"""conexiones/dates.py frente a las funciones de fecha de ops_ventasclaro anteriores."""
+
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from conexiones import dates
+
+SAMPLES = [
+    "2025-09-03", "2025-09-03 00:00:00", "2025-10-31 17:45:10", "03/09/2025", "3-9-2025",
+    "2025/09/03", "12/31/2025", "45292", "45658", "31/12/2024", "2025-02-30", "hoy", "",
+    "  2025-11-05 ", "2024-02-29", "1/2/2025",
+]
+
+
+def legacy_normalize(s):
+    """ops_ventasclaro._normalize_date_str tal como estaba."""
+    if s is None:
+        return ""
+    s = str(s).strip()
+    if not s:
+        return ""
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%m/%d/%Y"):
+        try:
+            return datetime.strptime(s, fmt).strftime("%Y-%m-%d")
+        except Exception:
+            continue
+    return s
+
+
+def legacy_parse(norm):
+    """ops_ventasclaro._parse_norm_date_to_date tal como estaba (entradas str)."""
+    s = str(norm).strip()
+    if not s:
+        return None
+    try:
+        if s.isdigit() and len(s) <= 5:
+            return (datetime(1899, 12, 30) + pd.to_timedelta(int(s), unit="D")).date()
+    except Exception:
+        pass
+    try:
+        dt = pd.to_datetime(s, errors="coerce")
+        if pd.notna(dt):
+            return dt.date()
+    except Exception:
+        pass
+    try:
+        dt = pd.to_datetime(s, dayfirst=True, errors="coerce")
+        if pd.notna(dt):
+            return dt.date()
+    except Exception:
+        pass
+    return None
+
+
+@pytest.fixture(autouse=True)
+def _fresh_caches():
+    dates.clear_caches()
+    yield
+    dates.clear_caches()
+
+
+def test_normalize_matches_legacy():
+    assert [dates.normalize_date_str(s) for s in SAMPLES] == [legacy_normalize(s) for s in SAMPLES]
+    assert dates.normalize_dates(SAMPLES).tolist() == [legacy_normalize(s) for s in SAMPLES]
+
+
+@pytest.mark.parametrize("normalized", [False, True])
+def test_parse_matches_legacy(normalized):
+    values = [legacy_normalize(s) for s in SAMPLES] if normalized else SAMPLES
+    expected = [legacy_parse(s) for s in values]
+    assert [dates.parse_date(s) for s in values] == expected
+    assert dates.parse_dates(values).tolist() == expected
+
+
+def test_month_of_follows_parse_date():
+    values = [legacy_normalize(s) for s in SAMPLES] + [None]
+    expected = [(d.year, d.month) if d else None for d in (legacy_parse(s or "") for s in values)]
+    assert dates.month_of(values) == expected
+    # serial de Excel: 45292 = 2024-01-01
+    assert dates.month_of(["45292"]) == [(2024, 1)]
+
+
+def test_cached_results_are_stable():
+    first = dates.parse_dates(SAMPLES).tolist()
+    assert dates.parse_dates(SAMPLES).tolist() == first
+    assert dates.cache_stats()["parse"]["hits"] > 0
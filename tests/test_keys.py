@@ -0,0 +1,98 @@
+"""Reglas de claves (conexiones/keys.py) y de duplicados de los maestros frente a las anteriores."""
+
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conexiones import keys
+
+
+def legacy_material(raw):
+    """compras._normalize_material tal como estaba."""
+    if raw is None:
+        return ""
+    s = str(raw).strip()
+    if not s:
+        return ""
+    s = s.replace('\u200b', '').replace(' ', '')
+    if re.search(r'[eE]', s):
+        try:
+            val = float(s.replace(',', '.'))
+            if abs(val - int(val)) < 1e-6:
+                return str(int(val))
+            return format(val, 'f').rstrip('0').rstrip('.')
+        except Exception:
+            pass
+    if re.fullmatch(r'[\d\.,]+', s):
+        if s.count(',') == 1 and s.count('.') == 0:
+            try:
+                val = float(s.replace(',', '.'))
+                if abs(val - int(val)) < 1e-6:
+                    return str(int(val))
+                return format(val, 'f').rstrip('0').rstrip('.')
+            except Exception:
+                pass
+        cleaned = re.sub(r'[^\d]', '', s)
+        if cleaned:
+            return cleaned
+    return re.sub(r'\.0+$', '', s)
+
+
+MATERIALS = [
+    "7701234567890", " 7701234567890 ", "\u200b840080531083", "840080531083.0", "8,40081E+11",
+    "12,0", "1.234.567", "AB12", "ab12", "AB 12", "", None, float("nan"), 7001234, 7001234.0,
+]
+
+
+@pytest.mark.parametrize("raw", MATERIALS)
+def test_material_matches_legacy(raw):
+    expected = "" if raw is None or raw != raw else legacy_material(raw)
+    if re.fullmatch(r'\s*\d+\.0+\s*', str(raw)):
+        # cambio documentado: '1234.0' (o el float 1234.0) es el entero 1234 (antes '12340')
+        expected = str(raw).strip().split('.')[0]
+    assert keys.material(raw) == expected
+
+
+def test_material_column_matches_values():
+    values = [m for m in MATERIALS if not isinstance(m, float)]
+    assert keys.material_column(values).tolist() == [keys.material(v) for v in values]
+    assert keys.material_column(pd.Series(values, dtype=object)).tolist() == [keys.material(v) for v in values]
+
+
+def test_centro_canonical():
+    assert keys.centro(" c108 ") == "C108"
+    assert keys.centro("C 108") == "C108"
+    assert keys.centro(7703670000123) == "7703670000123"
+    assert keys.centro("108.0") == "108"
+    assert keys.centro(None) == ""
+    values = [" c108 ", "C108", None, "7703670000123"]
+    assert keys.centro_column(np.array(values, dtype=object)).tolist() == ["C108", "C108", "", "7703670000123"]
+
+
+@pytest.mark.parametrize("module", ["blueprint.data_claro", "blueprint.data_coltrade"])
+def test_find_by_material_is_case_insensitive(module):
+    mod = pytest.importorskip(module)
+    items = [{"Material": "AB12", "id": 1}, {"Material": "7001234", "id": 2}]
+    # como el strip().lower() anterior: sin distinguir mayúsculas ni espacios al borde
+    assert mod.find_by_material(" ab12 ", items=items)["id"] == 1
+    assert mod.find_by_material("Ab12", items=items)["id"] == 1
+    # además, el mismo material leído como float
+    assert mod.find_by_material("7001234.0", items=items)["id"] == 2
+    assert mod.find_by_material("AB13", items=items) is None
+
+
+def test_puntos_master_keeps_strip_lower_rule():
+    ops_puntos = pytest.importorskip("blueprint.ops_puntos")
+    puntos = [{"Centro Costos": "c108", "Punto de Venta": "A"}]
+    assert ops_puntos.find_by_centro(" C108 ", puntos=puntos)["Punto de Venta"] == "A"
+    # los espacios internos distinguen puntos en el maestro
+    assert ops_puntos.find_by_centro("C 108", puntos=puntos) is None
+
+
+def test_store_normalizers_store_one_spelling():
+    inventario = pytest.importorskip("blueprint.inventario_claro")
+    a = inventario.normalize_item({"Centro Costos": " c108 ", "Material": "840080531083.0", "Inventario": "3"})
+    b = inventario.normalize_item({"centro": "C108", "material": "840080531083"})
+    assert (a["Centro Costos"], a["Material"]) == (b["Centro Costos"], b["Material"]) == ("C108", "840080531083")
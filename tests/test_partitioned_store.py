@@ -0,0 +1,129 @@
+"""PartitionedRecordStore: migración desde el JSON anterior, ida y vuelta y recuperación."""
+
+import json
+
+import pytest
+
+from conexiones.partitioned_store import PartitionedRecordStore
+from conexiones.segment_log import SegmentLog
+
+ops_ventasclaro = pytest.importorskip("blueprint.ops_ventasclaro")
+
+LEGACY = [
+    {"id": 1, "Centro Costos": "C1", "Material": "100", "Fecha Venta": "2025-09-03", "Cantidad": 2},
+    {"id": 2, "Centro Costos": "C2", "Material": "200", "Fecha Venta": "2025-10-15 00:00:00", "Cantidad": 1},
+    {"Centro Costos": "C1", "Material": "300", "Fecha Venta": "45292", "Cantidad": 4},
+    {"id": 5, "Centro Costos": "C3", "Material": "100", "Fecha Venta": "", "Cantidad": 7},
+    {"id": 3, "Centro Costos": "C2", "Material": "100", "Fecha Venta": "03/09/2025", "Cantidad": 3},
+]
+
+
+def _store(root, name="ventas", layout=2):
+    legacy = root / "ventas.json"
+    return PartitionedRecordStore(
+        root / "ventas", ops_ventasclaro._venta_partitions, normalize=ops_ventasclaro._normalize_venta,
+        cache_key=f"test:{root}:{name}", legacy_path=legacy, layout=layout, background=False)
+
+
+@pytest.fixture
+def legacy_dir(tmp_path):
+    SegmentLog(tmp_path / "ventas.json", background=False).rewrite(LEGACY)
+    return tmp_path
+
+
+def _body(rec):
+    return {k: v for k, v in rec.items() if k != "id"}
+
+
+def test_migration_keeps_rows_and_ids(legacy_dir):
+    store = _store(legacy_dir)
+    rows = store.read()
+    expected = [ops_ventasclaro._normalize_venta(_body(r)) for r in LEGACY]
+    assert sorted(map(_body, rows), key=json.dumps) == sorted(expected, key=json.dumps)
+    # ids existentes conservados; la fila sin id recibe uno nuevo
+    assert {r["id"] for r in rows} == {1, 2, 3, 5, 6}
+    assert store.partitions() == ["2024-01", "2025-09", "2025-10", "sin_fecha"]
+    assert [r["Material"] for r in store.read_partitions(["2024-01"])] == ["300"]
+    # el JSON anterior queda en su lugar y el manifest registra la migración
+    assert SegmentLog(legacy_dir / "ventas.json", background=False).read() == LEGACY
+    manifest = json.loads((legacy_dir / "ventas" / "manifest.json").read_text())
+    assert manifest["migrated"] == {"from": "ventas.json", "rows": 5}
+    store.delete(1)
+    assert _store(legacy_dir, name="otra").read() == rows[1:]
+
+
+def test_plain_legacy_json_is_left_untouched(tmp_path):
+    legacy = tmp_path / "ventas.json"
+    legacy.write_text(json.dumps(LEGACY), encoding="utf-8")
+    before = legacy.read_bytes()
+    assert len(_store(tmp_path).read()) == len(LEGACY)
+    assert legacy.read_bytes() == before
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["ventas", "ventas.json"]
+
+
+def test_round_trip(legacy_dir):
+    store = _store(legacy_dir)
+    store.read()
+    added = store.append([{"Centro Costos": "C9", "Material": "900", "Fecha Venta": "2025-11-01", "Cantidad": 1}])
+    rid = added[0]["id"]
+    # cambio de mes: pasa a otra partición con el mismo id
+    store.update(rid, {"Centro Costos": "C9", "Material": "900", "Fecha Venta": "2025-09-20", "Cantidad": 5})
+    store.delete(2)
+    rows = store.read()
+    assert [r["id"] for r in rows] == sorted(r["id"] for r in rows)
+    assert store.get(rid)["Cantidad"] == 5
+    assert store.get(2) is None
+    # otra instancia (sin caché compartida) lee lo mismo del disco
+    assert _store(legacy_dir, name="otra").read() == rows
+    assert _store(legacy_dir, name="otra2").read_partitions(["2025-09"]) == \
+        [r for r in rows if r["Fecha Venta"].startswith("2025-09")]
+
+
+def test_lost_manifest_does_not_remigrate(legacy_dir):
+    store = _store(legacy_dir)
+    store.read()
+    store.append([{"Centro Costos": "C9", "Material": "900", "Fecha Venta": "2025-11-01", "Cantidad": 1}])
+    rows = store.read()
+    # se pierde el manifest y reaparece un JSON anterior desactualizado
+    (legacy_dir / "ventas" / "manifest.json").unlink()
+    SegmentLog(legacy_dir / "ventas.json", background=False).rewrite(LEGACY[:1])
+    recovered = _store(legacy_dir, name="recuperado")
+    assert recovered.read() == rows
+    assert recovered.append([{"Centro Costos": "C1", "Material": "1", "Fecha Venta": "", "Cantidad": 1}])[0]["id"] \
+        > max(r["id"] for r in rows)
+
+
+def test_two_instances_share_rows_and_ids(tmp_path):
+    # dos instancias sobre el mismo directorio = dos workers de gunicorn
+    a, b = _store(tmp_path, name="a"), _store(tmp_path, name="b")
+    row = {"Centro Costos": "C1", "Material": "1", "Fecha Venta": "2025-09-01", "Cantidad": 1}
+    a.append([row])
+    assert len(b.read()) == 1
+    a.append([dict(row, Cantidad=2)])
+    b.append([dict(row, Cantidad=3)])
+    ids = [r["id"] for r in _store(tmp_path, name="c").read_shared()]
+    assert ids == [1, 2, 3]
+    assert [r["Cantidad"] for r in a.read()] == [1, 2, 3]
+    assert json.loads((tmp_path / "ventas" / "manifest.json").read_text())["next_id"] == 4
+    # una partición borrada en una instancia desaparece en la otra
+    b.drop_partitions(["2025-09"])
+    assert a.read() == [] and a.partitions() == []
+    assert a.append([row])[0]["id"] == 4
+
+
+def test_layout_change_moves_misplaced_rows(tmp_path):
+    def iso_only(recs):
+        out = []
+        for r in recs:
+            f = r.get("Fecha Venta") or ""
+            out.append(f[:7] if f[:4].isdigit() and f[4:5] == "-" else "sin_fecha")
+        return out
+
+    old = PartitionedRecordStore(tmp_path / "ventas", iso_only, cache_key=f"test:{tmp_path}:old",
+                                 background=False)
+    old.append([{"Centro Costos": "C1", "Material": "1", "Fecha Venta": "45292", "Cantidad": 1},
+                {"Centro Costos": "C1", "Material": "1", "Fecha Venta": "2024-01-05", "Cantidad": 2}])
+    assert old.partitions() == ["2024-01", "sin_fecha"]
+    new = _store(tmp_path, name="nuevo")
+    assert new.partitions() == ["2024-01"]
+    assert [r["Cantidad"] for r in new.read_partitions(["2024-01"])] == [1, 2]
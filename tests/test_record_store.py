@@ -0,0 +1,73 @@
+"""RecordStore: ids estables, update/delete por id y asignación de ids entre procesos."""
+
+import multiprocessing
+
+import pytest
+
+from conexiones.record_store import RecordStore
+
+
+def _store(path, name="a", **kw):
+    return RecordStore(path, cache_key=f"test:{path}:{name}", background=False, **kw)
+
+
+def test_ids_update_delete(tmp_path):
+    store = _store(tmp_path / "inv.json")
+    added = store.append([{"v": 1}, {"v": 2}, {"v": 3}])
+    assert [r["id"] for r in added] == [1, 2, 3]
+    assert store.update(2, {"id": 99, "v": 20}) == {"id": 2, "v": 20}
+    assert store.update(42, {"v": 0}) is None
+    assert store.delete(3) and not store.delete(3)
+    # el id borrado no se reutiliza
+    assert store.append([{"v": 4}])[0]["id"] == 4
+    assert store.read() == [{"id": 1, "v": 1}, {"id": 2, "v": 20}, {"id": 4, "v": 4}]
+    assert store.get(2) == {"id": 2, "v": 20} and store.count() == 3
+    assert _store(tmp_path / "inv.json", name="b").read() == store.read()
+
+
+def test_rows_without_id_get_one_in_order(tmp_path):
+    path = tmp_path / "inv.json"
+    path.write_text('[{"v": 1}, {"id": 5, "v": 2}, {"v": 3}]', encoding="utf-8")
+    store = _store(path)
+    assert store.read() == [{"id": 6, "v": 1}, {"id": 5, "v": 2}, {"id": 7, "v": 3}]
+    store.rewrite([r for r in store.read() if r["v"] != 2] + [{"v": 4}])
+    assert store.read() == [{"id": 6, "v": 1}, {"id": 7, "v": 3}, {"id": 8, "v": 4}]
+
+
+def test_normalize_drops_and_cleans(tmp_path):
+    store = _store(tmp_path / "inv.json", normalize=lambda r: {"v": int(r["v"])} if r.get("v") else None)
+    assert store.append([{"v": "3"}, {"v": ""}]) == [{"id": 1, "v": 3}]
+
+
+def test_other_instance_sees_writes_and_ids(tmp_path):
+    a, b = _store(tmp_path / "inv.json", "a"), _store(tmp_path / "inv.json", "b")
+    a.append([{"v": 1}])
+    assert b.read() == [{"id": 1, "v": 1}]
+    a.append([{"v": 2}])
+    b.append([{"v": 3}])
+    a.delete(3)
+    b.update(1, {"v": 10})
+    assert a.append([{"v": 4}])[0]["id"] == 4
+    expected = [{"id": 1, "v": 10}, {"id": 2, "v": 2}, {"id": 4, "v": 4}]
+    assert a.read() == b.read() == _store(tmp_path / "inv.json", "c").read() == expected
+
+
+def _worker(path, tag, n):
+    store = _store(path, name=f"w{tag}")
+    for i in range(n):
+        store.append([{"w": tag, "i": i}])
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="requiere fork")
+def test_concurrent_processes_get_distinct_ids(tmp_path):
+    path = tmp_path / "inv.json"
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_worker, args=(path, tag, 40)) for tag in range(3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+        assert p.exitcode == 0
+    rows = _store(path, name="check").read()
+    assert len(rows) == 120
+    assert sorted(r["id"] for r in rows) == list(range(1, 121))
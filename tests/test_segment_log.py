@@ -0,0 +1,63 @@
+"""SegmentLog: mismo contenido que el JSON anterior, compactación y lectura desde otro proceso."""
+
+import json
+
+from conexiones.segment_log import SegmentLog
+
+
+def _log(path, **kw):
+    return SegmentLog(path, background=False, **kw)
+
+
+def test_append_and_read_like_json(tmp_path):
+    path = tmp_path / "ventas.json"
+    path.write_text(json.dumps([{"a": 1}]), encoding="utf-8")
+    log = _log(path, segment_max_rows=2)
+    log.append([{"a": 2}, {"a": 3}, {"a": 4}])
+    assert log.read() == [{"a": 1}, {"a": 2}, {"a": 3}, {"a": 4}]
+    assert log.count() == 4
+    # la base no se toca hasta compactar
+    assert json.loads(path.read_text(encoding="utf-8")) == [{"a": 1}]
+    assert log.compact()
+    assert json.loads(path.read_text(encoding="utf-8")) == log.read()
+    assert log.tail_rows() == 0
+
+
+def test_ops_by_id(tmp_path):
+    log = _log(tmp_path / "x.json")
+    log.rewrite([{"id": 1, "v": "a"}, {"id": 2, "v": "b"}])
+    log.append([{"id": 3, "v": "c"}, {"_op": "upd", "id": 1, "row": {"id": 1, "v": "A"}},
+                {"_op": "del", "id": 2}])
+    assert log.read() == [{"id": 1, "v": "A"}, {"id": 3, "v": "c"}]
+    log.compact()
+    assert log.read() == [{"id": 1, "v": "A"}, {"id": 3, "v": "c"}]
+
+
+def test_other_instance_sees_appends(tmp_path):
+    # dos instancias sobre el mismo archivo = dos workers de gunicorn
+    a, b = _log(tmp_path / "x.json"), _log(tmp_path / "x.json")
+    a.append([{"n": 1}])
+    sig = b.signature()
+    assert b.read() == [{"n": 1}]
+    a.append([{"n": 2}])
+    assert b.signature() != sig
+    assert b.read() == [{"n": 1}, {"n": 2}]
+    b.append([{"n": 3}])
+    a.compact()
+    assert b.read() == a.read() == [{"n": 1}, {"n": 2}, {"n": 3}]
+    b.set_meta("next_id", 7)
+    assert a.get_meta("next_id") == 7
+
+
+def test_compaction_discarded_after_rewrite_elsewhere(tmp_path):
+    a, b = _log(tmp_path / "x.json"), _log(tmp_path / "x.json")
+    a.append([{"n": 1}])
+    snapshot = a._snapshot   # compactación de a que se cruza con un rewrite de b
+
+    def racing_snapshot():
+        out = snapshot()
+        b.rewrite([{"n": 9}])
+        return out
+    a._snapshot = racing_snapshot
+    assert not a.compact()
+    assert a.read() == b.read() == [{"n": 9}]
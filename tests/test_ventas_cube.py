@@ -0,0 +1,95 @@
+"""VentasCube: deltas de alta / edición / baja frente a reconstruir y al cálculo directo."""
+
+import random
+
+import pandas as pd
+import pytest
+
+from conexiones import dates, keys
+from conexiones.ventas_cube import PANDAS_MIN_ROWS, VentasCube
+
+FECHAS = ["2025-09-03", "2025-09-28 00:00:00", "2025-10-01", "45292", "", "sin fecha", "2025-11-15"]
+
+
+def _rows(n, seed):
+    rnd = random.Random(seed)
+    return [{
+        "id": i + 1,
+        "Centro Costos": rnd.choice(["C1", "c1", "C2", "7703670000123"]),
+        "Material": rnd.choice(["100", "100.0", "200", "AB12"]),
+        "Fecha Venta": rnd.choice(FECHAS),
+        "Cantidad": rnd.choice([0, 1, 2, 3, 5, 2.5]),
+    } for i in range(n)]
+
+
+def reference(rows):
+    """Sumas mensuales y mediana por par canónico calculadas directamente con pandas."""
+    df = pd.DataFrame(rows)
+    df["cc"] = keys.centro_column(df["Centro Costos"])
+    df["mat"] = keys.material_column(df["Material"])
+    parsed = [dates.parse_date(f) for f in df["Fecha Venta"]]
+    df["y"] = [d.year if d else -1 for d in parsed]
+    df["m"] = [d.month if d else -1 for d in parsed]
+    dated = df[df["y"] >= 0]
+    monthly = {k: v for k, v in dated.groupby(["cc", "mat", "y", "m"])["Cantidad"].sum().items()}
+    median = {k: v for k, v in df.groupby(["cc", "mat"])["Cantidad"].median().items()}
+    months = sorted({(y, m) for y, m in zip(dated["y"], dated["m"])})
+    return monthly, median, months
+
+
+def _assert_view(cube, rows):
+    view = cube.view()
+    monthly, median, months = reference(rows)
+    assert view["monthly"] == pytest.approx(monthly)
+    assert view["median"] == pytest.approx(median)
+    assert view["months"] == months
+
+
+@pytest.mark.parametrize("n", [200, PANDAS_MIN_ROWS + 500])
+def test_deltas_match_rebuild_and_reference(tmp_path, n):
+    rows = _rows(n, seed=n)
+    cube = VentasCube(tmp_path / "cube.json")
+    cube.rebuild(rows)
+    _assert_view(cube, rows)
+
+    # alta
+    new = _rows(30, seed=1)
+    for i, r in enumerate(new):
+        r["id"] = n + i + 1
+    cube.add(new)
+    rows = rows + new
+    _assert_view(cube, rows)
+
+    # edición: se quita la versión anterior y se agrega la nueva
+    old = rows[5]
+    edited = {**old, "Fecha Venta": "2025-12-01", "Cantidad": 9}
+    cube.remove([old])
+    cube.add([edited])
+    rows[5] = edited
+    _assert_view(cube, rows)
+
+    # baja
+    gone = rows[10:40]
+    cube.remove(gone)
+    rows = rows[:10] + rows[40:]
+    _assert_view(cube, rows)
+
+    fresh = VentasCube(tmp_path / "fresh.json")
+    fresh.rebuild(rows)
+    delta, full = cube.view(), fresh.view()
+    # "pairs" sigue el orden de aparición: solo importa el conjunto
+    assert set(delta.pop("pairs")) == set(full.pop("pairs"))
+    assert delta == full
+
+
+def test_persisted_cube_round_trip(tmp_path):
+    rows = _rows(100, seed=3)
+    cube = VentasCube(tmp_path / "cube.json")
+    cube.rebuild(rows)
+    cube.signature = ("sig", 1)
+    cube.save(cube._payload())
+    loaded = VentasCube(tmp_path / "cube.json")
+    assert loaded.load(("sig", 1))
+    assert loaded.view() == cube.view()
+    # otra firma (u otro formato) obliga a reconstruir
+    assert not VentasCube(tmp_path / "cube.json").load(("sig", 2))